@@ -0,0 +1,258 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, List, Optional
+
+from . import metrics
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+# Sustained LLM calls per second each backend accepts from this process (0 = no rate limit);
+# the hosted model's quota is the one that runs out
+ADMISSION_RATES = {
+    "CLOUD_AI": float(os.getenv("ADMISSION_RATE_CLOUD_AI", "5")),
+    "LOCAL_LLM": float(os.getenv("ADMISSION_RATE_LOCAL_LLM", "0")),
+    "REPLAY": float(os.getenv("ADMISSION_RATE_REPLAY", "0")),
+}
+ADMISSION_BURST = int(os.getenv("ADMISSION_BURST", "10"))
+# A call that can't start within this long is shed (503) instead of queueing further
+ADMISSION_QUEUE_SECONDS = float(os.getenv("ADMISSION_QUEUE_SECONDS", "5"))
+# Requests one session may have waiting at once (the calls one request fans out into count once); more is a 429
+ADMISSION_SESSION_QUEUE = int(os.getenv("ADMISSION_SESSION_QUEUE", "2"))
+
+# Priorities, most urgent first
+TURN = 0        # a turn of an interview already under way (replies, code feedback, scoring)
+GREETING = 1    # the opening message of a new session
+BACKGROUND = 2  # speculative work; only runs on spare capacity, never queues
+PRIORITY_NAMES = ("turn", "greeting", "background")
+
+
+class Overloaded(Exception):
+    """A backend call was refused to keep latency bounded; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, detail: str, retry_after: float, status_code: int = 503):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.status_code = status_code
+
+
+class TokenBucket:
+    """`rate` tokens per second, at most `burst` saved up; rate 0 means unlimited."""
+
+    def __init__(self, rate: float, burst: int = ADMISSION_BURST):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> float:
+        """Takes a token and returns 0, or returns the seconds until one is available (taking nothing)."""
+        if not self.rate:
+            return 0.0
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class Request:
+    """
+    Permit shared by the backend calls one API request fans out into (the
+    per-dimension scoring calls of an evaluation), so they count once
+    against the session's queue cap instead of once per call.
+    """
+
+    __slots__ = ()
+
+
+class Waiter:
+    __slots__ = ("session_id", "priority", "request", "future", "enqueued")
+
+    def __init__(self, session_id: str, priority: int, request: Optional[Request], future: asyncio.Future):
+        self.session_id = session_id
+        self.priority = priority
+        self.request = request
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class FairScheduler:
+    """
+    Admission control for one LLM backend. A call starts only with a free
+    concurrency slot and a token from the backend's rate bucket. Waiting
+    calls are served by priority (interview turns, then greetings), and
+    round-robin across sessions within a priority, so one chatty session
+    can't starve the rest. A call that would wait past the queue deadline
+    is refused up front (503), as is a session with too many requests
+    already queued (429). Both carry a Retry-After, so overload costs a fast error
+    instead of an ever-growing p99.
+    """
+
+    def __init__(self, name: str, slots: int, rate: float = 0.0, burst: int = ADMISSION_BURST,
+                 deadline: float = ADMISSION_QUEUE_SECONDS, session_queue: int = ADMISSION_SESSION_QUEUE):
+        self.name = name
+        self.slots = slots
+        self.bucket = TokenBucket(rate, burst)
+        self.deadline = deadline
+        self.session_queue = session_queue
+        self.running = 0
+        self.waiting = 0
+        self.latency_ewma: Optional[float] = None
+        # Per priority: session -> its waiting calls, in round-robin order
+        self._queues: List["OrderedDict[str, Deque[Waiter]]"] = [OrderedDict() for _ in PRIORITY_NAMES]
+        self._retry: Optional[asyncio.TimerHandle] = None
+
+    def _throughput(self) -> Optional[float]:
+        """Calls per second this backend can start, if known."""
+        rates = []
+        if self.bucket.rate:
+            rates.append(self.bucket.rate)
+        if self.latency_ewma:
+            rates.append(self.slots / self.latency_ewma)
+        return min(rates) if rates else None
+
+    def _ahead(self, priority: int) -> int:
+        return sum(len(calls) for queue in self._queues[:priority + 1] for calls in queue.values())
+
+    def estimated_wait(self, priority: int) -> float:
+        throughput = self._throughput()
+        if throughput is None:
+            return 0.0
+        return (self._ahead(priority) + 1) / throughput
+
+    def idle(self) -> bool:
+        return self.waiting == 0 and self.running < self.slots
+
+    def _shed(self, outcome: str, detail: str, retry_after: float, status_code: int = 503) -> Overloaded:
+        metrics.ADMISSION.inc(backend=self.name, outcome=outcome)
+        return Overloaded(detail, retry_after, status_code)
+
+    async def acquire(self, session_id: str, priority: int = TURN, request: Optional[Request] = None):
+        """
+        Waits for this call's turn; raises Overloaded if it would wait too long.
+        Calls passing the same `request` count as one against the session cap.
+        """
+        if self.running < self.slots and not self._ahead(priority) and self.bucket.take() == 0:
+            self.running += 1
+            metrics.ADMISSION.inc(backend=self.name, outcome="admitted")
+            metrics.ADMISSION_WAIT.observe(0.0, backend=self.name)
+            return
+        if priority == BACKGROUND:
+            raise self._shed("shed_background", f"{self.name} has no spare capacity", 1)
+        queue = self._queues[priority]
+        queued = {waiter.request or waiter for waiter in queue.get(session_id, ())}
+        if request not in queued and len(queued) >= self.session_queue:
+            raise self._shed("shed_session", "Too many requests in flight for this session", 1, 429)
+        wait = self.estimated_wait(priority)
+        if wait > self.deadline:
+            raise self._shed("shed_queue", f"{self.name} is overloaded", wait)
+
+        waiter = Waiter(session_id, priority, request, asyncio.get_running_loop().create_future())
+        queue.setdefault(session_id, deque()).append(waiter)
+        self.waiting += 1
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.deadline)
+        except asyncio.TimeoutError:
+            # Admitted just as the deadline hit: keep the slot
+            if not waiter.future.done():
+                self._remove(waiter)
+                raise self._shed("shed_deadline", f"{self.name} is overloaded", self.estimated_wait(priority))
+        except BaseException:
+            # Cancelled while queued, or right after being admitted: don't leak the slot
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release()
+            else:
+                self._remove(waiter)
+            raise
+        metrics.ADMISSION.inc(backend=self.name, outcome="admitted")
+        metrics.ADMISSION_WAIT.observe(time.monotonic() - waiter.enqueued, backend=self.name)
+
+    def _remove(self, waiter: Waiter):
+        calls = self._queues[waiter.priority].get(waiter.session_id)
+        if calls and waiter in calls:
+            calls.remove(waiter)
+            self.waiting -= 1
+            if not calls:
+                del self._queues[waiter.priority][waiter.session_id]
+        if not waiter.future.done():
+            waiter.future.cancel()
+
+    def _next(self) -> Optional[Waiter]:
+        for queue in self._queues:
+            if queue:
+                session_id, calls = next(iter(queue.items()))
+                waiter = calls.popleft()
+                # The session goes to the back of the line for its next call
+                del queue[session_id]
+                if calls:
+                    queue[session_id] = calls
+                self.waiting -= 1
+                return waiter
+        return None
+
+    def _dispatch(self):
+        while self.waiting and self.running < self.slots:
+            delay = self.bucket.take()
+            if delay:
+                # Out of tokens: try again once the next one is due
+                if self._retry is None:
+                    self._retry = asyncio.get_running_loop().call_later(delay, self._retry_dispatch)
+                return
+            waiter = self._next()
+            self.running += 1
+            waiter.future.set_result(None)
+
+    def _retry_dispatch(self):
+        self._retry = None
+        self._dispatch()
+
+    def release(self, latency: Optional[float] = None):
+        self.running -= 1
+        if latency is not None:
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, session_id: str, priority: int = TURN,
+                   request: Optional[Request] = None) -> AsyncIterator[None]:
+        """Holds an admitted slot for the duration of one backend call (or stream)."""
+        await self.acquire(session_id, priority, request)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def status(self) -> Dict[str, object]:
+        return {"running": self.running, "waiting": self.waiting, "slots": self.slots,
+                "rate": self.bucket.rate, "latency_ewma": self.latency_ewma}
+
+
+class Unlimited:
+    """Stand-in when admission control is off (ADMISSION_ENABLED=0)."""
+
+    running = waiting = 0
+
+    def idle(self) -> bool:
+        return True
+
+    @asynccontextmanager
+    async def slot(self, session_id: str, priority: int = TURN,
+                   request: Optional[Request] = None) -> AsyncIterator[None]:
+        yield
+
+
+def create_scheduler(name: str, slots: int):
+    if not ADMISSION_ENABLED:
+        return Unlimited()
+    return FairScheduler(name, slots, ADMISSION_RATES.get(name, 0.0))
@@ -0,0 +1,168 @@
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .history import summary_preamble
+from .models import CandidateSession, Turn, CANDIDATE, INTERVIEWER
+from .personas import COMPANY_PERSONAS
+
+# Prompt-side budget for replayed history when a chat has to be (re)built
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "4000"))
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", "1000"))
+
+# InterviewState roles -> Gemini chat roles (system markers are not replayed)
+GEMINI_ROLES = {CANDIDATE: "user", INTERVIEWER: "model"}
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting
+    return len(text) // 4 + 1
+
+
+def problem_brief(problem: Optional[Dict[str, Any]]) -> str:
+    """The round's assigned problem, stated so the model poses that one (the judge tests code against it)."""
+    if not problem:
+        return ""
+    if problem.get("question"):
+        return f"Ask exactly this question: {problem['question']}"
+    return f"The problem for this round is \"{problem['title']}\": {problem.get('description', '')} " \
+           "Pose exactly this problem, not a different one."
+
+
+def persona_prompt(session: CandidateSession, problem: Optional[Dict[str, Any]] = None) -> str:
+    """Standing instructions sent once as the opening turn of a chat."""
+    prompt = f"You are a strict {session.target_company} {session.target_role} interviewer. " \
+             f"Round: {session.round_type}. Candidate Level: {session.target_level}."
+    persona = COMPANY_PERSONAS.get(session.target_company)
+    if persona:
+        prompt += f"\nPersonality: {persona.personality}\nGuidelines:\n" + \
+                  "\n".join(f"- {g}" for g in persona.style_guidelines)
+    focus = session.current_state.profile_focus
+    if focus:
+        # From the resume/JD, matched once at session start
+        prompt += f"\nThe candidate's background points to: {', '.join(focus)}. Target questions there."
+    brief = problem_brief(problem)
+    if brief:
+        prompt += f"\n{brief}"
+    return prompt
+
+
+def prior_turns(session: CandidateSession, user_input: str) -> List[Turn]:
+    """
+    History before the current input. Routes append the candidate turn before
+    calling the engine, possibly in compacted form (a code run is recorded as a
+    diff), so a trailing candidate turn is taken to be this input.
+    """
+    history = session.current_state.history
+    if history and history[-1].role == CANDIDATE:
+        return history[:-1]
+    return history
+
+
+def history_window(session: CandidateSession, turns: List[Turn], problem: Optional[Dict[str, Any]] = None,
+                   budget: int = CHAT_HISTORY_TOKEN_BUDGET) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Builds Gemini chat history from the most recent turns that fit in `budget`
+    tokens. Returns (contents, pending) where `pending` is trailing candidate
+    text with no interviewer reply yet; it must be prefixed to the next message
+    because Gemini requires strictly alternating user/model turns.
+    """
+    window: List[Dict[str, Any]] = []
+    used = 0
+    truncated = False
+    for turn in reversed(turns):
+        role = GEMINI_ROLES.get(turn.role)
+        if role is None:
+            continue
+        cost = estimate_tokens(turn.content)
+        if used + cost > budget:
+            truncated = True
+            break
+        used += cost
+        if window and window[0]["role"] == role:
+            window[0]["parts"].insert(0, turn.content)
+        else:
+            window.insert(0, {"role": role, "parts": [turn.content]})
+
+    opener = persona_prompt(session, problem)
+    preamble = summary_preamble(session.current_state)
+    if preamble:
+        opener += f"\n\n{preamble}"
+    if truncated:
+        opener += "\n(Earlier parts of the interview were omitted.)"
+    if window and window[0]["role"] == "user":
+        window[0]["parts"].insert(0, opener)
+    else:
+        window.insert(0, {"role": "user", "parts": [opener]})
+
+    pending = ""
+    if len(window) > 1 and window[-1]["role"] == "user":
+        pending = "\n\n".join(window.pop()["parts"])
+    return window, pending
+
+
+def standalone_prompt(session: CandidateSession, user_input: str, problem: Optional[Dict[str, Any]] = None) -> str:
+    """
+    The same budgeted history window flattened into one prompt, for
+    generations that must not touch the session's live chat (speculation).
+    """
+    contents, pending = history_window(session, session.current_state.history, problem)
+    speakers = {"user": "Candidate", "model": "Interviewer"}
+    lines = ["\n\n".join(contents[0]["parts"])]
+    lines += [f"{speakers[c['role']]}: " + "\n\n".join(c["parts"]) for c in contents[1:]]
+    message = f"{pending}\n\n{user_input}" if pending else user_input
+    lines += [f"Candidate: {message}", "Interviewer:"]
+    return "\n\n".join(lines)
+
+
+class ChatRegistry:
+    """
+    Keeps one live Gemini chat per interview session so each turn only sends
+    the new candidate message. A chat is rebuilt from a token-budgeted history
+    window whenever the session's history moved on without it (first turn,
+    another worker served a turn, the handle was evicted, ...) or was compacted,
+    which also bounds how much history a long-lived chat carries.
+    """
+
+    def __init__(self, max_chats: int = CHAT_CACHE_SIZE):
+        self.max_chats = max_chats
+        # session_id -> [chat, compacted turns, number of history turns the chat reflects]
+        self._chats: "OrderedDict[str, List[Any]]" = OrderedDict()
+
+    def checkout(self, model, session: CandidateSession, user_input: str,
+                 problem: Optional[Dict[str, Any]] = None) -> Tuple[Any, str]:
+        """Returns (chat, message) ready to send for this turn."""
+        turns = prior_turns(session, user_input)
+        compacted = session.current_state.compacted_turns
+        entry = self._chats.get(session.session_id)
+        if entry is not None and entry[1] == compacted and entry[2] == len(turns):
+            self._chats.move_to_end(session.session_id)
+            return entry[0], user_input
+
+        contents, pending = history_window(session, turns, problem)
+        if len(contents) == 1:
+            # Nothing to replay yet: the persona rides along with this turn
+            chat = model.start_chat(history=[])
+            message = "\n\n".join(contents[0]["parts"] + [user_input])
+        else:
+            chat = model.start_chat(history=contents)
+            message = f"{pending}\n\n{user_input}" if pending else user_input
+        self._chats[session.session_id] = [chat, compacted, len(turns)]
+        self._chats.move_to_end(session.session_id)
+        while len(self._chats) > self.max_chats:
+            self._chats.popitem(last=False)
+        return chat, message
+
+    def commit(self, session: CandidateSession, user_input: str):
+        """Marks the chat as in sync once the reply is appended to the session history."""
+        entry = self._chats.get(session.session_id)
+        if entry is None:
+            return
+        input_recorded = len(prior_turns(session, user_input)) != len(session.current_state.history)
+        entry[2] += (1 if input_recorded else 0) + 1
+
+    def drop(self, session_id: str):
+        self._chats.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._chats)
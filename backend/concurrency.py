@@ -0,0 +1,98 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+# Per-call deadline and concurrency caps for LLM backends (overridable via env)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+
+class BackendLimiter:
+    """
+    Caps how many calls can be in flight against one backend and enforces a
+    per-call timeout. Blocking callables are offloaded to a bounded thread
+    pool so they never run on the event loop.
+    """
+
+    def __init__(self, name: str, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 timeout: float = LLM_TIMEOUT_SECONDS):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.in_flight = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"llm-{name}")
+
+    async def run_blocking(self, fn: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Runs a blocking callable on the backend's thread pool."""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        return await self.run(lambda: loop.run_in_executor(self._pool, call), timeout=timeout)
+
+    async def run(self, coro_factory: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Awaits a coroutine created by `coro_factory` under the concurrency cap and deadline."""
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await asyncio.wait_for(coro_factory(), timeout or self.timeout)
+            finally:
+                self.in_flight -= 1
+
+    async def stream(self, agen_factory: Callable[[], AsyncIterator[Any]], timeout: Optional[float] = None) -> AsyncIterator[Any]:
+        """
+        Relays an async chunk stream under the concurrency cap. The deadline
+        applies between chunks, so long generations are fine as long as
+        tokens keep arriving.
+        """
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                chunks = agen_factory().__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout or self.timeout)
+                    except StopAsyncIteration:
+                        break
+                    yield chunk
+            finally:
+                self.in_flight -= 1
+
+    def stream_blocking(self, iter_factory: Callable[[], Iterator[Any]], timeout: Optional[float] = None) -> AsyncIterator[Any]:
+        """Relays a blocking iterator (e.g. a streamed HTTP body) from the thread pool."""
+        return self.stream(lambda: self._pump(iter_factory), timeout=timeout)
+
+    async def _pump(self, iter_factory: Callable[[], Iterator[Any]]) -> AsyncIterator[Any]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        done = object()
+
+        def produce():
+            try:
+                for item in iter_factory():
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        loop.run_in_executor(self._pool, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Consumer went away (client disconnect / timeout): stop the producer thread
+            stop.set()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
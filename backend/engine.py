@@ -1,198 +1,437 @@
 import os
-import requests
-import json
-import random
-import google.generativeai as genai
-from typing import Dict, Any, List
-from .models import CandidateSession
+import asyncio
+import threading
+import time
+from typing import Dict, Any, List, AsyncIterator, Optional
+from .models import CandidateSession, INTERVIEWER
+from .history import total_turns
+from .prefetch import Prefetcher, PREDICTIONS, PREFETCH_ENABLED, PREFETCH_IDLE_FRACTION, predicted_kind
+from .concurrency import BackendLimiter
+from .chat_sessions import ChatRegistry, estimate_tokens, problem_brief, standalone_prompt
+from .response_cache import ResponseCache, prompt_fingerprint, setup_fingerprint
+from .problem_bank import ProblemBank
+from .rules import RuleEngine
+from .personas import COMPANY_PERSONAS
+from .router import BackendRouter
+from .ollama_dispatcher import OllamaDispatcher
+from .shared_state import SharedState
+from .recording import COMPLETE, LLM_REPLAY_FILE, TURN, ReplayBackend, create_recorder
+from .admission import BACKGROUND, GREETING, TURN as TURN_PRIORITY, Request, create_scheduler
+from . import metrics
+from .evaluation import evaluate
 
 class InterviewEngine:
-    def __init__(self):
+    def __init__(self, shared: Optional[SharedState] = None):
         print("Initializing Interview Engine...")
-        self.mode = "CHECKING"
+
+        # Async call paths: each backend gets its own concurrency cap + timeout
+        self.limiters = {
+            "CLOUD_AI": BackendLimiter("cloud"),
+            "LOCAL_LLM": BackendLimiter("local"),
+        }
+        # Pooled, slot-bounded and coalescing front door for the local Ollama server
+        self.ollama = OllamaDispatcher()
+        # One persistent Gemini chat per interview session
+        self.chats = ChatRegistry()
+        # Openers and hints depend only on the interview setup; serve repeats from cache
+        self.cache = ResponseCache(shared=shared)
+        # Likely next turns (hints) generated in idle time after each interviewer message
+        self.prefetch = Prefetcher()
+        # Optional JSONL log of every successful LLM call (LLM_RECORD_FILE)
+        self.recorder = create_recorder()
         
-        # 1. Try External API (Gemini)
+        # Register configured LLM backends; whether they are healthy is decided
+        # by background probes and live traffic, not by a blocking call here.
+        # The Gemini SDK itself is imported lazily by the first probe.
+        probes = {}
         self.api_key = os.getenv("GEMINI_API_KEY")
-        if self.api_key:
-            try:
-                genai.configure(api_key=self.api_key)
-                self.model = genai.GenerativeModel('gemini-pro')
-                # Simple health check
-                self.model.generate_content("Hello")
-                self.mode = "CLOUD_AI"
-                print(">> Mode: CLOUD AI (Gemini)")
-            except Exception as e:
-                print(f"!! Cloud AI Failed: {e}")
-                self.mode = "FALLBACK_CHECK"
+        self.model = None
+        self.replay = None
+        if LLM_REPLAY_FILE:
+            # A recording stands in for every live backend: no network, deterministic replies
+            self.replay = ReplayBackend.load()
+            self.limiters["REPLAY"] = BackendLimiter("replay")
+            probes["REPLAY"] = self._probe_replay
         else:
-            self.mode = "FALLBACK_CHECK"
+            if self.api_key:
+                probes["CLOUD_AI"] = self._probe_cloud
+            probes["LOCAL_LLM"] = self._probe_local
+        # Breaker state is shared with the other workers when a shared backend is configured
+        self.router = BackendRouter(probes, preference=["CLOUD_AI", "LOCAL_LLM", "REPLAY"], shared=shared)
+        # In front of each backend's limiter: rate bucket, turn-over-greeting priority, per-session
+        # fairness and load shedding (admission.Overloaded, answered with 429/503 + Retry-After)
+        # The local model decodes only `slots` prompts at once; past that, waiting is fairer in the scheduler
+        self.admission = {name: create_scheduler(name, self.ollama.slots if name == "LOCAL_LLM" else limiter.max_concurrency)
+                          for name, limiter in self.limiters.items()}
 
-        # 2. Try Local LLM (Ollama)
-        if self.mode == "FALLBACK_CHECK":
-            try:
-                # Check if Ollama is running on default port
-                resp = requests.get("http://localhost:11434/", timeout=2)
-                if resp.status_code == 200:
-                    self.mode = "LOCAL_LLM"
-                    print(">> Mode: LOCAL LLM (Ollama)")
-                else:
-                    self.mode = "STATIC"
-            except:
-                self.mode = "STATIC"
-                
-        if self.mode == "STATIC":
-            print(">> Mode: STATIC (Offline / In-Built)")
-            self.load_static_data()
+        # Problem bank is needed in every mode (static replies + the code judge)
+        self.load_static_data()
+
+    @property
+    def mode(self) -> str:
+        """Backend the next call will use: fastest healthy LLM, else STATIC."""
+        return self.router.select()
+
+    def start(self):
+        """
+        Starts background warm-up and health probing. Returns immediately:
+        STATIC replies are served until an LLM backend reports healthy.
+        """
+        self.router.start()
+        print(">> Mode: STATIC until LLM backends finish warming up")
+
+    def _load_cloud_model(self):
+        # google.generativeai pulls in grpc/protobuf; importing it costs seconds of cold start
+        import google.generativeai as genai
+        genai.configure(api_key=self.api_key)
+        self.model = genai.GenerativeModel('gemini-pro')
+
+    async def _probe_cloud(self):
+        if self.model is None:
+            await asyncio.to_thread(self._load_cloud_model)
+        # Token counting exercises auth + connectivity without spending generation quota
+        await self.model.count_tokens_async("ping")
+
+    async def _probe_local(self):
+        await self.limiters["LOCAL_LLM"].run_blocking(self.ollama.ping, timeout=2)
+
+    async def _probe_replay(self):
+        # Loaded at startup; nothing to reach
+        return None
 
     def load_static_data(self):
-        """Loads the pre-generated 'Best in Industry' offline content."""
-        base_path = os.path.dirname(__file__)
-        data_dir = os.path.join(base_path, "data")
-        
+        """Loads and indexes the pre-generated 'Best in Industry' offline content."""
         try:
-            with open(os.path.join(data_dir, "coding_problems.json"), "r") as f:
-                self.coding_problems = json.load(f)
-            with open(os.path.join(data_dir, "system_design.json"), "r") as f:
-                self.design_problems = json.load(f)
-            with open(os.path.join(data_dir, "behavioral.json"), "r") as f:
-                self.behavioral_problems = json.load(f)
+            self.problems = ProblemBank.load()
         except Exception as e:
             print(f"!! Failed to load static data: {e}. Ensure 'backend/data/' JSON files exist.")
-            self.coding_problems = []
-            self.design_problems = []
-            self.behavioral_problems = []
-
-    def get_interviewer_response(self, session: CandidateSession, user_input: str) -> str:
-        """Dispatcher for generating responses based on active mode."""
-        # Check for mode reset if Cloud AI fails mid-stream (quota exhaustion)
+            self.problems = ProblemBank({})
         try:
-            if self.mode == "CLOUD_AI":
-                return self._generate_cloud_response(session, user_input)
-            elif self.mode == "LOCAL_LLM":
-                return self._generate_local_response(session, user_input)
-            else:
-                return self._generate_static_response(session, user_input)
+            self.rules = RuleEngine.load("engine")
         except Exception as e:
-            print(f"Error in {self.mode}: {e}. Falling back to STATIC.")
-            self.mode = "STATIC"
-            if not hasattr(self, 'coding_problems'):
-                self.load_static_data()
+            print(f"!! Failed to load static rules: {e}. Ensure 'backend/data/static_rules.json' exists.")
+            self.rules = RuleEngine({}, "I am listening.")
+        self._profiles = None
+        self._profiles_lock = threading.Lock()
+
+    def ingest_profile(self, session: CandidateSession) -> bool:
+        """
+        Vectorizes the resume/JD once, at session start, and scores it against
+        the problem bank index (CPU work; callers run it off the event loop).
+        """
+        if not (session.resume_text or session.job_description):
+            return False
+        # numpy and the index are only needed once a candidate shares a profile
+        from .profile_index import ProfileIndex, ingest
+        with self._profiles_lock:
+            if self._profiles is None:
+                areas = [area for persona in COMPANY_PERSONAS.values() for area in persona.focus_areas]
+                self._profiles = ProfileIndex.build(self.problems, areas)
+        return ingest(self._profiles, self.problems, session)
+
+    def active_problem(self, session: CandidateSession) -> Optional[Dict[str, Any]]:
+        """The problem currently assigned to the session, if any."""
+        return self.problems.get(session.current_state.active_problem_id)
+
+    def _assign_problem(self, session: CandidateSession) -> Optional[Dict[str, Any]]:
+        persona = COMPANY_PERSONAS.get(session.target_company)
+        state = session.current_state
+        problem = self.problems.pick(
+            session.round_type,
+            level=session.target_level,
+            focus_areas=persona.focus_areas if persona else (),
+            exclude=state.seen_problem_ids,
+            affinity=state.problem_affinity,
+        )
+        if problem:
+            state.active_problem_id = problem["id"]
+            state.followups_asked = 0
+            if problem["id"] not in state.seen_problem_ids:
+                state.seen_problem_ids.append(problem["id"])
+        return problem
+
+    def _round_problem(self, session: CandidateSession) -> Optional[Dict[str, Any]]:
+        # The STATIC opener presents the problem picked when the round started
+        return self.active_problem(session) or self._assign_problem(session)
+
+    def _start_round(self, session: CandidateSession, user_input: str):
+        """
+        A round opener picks the round's problem before any backend answers,
+        so the judge, the profiler and the hint cache have it in every mode.
+        """
+        if user_input.startswith("START_ROUND_"):
+            self._assign_problem(session)
+
+    async def aget_interviewer_response(self, session: CandidateSession, user_input: str) -> str:
+        """
+        Async dispatcher used by the API routes. LLM calls run under per-backend
+        concurrency limits and a deadline, so a slow generation only delays its
+        own session instead of the whole event loop.
+        """
+        mode = self.mode
+        self._start_round(session, user_input)
+        if mode == "STATIC":
+            metrics.STATIC_REPLIES.inc(reason="no_backend")
             return self._generate_static_response(session, user_input)
 
-    def _generate_cloud_response(self, session: CandidateSession, user_input: str) -> str:
-        chat = self.model.start_chat(history=[])
-        # Construct context
-        context = f"You are a strict {session.target_company} {session.target_role} interviewer. " \
-                  f"Round: {session.round_type}. Candidate Level: {session.target_level}. " \
-                  f"User says: {user_input}"
+        cache_key = self._cache_key(session, user_input, mode)
+        cached = await self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            return cached
+        speculated = await self._take_speculation(session, user_input, mode)
+        if speculated is not None:
+            return speculated
+        async with self.admission[mode].slot(session.session_id, self._priority(user_input)):
+            started = time.perf_counter()
+            try:
+                if mode == "CLOUD_AI":
+                    reply = await self.limiters[mode].run(lambda: self._agenerate_cloud_response(session, user_input))
+                elif mode == "REPLAY":
+                    turn, setup = total_turns(session.current_state), self._setup(session)
+                    reply = await self.limiters[mode].run(lambda: self.replay.generate(TURN, user_input, turn, setup))
+                else:
+                    prompt = self._local_prompt(session, user_input)
+                    reply = await self.limiters[mode].run(lambda: self.ollama.generate(prompt))
+            except asyncio.TimeoutError:
+                # A single slow call only degrades this turn, not the whole process
+                print(f"Timeout in {mode} after {self.limiters[mode].timeout}s. Serving STATIC reply for this turn.")
+                self.router.record_failure(mode, "timeout")
+                self._observe(mode, "timeout", started)
+                return self._static_fallback(session, user_input)
+            except Exception as e:
+                print(f"Error in {mode}: {e}. Serving STATIC reply for this turn.")
+                self.router.record_failure(mode, repr(e))
+                self._observe(mode, "error", started)
+                return self._static_fallback(session, user_input)
+            elapsed = self._observe(mode, "ok", started, user_input, reply)
+            self.router.record_success(mode, elapsed)
+            self._record(mode, TURN, user_input, reply, elapsed, session)
+            if cache_key:
+                await self.cache.set(cache_key, reply)
+            return reply
+
+    async def astream_interviewer_response(self, session: CandidateSession, user_input: str) -> AsyncIterator[str]:
+        """
+        Streaming variant of `aget_interviewer_response`: yields reply chunks as
+        the backend produces them. STATIC replies arrive as a single chunk.
+        """
+        mode = self.mode
+        self._start_round(session, user_input)
+        if mode == "STATIC":
+            metrics.STATIC_REPLIES.inc(reason="no_backend")
+            yield self._generate_static_response(session, user_input)
+            return
+
+        cache_key = self._cache_key(session, user_input, mode)
+        cached = await self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            yield cached
+            return
+        speculated = await self._take_speculation(session, user_input, mode)
+        if speculated is not None:
+            yield speculated
+            return
+        async with self.admission[mode].slot(session.session_id, self._priority(user_input)):
+            sent_any = False
+            parts = []
+            first_chunk = None
+            started = time.perf_counter()
+            try:
+                if mode == "CLOUD_AI":
+                    chunks = self.limiters[mode].stream(lambda: self._astream_cloud_response(session, user_input))
+                elif mode == "REPLAY":
+                    turn, setup = total_turns(session.current_state), self._setup(session)
+                    chunks = self.limiters[mode].stream(lambda: self.replay.stream(TURN, user_input, turn, setup))
+                else:
+                    chunks = self.limiters[mode].stream_blocking(lambda: self._stream_local_response(session, user_input))
+                async for chunk in chunks:
+                    if chunk:
+                        if not sent_any:
+                            first_chunk = time.perf_counter() - started
+                        sent_any = True
+                        parts.append(chunk)
+                        yield chunk
+            except asyncio.TimeoutError:
+                print(f"Stream stalled in {mode} after {self.limiters[mode].timeout}s.")
+                self.router.record_failure(mode, "timeout")
+                self._observe(mode, "timeout", started, sent_any=sent_any)
+                if not sent_any:
+                    yield self._static_fallback(session, user_input)
+            except Exception as e:
+                print(f"Error in {mode} stream: {e}. Serving STATIC reply for this turn.")
+                self.router.record_failure(mode, repr(e))
+                self._observe(mode, "error", started, sent_any=sent_any)
+                if not sent_any:
+                    yield self._static_fallback(session, user_input)
+            else:
+                reply = "".join(parts)
+                elapsed = self._observe(mode, "ok", started, user_input, reply)
+                self.router.record_success(mode, elapsed)
+                self._record(mode, TURN, user_input, reply, elapsed, session, first_chunk, len(parts))
+                if cache_key:
+                    await self.cache.set(cache_key, reply)
+
+    def _observe(self, mode: str, outcome: str, started: float, user_input: str = "", reply: str = "",
+                 sent_any: bool = False) -> float:
+        """Records one backend call in the metrics; returns its latency."""
+        elapsed = time.perf_counter() - started
+        metrics.LLM_DURATION.observe(elapsed, backend=mode, outcome=outcome)
+        metrics.span("llm", elapsed, backend=mode, outcome=outcome)
+        if outcome == "ok":
+            metrics.LLM_TOKENS.inc(estimate_tokens(user_input), backend=mode, direction="prompt")
+            metrics.LLM_TOKENS.inc(estimate_tokens(reply), backend=mode, direction="completion")
+        elif not sent_any:
+            metrics.STATIC_REPLIES.inc(reason=outcome)
+        return elapsed
+
+    def _record(self, mode: str, kind: str, prompt: str, reply: str, latency: float,
+                session: Optional[CandidateSession] = None, first_chunk: Optional[float] = None,
+                chunks: Optional[int] = None):
+        """Logs a successful live call for later replay (a no-op unless LLM_RECORD_FILE is set)."""
+        if self.recorder is None or mode == "REPLAY":
+            return
+        self.recorder.record(mode, kind, prompt, reply, latency,
+                             session_id=session.session_id if session else None,
+                             turn=total_turns(session.current_state) if session else None,
+                             setup=self._setup(session) if session else None,
+                             first_chunk=first_chunk, chunks=chunks)
+
+    @staticmethod
+    def _priority(user_input: str) -> int:
+        # Openers are a new session's first call; everything else belongs to an interview under way
+        return GREETING if user_input.startswith("START_ROUND_") else TURN_PRIORITY
+
+    def _static_fallback(self, session: CandidateSession, user_input: str) -> str:
+        return self._generate_static_response(session, user_input)
+
+    def _cache_key(self, session: CandidateSession, user_input: str, mode: str) -> Optional[str]:
+        problem = self.active_problem(session)
+        return prompt_fingerprint(session, user_input, mode, problem["id"] if problem else None)
+
+    def _setup(self, session: CandidateSession) -> str:
+        # Turn recordings are keyed on it, so replay answers with this persona's and problem's reply
+        problem = self.active_problem(session)
+        return setup_fingerprint(session, problem["id"] if problem else None)
+
+    def speculate(self, session: CandidateSession):
+        """
+        Called once an interviewer message is stored: starts generating the
+        reply to the most likely next request (a hint) while the candidate is
+        reading, if the backend has idle capacity.
+        """
+        mode = self.mode
+        history = session.current_state.history
+        if not PREFETCH_ENABLED or mode == "STATIC" or not history or history[-1].role != INTERVIEWER:
+            return
+        limiter = self.limiters[mode]
+        if limiter.in_flight >= limiter.max_concurrency * PREFETCH_IDLE_FRACTION or not self.admission[mode].idle():
+            metrics.PREFETCH.inc(outcome="skipped")
+            return
+        kind = "hint"
+        request = PREDICTIONS[kind][1]
+        # Stateless prompt: the live chat must not see a turn the candidate may never take
+        prompt = self._local_prompt(session, request) if mode == "LOCAL_LLM" else \
+            standalone_prompt(session, request, self.active_problem(session))
+        self.prefetch.schedule(session.session_id, total_turns(session.current_state), kind, mode,
+                               lambda: self._complete(mode, prompt, session.session_id, BACKGROUND))
+
+    async def _take_speculation(self, session: CandidateSession, user_input: str, mode: str) -> Optional[str]:
+        # Routes append the candidate turn first, so the speculation was made one turn earlier
+        turn = total_turns(session.current_state) - 1
+        return await self.prefetch.take(session.session_id, turn, predicted_kind(user_input), mode)
+
+    def drop_session(self, session_id: str):
+        """Releases per-session backend state (called when the session store evicts a session)."""
+        self.chats.drop(session_id)
+        self.prefetch.discard(session_id)
+
+    def close(self):
+        self.prefetch.close()
+        self.router.stop()
+        for limiter in self.limiters.values():
+            limiter.shutdown()
+        self.ollama.close()
+        self.cache.save()
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def _local_prompt(self, session: CandidateSession, user_input: str) -> str:
+        brief = problem_brief(self.active_problem(session))
+        context = f"{session.round_type}. {brief}" if brief else session.round_type
+        return f"System: Strict {session.target_company} interviewer. Context: {context}. Candidate: {user_input}. Reply:"
+
+    async def _agenerate_cloud_response(self, session: CandidateSession, user_input: str) -> str:
+        chat, message = self.chats.checkout(self.model, session, user_input, self.active_problem(session))
         try:
-            response = chat.send_message(context)
-            return response.text
-        except Exception as e:
-            raise e
+            response = await chat.send_message_async(message)
+        except BaseException:
+            # Also covers timeouts: the chat may be half-updated, rebuild it next turn
+            self.chats.drop(session.session_id)
+            raise
+        self.chats.commit(session, user_input)
+        return response.text
 
-    def _generate_local_response(self, session: CandidateSession, user_input: str) -> str:
-        # Using Ollama API standard endpoint
-        prompt = f"System: Strict {session.target_company} interviewer. Context: {session.round_type}. Candidate: {user_input}. Reply:"
-        
-        payload = {
-            "model": "llama3", # Default to llama3, user can change
-            "prompt": prompt,
-            "stream": False
-        }
-        resp = requests.post("http://localhost:11434/api/generate", json=payload)
-        return resp.json().get("response", "Internal Error in Local LLM")
+    async def _astream_cloud_response(self, session: CandidateSession, user_input: str) -> AsyncIterator[str]:
+        chat, message = self.chats.checkout(self.model, session, user_input, self.active_problem(session))
+        try:
+            response = await chat.send_message_async(message, stream=True)
+            async for chunk in response:
+                yield chunk.text
+        except BaseException:
+            self.chats.drop(session.session_id)
+            raise
+        self.chats.commit(session, user_input)
+
+    def _stream_local_response(self, session: CandidateSession, user_input: str):
+        return self.ollama.stream_blocking(self._local_prompt(session, user_input))
 
     def _generate_static_response(self, session: CandidateSession, user_input: str) -> str:
         """
         The 'Super Powerful' Static Engine.
-        Uses keywords, state tracking, and pre-generated deep content.
+        Compiled trigger rules (data/static_rules.json), per-session stage
+        tracking and pre-generated deep content.
         """
-        history_len = len(session.current_state.history)
-        
-        # --- CODING ROUND LOGIC ---
-        if session.round_type == "coding":
-            # 1. Start: Give problem
-            if "START_ROUND" in user_input or history_len <= 1:
-                if not self.coding_problems: return "Error: No problems loaded."
-                problem = random.choice(self.coding_problems)
-                session.current_state.history.append({"role": "system", "content": f"PROBLEM_ID:{problem['id']}"})
-                return f"## {problem['title']}\n\n{problem['description']}\n\n**Example**: {problem['example']}\n\n**Start Coding** in the editor. Explain your thought process first."
-            
-            # 2. Hints
-            if "hint" in user_input.lower() or "stuck" in user_input.lower():
-                # Find current problem ID from history (simple hack)
-                for msg in reversed(session.current_state.history):
-                    if msg.get("role") == "system" and "PROBLEM_ID" in msg["content"]:
-                        pid = msg["content"].split(":")[1]
-                        prob = next((p for p in self.coding_problems if p["id"] == pid), None)
-                        if prob: return f"**Hint**: {prob['hint']}"
-                return "Consider the time complexity. Can you optimize it?"
-
-            # 3. Code Execution Feedback (from main.py context)
-            if "I ran this code" in user_input:
-                if "Error" in user_input:
-                    return "It seems there's a syntax or runtime error. Check your logic carefully."
-                return "The code runs. Now, what is the Time Complexity of your solution? Is it optimal?"
-
-            return "Go on. I'm listening."
-
-        # --- SYSTEM DESIGN LOGIC ---
-        elif session.round_type == "design":
-            # Start
-            if "START_ROUND" in user_input or history_len <= 1:
-                 if not self.design_problems: return "Error: No design problems loaded."
-                 problem = random.choice(self.design_problems)
-                 session.current_state.history.append({"role": "system", "content": f"PROBLEM_ID:{problem['id']}"})
-                 return f"## Design Task: {problem['title']}\n\n{problem['description']}\n\nRequirements:\n" + "\n".join(f"- {r}" for r in problem['requirements']) + "\n\nWhere would you like to start?"
-
-            # Simple State Machine based on keywords
-            if "?" in user_input:
-                return "That's a good question to clarify. Assume massive scale (100M+ users). Focus on availability."
-            
-            if "database" in user_input.lower() or "store" in user_input.lower():
-                return "Good choice. relational or NoSQL? How do you handle schemas?"
-            
-            if "load balancer" in user_input.lower():
-                return "Where exactly do you place the Load Balancer? Layer 4 or Layer 7?"
-
-            return "Makes sense. Draw the high-level architecture on the whiteboard."
-
-        # --- BEHAVIORAL LOGIC ---
-        elif session.round_type == "behavioral":
-            if "START_ROUND" in user_input or history_len <= 1:
-                if not self.behavioral_problems: return "Error: No behavioral questions loaded."
-                q = self.behavioral_problems[0]
-                return f"Let's start. **{q['question']}**\n\n(Use the STAR method: Situation, Task, Action, Result)"
-            
-            # Just cycle through prompts or ask specific STAR follow-ups
-            if len(user_input) < 50:
-                return "Can you elaborate? That seems a bit brief for a senior role."
-            
-            return "Interesting. What was the specific outcome of your ACTIONS? ( The 'R' in STAR)"
-
-        return "I am listening."
-
-    def evaluate_round(self, session: CandidateSession) -> Dict[str, Any]:
-        return {
-            "scorecard": {
-                "Technical Correctness": 3,
-                "Communication": 4,
-                "Problem Solving": 3,
-                "Code Quality": 4,
-                "System Design Scale": 3
-            },
-            "strong_signals": [
-                "Good understanding of the problem statement.",
-                "Clear communication."
-            ],
-            "weak_signals": [
-                "Could optimize time complexity further.",
-                "Detail in system components was high-level."
-            ],
-            "hiring_recommendation": "Lean Hire",
-            "detailed_feedback": "This is a STATIC evaluation (Offline Mode). In a real interview, you should focus on driving the conversation. Since this is an offline simulation, please review your code against standard solutions.",
-            "ideal_solution_summary": "Ideally, utilize a HashMap for O(1) lookups or a distributed cache like Redis for the system design component.",
-            "improvement_plan": "Practice 5 more Medium LeetCode problems this week. Review 'Designing Data-Intensive Applications' Chapter 5 (Replication).",
-            "mode": self.mode
-        }
+        return self.rules.reply(session, user_input, self.active_problem, self._round_problem)
+
+    async def aevaluate_round(self, session: CandidateSession) -> Dict[str, Any]:
+        """
+        Scores each rubric dimension with a concurrent LLM call under a shared
+        deadline; STATIC mode (and any dimension the LLM misses) uses the
+        heuristic scorer.
+        """
+        mode = self.mode
+        # The per-dimension calls are one request as far as the session's admission cap goes
+        request = Request()
+        complete = None if mode == "STATIC" else \
+            (lambda prompt: self._complete(mode, prompt, session.session_id, request=request))
+        return await evaluate(session, self.active_problem(session), mode, complete)
+
+    async def _complete(self, mode: str, prompt: str, session_id: str = "", priority: int = TURN_PRIORITY,
+                        request: Optional[Request] = None) -> str:
+        """One stateless generation (outside the interview chat), counted against the backend's breaker."""
+        async with self.admission[mode].slot(session_id, priority, request):
+            return await self._complete_admitted(mode, prompt)
+
+    async def _complete_admitted(self, mode: str, prompt: str) -> str:
+        started = time.perf_counter()
+        try:
+            if mode == "CLOUD_AI":
+                response = await self.limiters[mode].run(lambda: self.model.generate_content_async(prompt))
+                text = response.text
+            elif mode == "REPLAY":
+                text = await self.limiters[mode].run(lambda: self.replay.generate(COMPLETE, prompt))
+            else:
+                text = await self.limiters[mode].run(lambda: self.ollama.generate(prompt))
+        except asyncio.TimeoutError:
+            self.router.record_failure(mode, "timeout")
+            metrics.LLM_DURATION.observe(time.perf_counter() - started, backend=mode, outcome="timeout")
+            raise
+        except Exception as e:
+            self.router.record_failure(mode, repr(e))
+            metrics.LLM_DURATION.observe(time.perf_counter() - started, backend=mode, outcome="error")
+            raise
+        elapsed = time.perf_counter() - started
+        self.router.record_success(mode, elapsed)
+        metrics.LLM_DURATION.observe(elapsed, backend=mode, outcome="ok")
+        self._record(mode, COMPLETE, prompt, text, elapsed)
+        return text
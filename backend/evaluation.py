@@ -0,0 +1,420 @@
+import asyncio
+import json
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .history import summary_preamble, total_turns
+from .models import CandidateSession, InterviewState, CANDIDATE
+
+EVAL_DEADLINE_SECONDS = float(os.getenv("EVAL_DEADLINE_SECONDS", "20"))
+EVAL_TRANSCRIPT_CHARS = int(os.getenv("EVAL_TRANSCRIPT_CHARS", "12000"))
+
+# Rubric per round type: dimension -> what the interviewer is judging
+RUBRICS = {
+    "coding": {
+        "Technical Correctness": "Does the final code solve the problem, including edge cases? Weigh the test results heavily.",
+        "Problem Solving": "Clarifies the problem, explores approaches and moves from a brute force to an optimized solution.",
+        "Complexity Analysis": "States and justifies the time and space complexity of the solution.",
+        "Code Quality": "Readable, idiomatic, well-structured code with meaningful names.",
+        "Communication": "Explains their thinking clearly and concisely while working.",
+    },
+    "design": {
+        "Requirements Gathering": "Asks about functional requirements, scale (DAU, QPS, storage) and constraints before designing.",
+        "High-Level Architecture": "Proposes a coherent set of components (APIs, services, storage, caches, queues).",
+        "System Design Scale": "Handles growth: sharding, replication, caching, hot spots, back-of-envelope numbers.",
+        "Tradeoffs": "Compares alternatives and justifies choices (consistency vs availability, push vs pull, ...).",
+        "Communication": "Drives the discussion in a structured, easy to follow way.",
+    },
+    "behavioral": {
+        "STAR Structure": "Answers follow Situation, Task, Action, Result.",
+        "Ownership": "Describes their own actions and decisions rather than the team's.",
+        "Impact": "Quantifies the outcome and its effect on customers or the business.",
+        "Self-Reflection": "Shows what they learned and what they would do differently.",
+        "Communication": "Stories are concise, specific and easy to follow.",
+    },
+}
+
+IMPROVEMENT_TIPS = {
+    "Technical Correctness": "Before running, trace the code on the examples plus an empty and a single-element input.",
+    "Problem Solving": "Start every problem by restating it, asking 2-3 clarifying questions and naming a brute force first.",
+    "Complexity Analysis": "State the time and space complexity of every approach you propose, not only the final one.",
+    "Code Quality": "Use descriptive names and small helper functions; remove placeholder code before running.",
+    "Communication": "Narrate decisions in short sentences: what you are about to do and why.",
+    "Requirements Gathering": "Spend the first 5 minutes on requirements and scale estimates (DAU, QPS, storage).",
+    "High-Level Architecture": "Sketch the request path end to end (client, LB, services, storage) before deep dives.",
+    "System Design Scale": "Practise back-of-envelope math and know when to shard, replicate and cache.",
+    "Tradeoffs": "For every component choice, name one alternative and why you rejected it.",
+    "STAR Structure": "Prepare 6-8 stories written out as Situation / Task / Action / Result.",
+    "Ownership": "Say 'I' for your actions; describe the team's role separately.",
+    "Impact": "Attach a number to every result (latency, revenue, users, hours saved).",
+    "Self-Reflection": "End each story with what you learned and what you changed afterwards.",
+}
+
+RECOMMENDATIONS = [(4.2, "Strong Hire"), (3.5, "Hire"), (2.8, "Lean Hire"), (2.0, "Lean No Hire"), (0.0, "No Hire")]
+# Senior levels need a higher average for the same recommendation
+LEVEL_BAR = {"L3": -0.3, "L4": 0.0, "L5": 0.3, "L6": 0.5}
+
+_CODE_BLOCK = re.compile(r"```.*?```", re.DOTALL)
+_BIG_O = re.compile(r"\bo\([^)]{1,15}\)")
+_NUMBER_IMPACT = re.compile(r"\d+(?:\.\d+)?\s*(?:%|percent|x\b|ms\b|users|customers|hours|days|weeks|k\b|m\b|\$)")
+_IDENTIFIER = re.compile(r"\b([a-zA-Z_]\w*)\s*=")
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+APPROACH_WORDS = ("brute force", "optimiz", "hash map", "hashmap", "dictionary", "two pointer", "sliding window",
+                  "binary search", "sort", "heap", "stack", "recurs", "dynamic programming", "memo", "bfs", "dfs",
+                  "greedy", "prefix sum")
+EDGE_WORDS = ("edge case", "empty", "null", "none", "duplicate", "negative", "overflow", "boundary")
+COMPONENT_WORDS = ("load balancer", "cache", "redis", "cdn", "shard", "partition", "replica", "queue", "kafka",
+                   "database", "sql", "index", "gateway", "service", "consistent hashing", "rate limit", "blob")
+SCALE_WORDS = ("dau", "qps", "rps", "million", "billion", "throughput", "latency", "scale", "horizontal", "p99",
+               "bandwidth", "storage", "peak")
+TRADEOFF_WORDS = ("trade-off", "tradeoff", "trade off", "instead of", "versus", " vs", "pros", "cons", "however",
+                  "downside", "on the other hand", "consistency", "availability")
+STAR_WORDS = ("situation", "task", "action", "result")
+REFLECTION_WORDS = ("learn", "differently", "next time", "hindsight", "mistake", "improve", "retrospective")
+
+Scores = Dict[str, Tuple[int, str]]
+
+
+def record_run(state: InterviewState, result: Dict[str, Any]):
+    """Keeps the evidence the scorer needs from a sandbox run (the code itself is in state.last_code)."""
+    state.code_runs += 1
+    if result.get("error"):
+        state.code_errors += 1
+    # Every field describes the latest run only; nothing carries over from an earlier submission
+    judge = result.get("judge")
+    if judge:
+        # A judge error (entry point not defined) means nothing passed
+        state.tests_passed = 0 if judge.get("error") else judge["passed"]
+        state.tests_total = judge["total"]
+    elif result.get("error"):
+        # Failed before the tests ran (syntax error, crash, timeout): none of them passed
+        state.tests_passed = 0
+    else:
+        # Nothing was judged (the problem has no test cases)
+        state.tests_passed = state.tests_total = 0
+    profile = result.get("profile")
+    if profile and profile.get("estimate"):
+        state.complexity = {key: profile[key] for key in ("estimate", "time_slope", "memory_slope")}
+    else:
+        state.complexity = None
+
+
+def rubric_for(round_type: str) -> Dict[str, str]:
+    return RUBRICS.get(round_type, RUBRICS["coding"])
+
+
+def _count(text: str, words) -> int:
+    return sum(1 for word in words if word in text)
+
+
+def _ladder(value: float, steps) -> int:
+    """1 plus the number of thresholds `value` reaches, i.e. a 1-5 score for four steps."""
+    return 1 + sum(1 for step in steps if value >= step)
+
+
+def gather_evidence(session: CandidateSession) -> Dict[str, Any]:
+    state = session.current_state
+    texts = [line[len("Candidate: "):] for line in state.summary.splitlines() if line.startswith("Candidate: ")]
+    texts += [turn.content for turn in state.history if turn.role == CANDIDATE]
+    texts = [t for t in texts if not t.startswith("I ran")]
+    prose = _CODE_BLOCK.sub(" ", "\n".join(texts)).lower()
+    words = re.findall(r"[a-z']+", prose)
+    return {
+        "answers": len(texts),
+        "words": len(words),
+        "avg_words": len(words) / len(texts) if texts else 0.0,
+        "questions": prose.count("?"),
+        "prose": prose,
+        "i_count": sum(1 for w in words if w in ("i", "i'd", "i'm", "my", "me")),
+        "we_count": sum(1 for w in words if w in ("we", "we'd", "our", "us")),
+        "code": state.last_code or "",
+        "code_runs": state.code_runs,
+        "code_errors": state.code_errors,
+        "tests_passed": state.tests_passed,
+        "tests_total": state.tests_total,
+        "measured": (state.complexity or {}).get("estimate"),
+    }
+
+
+def _communication(ev: Dict[str, Any]) -> Tuple[int, str]:
+    if not ev["answers"]:
+        return 1, "No answers to assess."
+    avg = ev["avg_words"]
+    if avg > 150:
+        return 3, f"{ev['answers']} answers averaging {avg:.0f} words; answers run long."
+    # Very short answers lack substance
+    return _ladder(avg, (5, 12, 25, 40)), f"{ev['answers']} answers averaging {avg:.0f} words."
+
+
+def _technical_correctness(ev: Dict[str, Any]) -> Tuple[int, str]:
+    if ev["tests_total"]:
+        rate = ev["tests_passed"] / ev["tests_total"]
+        return 1 + round(4 * rate), f"{ev['tests_passed']}/{ev['tests_total']} tests passed on the latest run."
+    if ev["code_runs"]:
+        clean = ev["code_runs"] - ev["code_errors"]
+        return (3 if clean else 2), f"{clean} of {ev['code_runs']} runs completed without errors; no tests were judged."
+    return 1, "No code was run."
+
+
+def _problem_solving(ev: Dict[str, Any]) -> Tuple[int, str]:
+    approaches = _count(ev["prose"], APPROACH_WORDS)
+    edges = _count(ev["prose"], EDGE_WORDS)
+    signal = approaches + edges + min(ev["questions"], 3)
+    return _ladder(signal, (1, 3, 5, 7)), \
+        f"{approaches} approach ideas, {edges} edge-case mentions, {ev['questions']} clarifying questions."
+
+
+def normalize_big_o(text: str) -> str:
+    """'O(N log N)', 'o(nlogn)', 'O(n**2)', 'O(n²)' -> the profiler's spelling ('o(n log n)', 'o(n^2)')."""
+    inner = re.sub(r"\s+", "", text.lower())[2:-1].replace("**", "^").replace("²", "^2").replace("*", "")
+    inner = inner.replace("nlogn", "n log n").replace("logn", "log n")
+    return f"o({inner})"
+
+
+def _complexity(ev: Dict[str, Any]) -> Tuple[int, str]:
+    stated = _BIG_O.findall(ev["prose"])
+    mentions = len(stated) + _count(ev["prose"], ("time complexity", "space complexity"))
+    score, note = _ladder(mentions, (1, 2, 3, 5)), f"{mentions} complexity statements."
+    measured = ev["measured"]
+    if measured and stated:
+        # Claims checked against the growth measured in the sandbox
+        if measured.lower() in {normalize_big_o(claim) for claim in stated}:
+            score, note = min(5, score + 1), note + f" Matches the measured {measured}."
+        else:
+            score, note = max(1, score - 1), note + f" None match the measured {measured}."
+    return score, note
+
+
+def _code_quality(ev: Dict[str, Any]) -> Tuple[int, str]:
+    code = ev["code"]
+    if not code.strip():
+        return 1, "No code submitted."
+    lines = [line for line in code.splitlines() if line.strip()]
+    names = _IDENTIFIER.findall(code)
+    short = sum(1 for name in names if len(name) == 1 and name not in ("i", "j", "k", "n"))
+    points = [
+        "def " in code,
+        "pass" not in [line.strip() for line in lines],
+        not names or short / len(names) < 0.3,
+        all(len(line) <= 100 for line in lines),
+    ]
+    return 1 + sum(points), f"{len(lines)} lines of code; {short} unclear single-letter names."
+
+
+def _requirements(ev: Dict[str, Any]) -> Tuple[int, str]:
+    scale = _count(ev["prose"], SCALE_WORDS)
+    return _ladder(min(ev["questions"], 4) + scale, (1, 3, 5, 7)), \
+        f"{ev['questions']} questions, {scale} scale/requirement terms."
+
+
+def _architecture(ev: Dict[str, Any]) -> Tuple[int, str]:
+    components = _count(ev["prose"], COMPONENT_WORDS)
+    return _ladder(components, (1, 3, 5, 7)), f"{components} distinct components discussed."
+
+
+def _scale(ev: Dict[str, Any]) -> Tuple[int, str]:
+    scaling = _count(ev["prose"], ("shard", "partition", "replica", "cache", "consistent hashing", "cdn", "queue"))
+    numbers = len(re.findall(r"\d", ev["prose"]))
+    return _ladder(scaling + min(numbers, 4) / 2, (1, 2, 4, 6)), f"{scaling} scaling techniques mentioned."
+
+
+def _tradeoffs(ev: Dict[str, Any]) -> Tuple[int, str]:
+    tradeoffs = _count(ev["prose"], TRADEOFF_WORDS)
+    return _ladder(tradeoffs, (1, 2, 4, 6)), f"{tradeoffs} trade-off markers."
+
+
+def _star(ev: Dict[str, Any]) -> Tuple[int, str]:
+    parts = _count(ev["prose"], STAR_WORDS)
+    return 1 + parts, f"{parts}/4 STAR parts made explicit."
+
+
+def _ownership(ev: Dict[str, Any]) -> Tuple[int, str]:
+    total = ev["i_count"] + ev["we_count"]
+    if not total:
+        return 2, "Little personal attribution either way."
+    ratio = ev["i_count"] / total
+    return _ladder(ratio, (0.2, 0.4, 0.6, 0.75)), f"{ratio:.0%} of attributions are first person singular."
+
+
+def _impact(ev: Dict[str, Any]) -> Tuple[int, str]:
+    numbers = len(_NUMBER_IMPACT.findall(ev["prose"]))
+    return _ladder(numbers, (1, 2, 3, 5)), f"{numbers} quantified outcomes."
+
+
+def _reflection(ev: Dict[str, Any]) -> Tuple[int, str]:
+    mentions = _count(ev["prose"], REFLECTION_WORDS)
+    return _ladder(mentions, (1, 2, 3, 5)), f"{mentions} reflection markers."
+
+
+HEURISTICS: Dict[str, Callable[[Dict[str, Any]], Tuple[int, str]]] = {
+    "Technical Correctness": _technical_correctness,
+    "Problem Solving": _problem_solving,
+    "Complexity Analysis": _complexity,
+    "Code Quality": _code_quality,
+    "Communication": _communication,
+    "Requirements Gathering": _requirements,
+    "High-Level Architecture": _architecture,
+    "System Design Scale": _scale,
+    "Tradeoffs": _tradeoffs,
+    "STAR Structure": _star,
+    "Ownership": _ownership,
+    "Impact": _impact,
+    "Self-Reflection": _reflection,
+}
+
+
+def heuristic_scores(session: CandidateSession) -> Scores:
+    """Deterministic per-dimension scores from keyword, complexity and test signals."""
+    evidence = gather_evidence(session)
+    return {name: HEURISTICS[name](evidence) for name in rubric_for(session.round_type)}
+
+
+def transcript(session: CandidateSession, max_chars: int = EVAL_TRANSCRIPT_CHARS) -> str:
+    state = session.current_state
+    lines = [f"{turn.role.capitalize()}: {turn.content}" for turn in state.history]
+    text = "\n\n".join(lines)
+    if len(text) > max_chars:
+        text = "... " + text[-max_chars:]
+    preamble = summary_preamble(state)
+    return f"{preamble}\n\n{text}" if preamble else text
+
+
+def dimension_prompt(session: CandidateSession, dimension: str, description: str, conversation: str) -> str:
+    state = session.current_state
+    tests = f"{state.tests_passed}/{state.tests_total} tests passed" if state.tests_total else "no tests judged"
+    if state.complexity:
+        tests += f", measured time complexity {state.complexity['estimate']}"
+    return (
+        f"You are scoring a {session.target_company} {session.round_type} interview for a "
+        f"{session.target_level} {session.target_role} candidate.\n"
+        f"Score ONLY this dimension: {dimension} - {description}\n"
+        f"Code runs: {state.code_runs} ({state.code_errors} with errors), {tests}.\n\n"
+        f"Transcript:\n{conversation}\n\n"
+        'Reply with JSON only: {"score": <integer 1-5>, "evidence": "<one sentence citing the transcript>"}'
+    )
+
+
+def parse_dimension_reply(text: str) -> Optional[Tuple[int, str]]:
+    match = _JSON_OBJECT.search(text or "")
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+        score = int(data["score"])
+    except (ValueError, KeyError, TypeError):
+        return None
+    return max(1, min(5, score)), str(data.get("evidence", "")).strip()[:300]
+
+
+async def llm_scores(complete: Callable[[str], Awaitable[str]], session: CandidateSession,
+                     deadline: float = EVAL_DEADLINE_SECONDS) -> Tuple[Scores, int]:
+    """
+    Scores every rubric dimension with its own LLM call, all in flight at once
+    under one shared deadline. Dimensions that time out, fail or return
+    unparseable output keep their heuristic score. Returns (scores, number
+    of dimensions the LLM scored).
+    """
+    rubric = rubric_for(session.round_type)
+    scores = heuristic_scores(session)
+    conversation = transcript(session)
+    tasks = {name: asyncio.ensure_future(complete(dimension_prompt(session, name, description, conversation)))
+             for name, description in rubric.items()}
+    done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+    for task in pending:
+        task.cancel()
+    scored = 0
+    for name, task in tasks.items():
+        if task not in done or task.exception() is not None:
+            continue
+        parsed = parse_dimension_reply(task.result())
+        if parsed:
+            scores[name] = parsed
+            scored += 1
+    return scores, scored
+
+
+def _ideal_solution(session: CandidateSession, problem: Optional[Dict[str, Any]]) -> str:
+    if not problem:
+        return "Top candidates clarify first, state a plan, then execute and verify it out loud."
+    if session.round_type == "design":
+        stages = problem.get("stages", {})
+        return " ".join(stages.get(key, "") for key in ("high_level", "deep_dive")).strip()
+    if session.round_type == "behavioral":
+        guide = problem.get("star_guide", {})
+        return " ".join(f"{part}:{text}" for part, text in guide.items())
+    return f"{problem.get('title', 'This problem')}: {problem.get('hint', '')}".strip()
+
+
+def build_report(session: CandidateSession, scores: Scores, problem: Optional[Dict[str, Any]], mode: str,
+                 scoring: str) -> Dict[str, Any]:
+    ranked = sorted(scores.items(), key=lambda item: item[1][0])
+    average = sum(score for score, _ in scores.values()) / len(scores)
+    bar = LEVEL_BAR.get(session.target_level, 0.0)
+    recommendation = next(label for threshold, label in RECOMMENDATIONS if average >= threshold + bar or threshold == 0)
+    strong = [f"{name}: {note}" for name, (score, note) in reversed(ranked) if score >= 4]
+    weak = [f"{name}: {note}" for name, (score, note) in ranked if score <= 2]
+    if not strong:
+        name, (_, note) = ranked[-1]
+        strong = [f"Relative strength - {name}: {note}"]
+    if not weak:
+        name, (_, note) = ranked[0]
+        weak = [f"Most room to grow - {name}: {note}"]
+    weakest = [name for name, _ in ranked[:2]]
+    return {
+        "scorecard": {name: score for name, (score, _) in scores.items()},
+        "strong_signals": strong,
+        "weak_signals": weak,
+        "hiring_recommendation": recommendation,
+        "detailed_feedback": f"Average {average:.1f}/5 across {len(scores)} dimensions for a {session.target_level} "
+                             f"bar. " + " ".join(f"{name} {score}/5 - {note}" for name, (score, note) in scores.items()),
+        "ideal_solution_summary": _ideal_solution(session, problem),
+        "improvement_plan": " ".join(IMPROVEMENT_TIPS.get(name, "") for name in weakest).strip(),
+        "mode": mode,
+        "scoring": scoring,
+    }
+
+
+def cached_evaluation(state: InterviewState, mode: str, llm: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    The stored report if nothing happened in the interview since it was
+    produced by the same backend. With `llm`, a report that fell back to
+    heuristic scores (backend down or past the deadline) is not reused.
+    """
+    report = state.evaluation
+    if report is None or state.evaluated_turns != total_turns(state) or report.get("mode") != mode:
+        return None
+    if llm and report.get("scoring") != "llm":
+        return None
+    return report
+
+
+def evaluate_heuristic(session: CandidateSession, problem: Optional[Dict[str, Any]], mode: str) -> Dict[str, Any]:
+    state = session.current_state
+    report = cached_evaluation(state, mode)
+    if report is None:
+        report = build_report(session, heuristic_scores(session), problem, mode, "heuristic")
+        state.evaluation, state.evaluated_turns = report, total_turns(state)
+    return report
+
+
+async def evaluate(session: CandidateSession, problem: Optional[Dict[str, Any]], mode: str,
+                   complete: Optional[Callable[[str], Awaitable[str]]] = None,
+                   deadline: float = EVAL_DEADLINE_SECONDS) -> Dict[str, Any]:
+    """
+    Scores the round: per-dimension LLM calls when `complete` is given,
+    otherwise the heuristic scorer. The report is cached on the session state
+    until the interview moves on or the backend changes, so repeated calls
+    are free.
+    """
+    if complete is None:
+        return evaluate_heuristic(session, problem, mode)
+    state = session.current_state
+    report = cached_evaluation(state, mode, llm=True)
+    if report is None:
+        scores, scored = await llm_scores(complete, session, deadline)
+        scoring = "llm" if scored == len(scores) else ("mixed" if scored else "heuristic")
+        report = build_report(session, scores, problem, mode, scoring)
+        state.evaluation, state.evaluated_turns = report, total_turns(state)
+    return report
@@ -0,0 +1,114 @@
+import difflib
+import hashlib
+import os
+import re
+from typing import Optional, Tuple
+
+from .models import InterviewState, Turn, CANDIDATE
+
+# Turns kept verbatim; older ones are folded into InterviewState.summary
+HISTORY_VERBATIM_TURNS = int(os.getenv("HISTORY_VERBATIM_TURNS", "12"))
+HISTORY_SUMMARY_CHARS = int(os.getenv("HISTORY_SUMMARY_CHARS", "2000"))
+# Program output kept in the stored turn (the current reply still sees all of it)
+HISTORY_OUTPUT_CHARS = int(os.getenv("HISTORY_OUTPUT_CHARS", "1000"))
+GIST_CHARS = 160
+MAX_CODE_HASHES = 50
+
+_CODE_BLOCK = re.compile(r"```.*?```", re.DOTALL)
+_WHITESPACE = re.compile(r"\s+")
+_SENTENCE_END = re.compile(r"(?<=[.?!])\s")
+_RUN_SIGNALS = ("Tests:", "Profile:", "Error", "Timed out")
+
+
+def code_hash(code: str) -> str:
+    normalized = "\n".join(line.rstrip() for line in code.strip().splitlines())
+    return hashlib.sha256(normalized.encode()).hexdigest()[:12]
+
+
+def _clip(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}\n... ({len(text) - limit} more chars)"
+
+
+def code_run_messages(state: InterviewState, code: str, output: str,
+                      report: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Builds the candidate turn for a code run. Returns (prompt, record): the
+    prompt carries the full code for this turn's reply; the record kept in
+    history references a repeated submission by hash, or stores only the diff
+    against the previous submission when that is shorter.
+    """
+    results = f"Output:\n```\n{output}\n```"
+    if report:
+        results += f"\n\n```\n{report}\n```"
+    prompt = f"I ran this code:\n```python\n{code}\n```\n\n{results}"
+
+    digest = code_hash(code)
+    if digest in state.code_hashes:
+        body = f"I ran the same code again (submission #{state.code_hashes.index(digest) + 1}, sha {digest})."
+    else:
+        body = f"I ran this code (sha {digest}):\n```python\n{code}\n```"
+        if state.last_code is not None:
+            diff = "\n".join(difflib.unified_diff(state.last_code.splitlines(), code.splitlines(),
+                                                  "previous", "current", n=1, lineterm=""))
+            if len(diff) < len(code):
+                body = f"I ran an edited version of my code (sha {digest}):\n```diff\n{diff}\n```"
+        state.code_hashes.append(digest)
+        del state.code_hashes[:-MAX_CODE_HASHES]
+    state.last_code = code
+
+    record_results = f"Output:\n```\n{_clip(output, HISTORY_OUTPUT_CHARS)}\n```"
+    if report:
+        record_results += f"\n\n```\n{report}\n```"
+    return prompt, f"{body}\n\n{record_results}"
+
+
+def gist(turn: Turn) -> str:
+    """One summary line for a turn: first sentence, with code reduced to its run outcome."""
+    role = "Candidate" if turn.role == CANDIDATE else "Interviewer"
+    content = turn.content
+    if content.startswith("I ran"):
+        headline = content.splitlines()[0].rstrip(":")
+        signals = [line.strip() for line in content.splitlines() if line.strip().startswith(_RUN_SIGNALS)]
+        text = "; ".join([headline] + signals[:2])
+    else:
+        text = _WHITESPACE.sub(" ", _CODE_BLOCK.sub("[code]", content)).strip()
+        text = _SENTENCE_END.split(text, 1)[0]
+    if len(text) > GIST_CHARS:
+        text = text[:GIST_CHARS - 3] + "..."
+    return f"{role}: {text}"
+
+
+def compact(state: InterviewState, keep: int = HISTORY_VERBATIM_TURNS,
+            max_summary: int = HISTORY_SUMMARY_CHARS) -> int:
+    """
+    Folds turns older than the last `keep` into the running summary. Runs only
+    once the history has grown half a window past `keep`, so the work (and the
+    chat rebuild it causes) is amortized over several turns. Returns the number
+    of turns folded.
+    """
+    history = state.history
+    excess = len(history) - keep
+    if excess < max(1, keep // 2):
+        return 0
+    lines = state.summary.splitlines() if state.summary else []
+    lines.extend(gist(turn) for turn in history[:excess])
+    # Oldest gists go first once the summary is over budget
+    total = sum(len(line) + 1 for line in lines)
+    while lines and total > max_summary:
+        total -= len(lines.pop(0)) + 1
+    state.summary = "\n".join(lines)
+    del history[:excess]
+    state.compacted_turns += excess
+    return excess
+
+
+def summary_preamble(state: InterviewState) -> str:
+    if not state.summary:
+        return ""
+    return f"Summary of the interview so far ({state.compacted_turns} earlier turns):\n{state.summary}"
+
+
+def total_turns(state: InterviewState) -> int:
+    return state.compacted_turns + len(state.history)
@@ -0,0 +1,82 @@
+import os
+import re
+from typing import Any, Dict, Optional
+
+from .sandbox import SandboxPool
+
+# Profile growth (time/memory vs input size) whenever a run passes every test
+PROFILE_ON_PASS = os.getenv("PROFILE_ON_PASS", "1") == "1"
+
+_ENTRY_POINT = re.compile(r"^def\s+(\w+)\s*\(", re.MULTILINE)
+
+
+def entry_point(problem: Dict[str, Any]) -> Optional[str]:
+    """Name of the function the candidate implements, taken from the problem's starter code."""
+    if problem.get("entry_point"):
+        return problem["entry_point"]
+    match = _ENTRY_POINT.search(problem.get("default_code", ""))
+    return match.group(1) if match else None
+
+
+def judge_spec(problem: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Judge payload for the sandbox, or None if the problem can't be auto-judged."""
+    if not problem or not problem.get("test_cases"):
+        return None
+    name = entry_point(problem)
+    if name is None:
+        return None
+    return {"entry_point": name, "test_cases": problem["test_cases"]}
+
+
+async def run_with_judge(sandbox: SandboxPool, code: str, problem: Optional[Dict[str, Any]],
+                         profile: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Executes the candidate's code and, when the problem ships test cases,
+    runs all of them in the same sandbox invocation. `profile` also times the
+    solution at growing input sizes (None: only if every test passes, per
+    PROFILE_ON_PASS); the estimate lands in result["profile"].
+    """
+    spec = judge_spec(problem)
+    if spec is None:
+        return await sandbox.run(code)
+    job: Dict[str, Any] = {"judge": spec}
+    if profile or (profile is None and PROFILE_ON_PASS):
+        # numpy only loads once something is profiled
+        from . import profiler
+        profile_spec = profiler.profile_spec(problem, spec["entry_point"], require_passing=profile is None)
+        if profile_spec is not None:
+            job["profile"] = profile_spec
+    result = await sandbox.run(code, **job)
+    if result.get("profile"):
+        from . import profiler
+        result["profile"] = profiler.analyze(result["profile"])
+    return result
+
+
+def format_report(judge: Dict[str, Any]) -> str:
+    """Compact, human-readable judge summary (shown to the candidate and fed to the interviewer)."""
+    if judge.get("error"):
+        return f"Tests: could not run ({judge['error']})"
+    lines = [f"Tests: {judge['passed']}/{judge['total']} passed"]
+    for case in judge["cases"]:
+        status = "PASS" if case["passed"] else "FAIL"
+        line = f"  [{status}] #{case['index'] + 1} {case['input']}"
+        if "error" in case:
+            line += f" -> {case['error']}"
+        else:
+            if not case["passed"]:
+                line += f" -> got {case['actual']}, expected {case['expected']}"
+            line += f" ({case['runtime_ms']:.3f} ms, peak {case['peak_kb']:.1f} KB)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def format_run(result: Dict[str, Any]) -> Optional[str]:
+    """Judge summary plus the profile line, if the run had either."""
+    lines = []
+    if result.get("judge"):
+        lines.append(format_report(result["judge"]))
+    if result.get("profile"):
+        from .profiler import format_profile
+        lines.append(format_profile(result["profile"]))
+    return "\n".join(lines) or None
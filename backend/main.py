@@ -1,12 +1,23 @@
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Any
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
+from typing import AsyncIterator, Optional
+import asyncio
+import json
 import uuid
 
-from .models import CandidateSession, InterviewState, InterviewState
+from .models import CandidateSession, InterviewState, Turn, CANDIDATE, INTERVIEWER
 from .engine import InterviewEngine
 from .offline_engine import OfflineEngine
 from .personas import COMPANY_PERSONAS
+from .sandbox import SandboxPool, SandboxBusy
+from .judge import run_with_judge, format_run
+from .session_store import SessionConflict, create_session_store
+from .shared_state import create_shared_state
+from .history import compact, code_run_messages
+from .evaluation import record_run
+from .admission import Overloaded
+from . import metrics
 
 app = FastAPI(title="FAANG Interview Simulator API")
 
@@ -18,27 +29,135 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory session storage
-sessions: Dict[str, CandidateSession] = {}
+# Outermost, so timings include CORS handling
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request, exc: Overloaded):
+    # Shed by admission control: fail fast and tell the client when to come back
+    return JSONResponse({"detail": exc.detail}, status_code=exc.status_code,
+                        headers={"Retry-After": str(exc.retry_after)})
+
+@app.exception_handler(SessionConflict)
+async def session_conflict_handler(request, exc: SessionConflict):
+    # Another worker stored this session meanwhile; saving would silently drop its turn
+    return JSONResponse({"detail": "Session was updated by another request. Reload it and retry."},
+                        status_code=409)
+
+# State every worker must see (sessions, breaker state, cached replies); None = this process only
+shared = create_shared_state()
+# Session storage: bounded in-memory LRU, SQLite shared across workers, or the shared backend (SESSION_STORE)
+sessions = create_session_store(shared=shared)
 engine = None
+sandbox = SandboxPool()
+# Background idle-session sweep, cancelled on shutdown
+sweeper: Optional[asyncio.Task] = None
+
+# Store calls can be Redis or SQLite round-trips, so they run off the event loop
+async def get_session(session_id: str) -> CandidateSession:
+    session = await asyncio.to_thread(sessions.get, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+async def save_session(session: CandidateSession):
+    # Bounded history: old turns fold into the running summary before the session is stored
+    compact(session.current_state)
+    await asyncio.to_thread(sessions.save, session)
+    if hasattr(engine, "speculate"):
+        engine.speculate(session)
+
+async def sweep_sessions():
+    while True:
+        await asyncio.sleep(60)
+        evicted = await asyncio.to_thread(sessions.sweep)
+        if evicted:
+            print(f"Evicted {evicted} idle sessions")
+
+def register_metrics():
+    """Scrape-time metrics: read straight from live state, nothing is updated per request."""
+    registry = metrics.REGISTRY
+    registry.collect("sessions_live", "Sessions held by the session store", "gauge", lambda: len(sessions))
+    registry.collect("sandbox_queue_depth", "Executions waiting for a sandbox worker", "gauge",
+                     lambda: sandbox.queue_depth)
+    registry.collect("engine_mode", "Backend currently serving replies (1 = active)", "gauge",
+                     lambda: {(getattr(engine, "mode", "STATIC"),): 1}, ("mode",))
+    if hasattr(engine, "limiters"):
+        registry.collect("llm_in_flight", "LLM calls currently running per backend", "gauge",
+                         lambda: {(name,): l.in_flight for name, l in engine.limiters.items()}, ("backend",))
+    if hasattr(engine, "router"):
+        registry.collect("llm_backend_up", "1 if the backend's circuit breaker is closed", "gauge",
+                         lambda: {(name,): int(b.readiness == "ready") for name, b in engine.router.breakers.items()},
+                         ("backend",))
+    if hasattr(engine, "cache"):
+        for stat in ("hits", "misses", "evictions"):
+            registry.collect(f"response_cache_{stat}_total", f"Response cache {stat}", "counter",
+                             lambda stat=stat: engine.cache.stats()[stat])
+        registry.collect("response_cache_entries", "Replies held in the response cache", "gauge",
+                         lambda: engine.cache.stats()["entries"])
+    if hasattr(engine, "admission"):
+        registry.collect("llm_admission_waiting", "LLM calls queued for admission per backend", "gauge",
+                         lambda: {(name,): s.waiting for name, s in engine.admission.items()}, ("backend",))
+    if hasattr(engine, "ollama"):
+        registry.collect("ollama_requests_total", "Local LLM requests by how they were served", "counter",
+                         lambda: {("upstream",): engine.ollama.stats["upstream_calls"],
+                                  ("coalesced",): engine.ollama.stats["coalesced"]}, ("path",))
 
 @app.on_event("startup")
 async def startup_event():
-    global engine
+    global engine, sweeper
+    await sandbox.start()
+    sweeper = asyncio.create_task(sweep_sessions())
     try:
-        engine = InterviewEngine()
+        engine = InterviewEngine(shared=shared)
+        engine.start()
+        # Evictions happen inside store calls, which run in worker threads; the engine state belongs to the loop
+        loop = asyncio.get_running_loop()
+        sessions.on_evict(lambda session_id: loop.call_soon_threadsafe(engine.drop_session, session_id))
         print("InterviewEngine initialized successfully")
     except Exception as e:
         print(f"Failed to initialize InterviewEngine: {e}")
         print("Falling back to OfflineEngine (Static Mode)")
         engine = OfflineEngine()
+    register_metrics()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if sweeper is not None:
+        sweeper.cancel()
+        try:
+            await sweeper
+        except asyncio.CancelledError:
+            pass
+    await sandbox.close()
+    if hasattr(engine, "close"):
+        engine.close()
+    if shared is not None:
+        shared.close()
 
 @app.get("/health")
 async def health_check():
+    """
+    Liveness plus per-backend readiness (ready / warming / down). The app is
+    serviceable as soon as STATIC mode is up, even while LLM backends warm up.
+    """
     if engine is None:
-        return {"status": "degraded", "details": "Engine not initialized"}, 503
-    return {"status": "ok"}
+        return JSONResponse({"status": "degraded", "details": "Engine not initialized"}, status_code=503)
+    router = getattr(engine, "router", None)
+    return {
+        "status": "ok",
+        "mode": getattr(engine, "mode", "STATIC"),
+        "backends": router.status()["backends"] if router else {},
+    }
+
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text exposition format."""
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 @app.post("/session/start")
 async def start_session(
@@ -76,85 +195,170 @@ async def start_session(
         current_state=initial_state
     )
     
+    # Resume/JD are vectorized once here; problem choice and the persona prompt use the result
+    await asyncio.to_thread(engine.ingest_profile, session)
+
     # Generate initial greeting from interviewer
-    greeting = engine.get_interviewer_response(session, f"START_ROUND_{round_type.upper()}")
+    greeting = await engine.aget_interviewer_response(session, f"START_ROUND_{round_type.upper()}")
     
-    session.current_state.history.append({"role": "interviewer", "content": greeting})
-    sessions[session_id] = session
+    session.current_state.history.append(Turn(INTERVIEWER, greeting))
+    await save_session(session)
     
     return {"session_id": session_id, "interviewer_message": greeting}
 
 @app.post("/session/{session_id}/respond")
 async def respond(session_id: str, candidate_message: str = Body(...)):
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
-    session.current_state.history.append({"role": "candidate", "content": candidate_message})
+    session = await get_session(session_id)
+    session.current_state.history.append(Turn(CANDIDATE, candidate_message))
     
     if engine is None:
          raise HTTPException(status_code=503, detail="Interview Engine not available")
 
-    interviewer_response = engine.get_interviewer_response(session, candidate_message)
+    try:
+        interviewer_response = await engine.aget_interviewer_response(session, candidate_message)
+    except Overloaded:
+        # The turn never happened; the client retries it after Retry-After
+        session.current_state.history.pop()
+        raise
 
-    session.current_state.history.append({"role": "interviewer", "content": interviewer_response})
+    session.current_state.history.append(Turn(INTERVIEWER, interviewer_response))
+    await save_session(session)
     
     return {"interviewer_message": interviewer_response}
 
+async def stream_turn(session: CandidateSession, candidate_message: str) -> AsyncIterator[str]:
+    """Relays interviewer chunks and records the assembled reply once the stream completes."""
+    session.current_state.history.append(Turn(CANDIDATE, candidate_message))
+    parts = []
+    try:
+        async for chunk in engine.astream_interviewer_response(session, candidate_message):
+            parts.append(chunk)
+            yield chunk
+    except Overloaded:
+        # Shed before the first chunk: the turn never happened
+        session.current_state.history.pop()
+        raise
+    session.current_state.history.append(Turn(INTERVIEWER, "".join(parts)))
+    await save_session(session)
+
+@app.post("/session/{session_id}/respond/stream")
+async def respond_stream(session_id: str, candidate_message: str = Body(...)):
+    """Server-Sent Events variant of /respond: `delta` events, then a final `done` event."""
+    if engine is None:
+         raise HTTPException(status_code=503, detail="Interview Engine not available")
+
+    session = await get_session(session_id)
+
+    async def event_source():
+        parts = []
+        try:
+            async for chunk in stream_turn(session, candidate_message):
+                parts.append(chunk)
+                yield f"event: delta\ndata: {json.dumps({'content': chunk})}\n\n"
+        except Overloaded as e:
+            # Headers are already sent; the retry hint travels in the event
+            yield f"event: error\ndata: {json.dumps({'detail': e.detail, 'retry_after': e.retry_after})}\n\n"
+            return
+        except SessionConflict:
+            yield f"event: error\ndata: {json.dumps({'detail': 'Session was updated by another request.'})}\n\n"
+            return
+        yield f"event: done\ndata: {json.dumps({'interviewer_message': ''.join(parts)})}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/ws/interview")
+async def interview_socket(websocket: WebSocket):
+    """
+    Bidirectional streaming channel used by the Pro client.
+    Client sends {"session_id": ..., "candidate_message": ...};
+    server replies with {"type": "delta"} chunks followed by {"type": "done"}.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            data = await websocket.receive_json()
+            session = await asyncio.to_thread(sessions.get, data.get("session_id"))
+            if session is None:
+                await websocket.send_json({"type": "error", "detail": "Session not found"})
+                continue
+            if engine is None:
+                await websocket.send_json({"type": "error", "detail": "Interview Engine not available"})
+                continue
+
+            parts = []
+            try:
+                async for chunk in stream_turn(session, data.get("candidate_message", "")):
+                    parts.append(chunk)
+                    await websocket.send_json({"type": "delta", "content": chunk})
+            except Overloaded as e:
+                await websocket.send_json({"type": "error", "detail": e.detail, "retry_after": e.retry_after})
+                continue
+            except SessionConflict:
+                await websocket.send_json({"type": "error", "detail": "Session was updated by another request."})
+                continue
+            await websocket.send_json({"type": "done", "interviewer_message": "".join(parts)})
+    except WebSocketDisconnect:
+        pass
+
 @app.post("/session/{session_id}/execute")
-async def execute_code_endpoint(session_id: str, code: str = Body(..., embed=True)):
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
+async def execute_code_endpoint(session_id: str, code: str = Body(..., embed=True),
+                                profile: Optional[bool] = Body(None, embed=True)):
+    session = await get_session(session_id)
     
-    import sys
-    from io import StringIO
-    
-    # Capture Output
-    old_stdout = sys.stdout
-    redirected_output = sys.stdout = StringIO()
-    
-    execution_error = None
+    # Runs in an isolated, rlimited worker process; never in the API process.
+    # If the active problem ships test cases they are judged in the same run,
+    # and a passing solution (or any, with profile=true) is profiled for growth.
+    problem = engine.active_problem(session) if engine else None
     try:
-        # EXECUTE UNSAFE CODE (Local Simulator Only)
-        exec(code, {})
-    except Exception as e:
-        execution_error = str(e)
-    finally:
-        sys.stdout = old_stdout
-        
-    output = redirected_output.getvalue()
-    if execution_error:
-        output += f"\nError: {execution_error}"
+        result = await run_with_judge(sandbox, code, problem, profile)
+    except SandboxBusy:
+        raise HTTPException(status_code=503, detail="Code runner is busy. Please retry shortly.",
+                            headers={"Retry-After": "2"})
+
+    record_run(session.current_state, result)
+    output = result["stdout"]
+    if result["error"]:
+        output += f"\nError: {result['error']}"
+    judge = result.get("judge")
+    report = format_run(result)
         
-    # Send to AI for critique
-    context_msg = f"I ran this code:\n```python\n{code}\n```\n\nOutput:\n```\n{output}\n```"
-    session.current_state.history.append({"role": "candidate", "content": context_msg})
+    # Send to AI for critique; history keeps a compact record (hash or diff of the code)
+    context_msg, record = code_run_messages(session.current_state, code, output, report)
+    session.current_state.history.append(Turn(CANDIDATE, record))
     
+    feedback_retry_after = None
     if engine:
-        ai_feedback = engine.get_interviewer_response(session, context_msg)
-        session.current_state.history.append({"role": "interviewer", "content": ai_feedback})
+        try:
+            ai_feedback = await engine.aget_interviewer_response(session, context_msg)
+            session.current_state.history.append(Turn(INTERVIEWER, ai_feedback))
+        except Overloaded as e:
+            # The run itself is done and kept; only the interviewer's critique is shed
+            ai_feedback, feedback_retry_after = None, e.retry_after
     else:
         ai_feedback = "AI Offline. Code ran successfully."
+    await save_session(session)
 
     return {
         "output": output,
-        "ai_feedback": ai_feedback
+        "judge": judge,
+        "profile": result.get("profile"),
+        "ai_feedback": ai_feedback,
+        "feedback_retry_after": feedback_retry_after
     }
 @app.post("/session/{session_id}/evaluate")
 async def evaluate(session_id: str):
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
+    session = await get_session(session_id)
 
     if engine is None:
          raise HTTPException(status_code=503, detail="Interview Engine not available")
 
-    evaluation = engine.evaluate_round(session)
-
-    
+    # Cached on the session: repeated calls without new turns don't rescore
+    evaluation = await engine.aevaluate_round(session)
+    await save_session(session)
     return evaluation
 
 # Mount frontend static files
@@ -0,0 +1,222 @@
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# One JSON line per HTTP request with its LLM/sandbox spans
+METRICS_TRACE = os.getenv("METRICS_TRACE", "0") == "1"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        ...
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # key -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, [list(counts), total, n]) for key, (counts, total, n) in self._values.items())
+        lines = []
+        for key, (counts, total, n) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {round(total, 6)}")
+            lines.append(f"{self.name}_count{labels} {n}")
+        return lines
+
+
+class Collected(Metric):
+    """
+    Value read from live state at scrape time (session count, queue depth, ...),
+    so the hot path pays nothing. `fn` returns a number, or a dict of
+    label-value tuples to numbers.
+    """
+
+    def __init__(self, name: str, help: str, kind: str, fn: Callable[[], Any], labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception as e:
+            print(f"!! Metric {self.name} failed: {e}")
+            return []
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+                for key, v in sorted(value.items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        # Re-registering replaces (a restarted engine re-binds its callbacks)
+        self._metrics[metric.name] = metric
+        return metric
+
+    def collect(self, name: str, help: str, kind: str, fn: Callable[[], Any], labelnames: Sequence[str] = ()):
+        return self.register(Collected(name, help, kind, fn, labelnames))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("route", "method", "status")))
+LLM_DURATION = REGISTRY.register(Histogram(
+    "llm_call_duration_seconds", "LLM backend call latency by engine mode", ("backend", "outcome"), LLM_BUCKETS))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "llm_tokens_total", "Estimated tokens sent to and received from LLM backends", ("backend", "direction")))
+STATIC_REPLIES = REGISTRY.register(Counter(
+    "static_replies_total", "Replies served by the static engine instead of an LLM", ("reason",)))
+SANDBOX_DURATION = REGISTRY.register(Histogram(
+    "sandbox_run_duration_seconds", "Code execution latency including queue wait", ("outcome",)))
+PREFETCH = REGISTRY.register(Counter(
+    "prefetch_total", "Speculative next-turn generations by outcome", ("outcome",)))
+SANDBOX_REJECTED = REGISTRY.register(Counter(
+    "sandbox_rejected_total", "Executions refused because the sandbox queue was full"))
+ADMISSION = REGISTRY.register(Counter(
+    "llm_admission_total", "LLM calls admitted or shed by the admission scheduler", ("backend", "outcome")))
+ADMISSION_WAIT = REGISTRY.register(Histogram(
+    "llm_admission_wait_seconds", "Time LLM calls waited for admission", ("backend",)))
+
+# Spans of the request being handled; None unless tracing is on
+_trace: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar("trace", default=None)
+
+
+def span(name: str, seconds: float, **attrs):
+    """Attaches a timed span to the current request's trace log line (no-op unless METRICS_TRACE=1)."""
+    trace = _trace.get()
+    if trace is not None:
+        trace.append(dict(attrs, span=name, ms=round(seconds * 1000, 2)))
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no per-request task or body buffering, so streaming
+    responses are untouched). Times each HTTP request by route template and
+    optionally prints a structured trace line.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        trace = [] if METRICS_TRACE else None
+        token = _trace.set(trace)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            # Templates, not raw paths, keep label cardinality bounded
+            template = getattr(route, "path", "unmatched")
+            HTTP_DURATION.observe(elapsed, route=template, method=scope["method"], status=status)
+            if trace is not None:
+                print(json.dumps({"trace": uuid.uuid4().hex[:16], "method": scope["method"], "route": template,
+                                  "status": status, "ms": round(elapsed * 1000, 2), "spans": trace}))
+            _trace.reset(token)
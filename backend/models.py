@@ -1,5 +1,75 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pydantic import BaseModel, Field, PrivateAttr, field_validator
+from pydantic_core import core_schema
+from typing import Any, List, Optional, Dict
+
+# Distinct resume/JD texts kept for sharing between sessions
+BLOB_CACHE_SIZE = int(os.getenv("BLOB_CACHE_SIZE", "4096"))
+
+CANDIDATE = sys.intern("candidate")
+INTERVIEWER = sys.intern("interviewer")
+
+
+class Turn:
+    """
+    One history entry. Slotted with an interned role, so a turn costs two
+    references instead of a dict; it becomes {"role", "content"} only when a
+    session is serialized (storage, HTTP) and is rebuilt from that on load.
+    """
+
+    __slots__ = ("role", "content")
+
+    def __init__(self, role: str, content: str):
+        self.role = sys.intern(role)
+        self.content = content
+
+    def __repr__(self) -> str:
+        return f"Turn({self.role!r}, {self.content[:40]!r})"
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+    @classmethod
+    def _validate(cls, value: Any) -> "Turn":
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, dict):
+            return cls(value["role"], value["content"])
+        raise ValueError("turn must be a Turn or a {role, content} mapping")
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source, handler):
+        return core_schema.no_info_plain_validator_function(
+            cls._validate, serialization=core_schema.plain_serializer_function_ser_schema(cls.to_dict))
+
+
+_blobs: "OrderedDict[str, str]" = OrderedDict()
+_blobs_lock = threading.Lock()
+
+
+def share_blob(text: Optional[str]) -> Optional[str]:
+    """
+    Returns a previously seen string with the same content, if any, so
+    sessions created from the same resume or job description share one copy.
+    """
+    if not text:
+        return text
+    digest = hashlib.sha256(text.encode()).digest()
+    with _blobs_lock:
+        shared = _blobs.get(digest)
+        if shared is not None:
+            _blobs.move_to_end(digest)
+            return shared
+        _blobs[digest] = text
+        # Dropping an entry only stops future sharing; sessions keep their copy
+        while len(_blobs) > BLOB_CACHE_SIZE:
+            _blobs.popitem(last=False)
+    return text
+
 
 class CompanyPersona(BaseModel):
     name: str
@@ -18,10 +88,30 @@ class InterviewState(BaseModel):
     current_round: int = 1
     total_rounds: int
     state: str = "INITIALIZATION" # INITIALIZATION, CLARIFICATION, TECHNICAL_PROBING, FOLLOW_UP, EVALUATION
-    current_phase: str = "Intro" # Added missing field
+    current_phase: str = "Intro" # stage within the round, advanced by the STATIC rules
     pressure_level: int = 0
     struggle_meter: int = 0
-    history: List[Dict[str, str]] = []
+    active_problem_id: Optional[str] = None
+    seen_problem_ids: List[str] = []  # every problem assigned so far; later rounds don't repeat them
+    followups_asked: int = 0  # of the active problem's follow_ups (STATIC rules)
+    # From resume/JD ingestion at session start: strongest focus areas, problem id -> similarity
+    profile_focus: List[str] = []
+    problem_affinity: Dict[str, float] = {}
+    history: List[Turn] = []  # most recent turns, verbatim
+    summary: str = ""  # running summary of turns compacted out of `history`
+    compacted_turns: int = 0
+    code_hashes: List[str] = []
+    last_code: Optional[str] = None
+    # Evaluation evidence from sandbox runs (latest judged run)
+    code_runs: int = 0
+    code_errors: int = 0
+    tests_passed: int = 0
+    tests_total: int = 0
+    # Latest growth profile: estimate ("O(n)", ...), time_slope, memory_slope
+    complexity: Optional[Dict[str, Any]] = None
+    # Cached scorecard, valid while the turn count and the backend that scored it (its "mode") are unchanged
+    evaluation: Optional[Dict[str, Any]] = None
+    evaluated_turns: int = -1
 
 class CandidateSession(BaseModel):
     session_id: str
@@ -34,3 +124,16 @@ class CandidateSession(BaseModel):
     preferred_language: str
     round_type: str  # "coding" or "design"
     current_state: InterviewState
+    # Store version this copy was loaded at; saving over a newer one is refused
+    _version: int = PrivateAttr(default=0)
+
+    @field_validator("resume_text", "job_description")
+    @classmethod
+    def _share_blob(cls, value: Optional[str]) -> Optional[str]:
+        return share_blob(value)
+
+    @field_validator("target_company", "target_role", "target_level", "preferred_language", "round_type")
+    @classmethod
+    def _intern(cls, value: str) -> str:
+        # A handful of distinct values across every session
+        return sys.intern(value)
@@ -1,10 +1,17 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from .models import CandidateSession
+from .evaluation import evaluate_heuristic
+from .rules import RuleEngine
 import random
 
 class OfflineEngine:
     def __init__(self):
         print("Initializing Offline Engine (Static Mode)")
+        try:
+            self.rules = RuleEngine.load("offline")
+        except Exception as e:
+            print(f"!! Failed to load offline rules: {e}")
+            self.rules = None
         self.question_bank = {
             "default": [
                 "Could you walk me through a challenging project you worked on recently?",
@@ -27,48 +34,25 @@ class OfflineEngine:
         }
 
     def get_interviewer_response(self, session: CandidateSession, user_input: str) -> str:
-        # Check round type first
-        if session.round_type == "coding":
-            # Return specific Coding Problems if it's the first message or explicitly requested
-            if "START_ROUND_CODING" in user_input or len(session.current_state.history) <= 2:
-                return """**Problem**: Invert Binary Tree
-**Description**: Given the root of a binary tree, invert the tree, and return its root.
-**Example**: Input: root = [4,2,7,1,3,6,9], Output: [4,7,2,9,6,3,1]
-**Constraints**: The number of nodes in the tree is in the range [0, 100]."""
-            else:
-                return "That looks correct. Can you optimize the space complexity?"
+        # Canned coding/design openers and follow-ups (data/static_rules.json, "offline")
+        if self.rules is None:
+            return "I am ready. Let's begin."
+        return self.rules.reply(session, user_input)
 
-        elif session.round_type == "design":
-            if "START_ROUND_DESIGN" in user_input or len(session.current_state.history) <= 2:
-                 return """**Design Task**: Design a URL Shortener (like Bit.ly)
-**Scale**: 100M daily active users.
-**Instructions**: Focus on the data model and hash function."""
-            else:
-                return "Good. How would you handle hash collisions?"
+    def ingest_profile(self, session: CandidateSession) -> bool:
+        # Canned questions aren't personalized
+        return False
 
-        # Fallback to old logic if no specific round type (shouldn't happen)
-        return "I am ready. Let's begin."
+    def active_problem(self, session: CandidateSession) -> Optional[Dict[str, Any]]:
+        # Canned problems ship without test cases, so there is nothing to judge
+        return None
 
-    def evaluate_round(self, session: CandidateSession) -> Dict[str, Any]:
-        return {
-            "scorecard": {
-                "Technical Correctness": 3,
-                "Communication": 4,
-                "Judgment/Tradeoffs": 3,
-                "Problem Understanding": 4,
-                "Role-Specific depth": 3
-            },
-            "strong_signals": [
-                "Good structured communication.",
-                "Clear understanding of basic concepts."
-            ],
-            "weak_signals": [
-                "Could have gone deeper into edge cases.",
-                "System design details were high-level."
-            ],
-            "interviewer_expectation_met": True,
-            "detailed_feedback": "This is an automated offline evaluation. You demonstrated good communication and general competence. To get specific technical feedback, please ensure the Live AI mode is valid.",
-            "hiring_recommendation": "Lean Hire",
-            "ideal_solution_summary": "In a real interview, top candidates would deep dive into scalability bottlenecks and specific technology choices relevant to the problem.",
-            "improvement_plan": "Focus on system design patterns, specific algorithmic optimizations, and behavioral stories using the STAR method."
-        }
+    async def aget_interviewer_response(self, session: CandidateSession, user_input: str) -> str:
+        # Canned replies are instant, no need to offload
+        return self.get_interviewer_response(session, user_input)
+
+    async def astream_interviewer_response(self, session: CandidateSession, user_input: str):
+        yield self.get_interviewer_response(session, user_input)
+
+    async def aevaluate_round(self, session: CandidateSession) -> Dict[str, Any]:
+        return evaluate_heuristic(session, None, "STATIC")
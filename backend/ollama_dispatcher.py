@@ -0,0 +1,103 @@
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .concurrency import LLM_TIMEOUT_SECONDS
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "10m")
+# Should match the server's OLLAMA_NUM_PARALLEL; extra requests wait here instead of inside Ollama
+OLLAMA_SLOTS = int(os.getenv("OLLAMA_SLOTS", "4"))
+
+
+class OllamaDispatcher:
+    """
+    Front door for the local Ollama server.
+
+    - One pooled keep-alive HTTP session instead of a fresh TCP connection per turn.
+    - A concurrency limiter: at most `slots` generations (Ollama's parallel decode
+      width) are upstream at once; the rest wait here. Ollama's API takes one
+      prompt per request and batches parallel requests itself, so there is
+      nothing to gain from grouping prompts on this side.
+    - Identical in-flight prompts are coalesced into a single upstream call.
+    """
+
+    def __init__(self, base_url: str = OLLAMA_URL, model: str = OLLAMA_MODEL, slots: int = OLLAMA_SLOTS,
+                 read_timeout: float = LLM_TIMEOUT_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.slots = slots
+        self.read_timeout = read_timeout
+
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=slots + 2)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(slots)
+        self._pool = ThreadPoolExecutor(max_workers=slots, thread_name_prefix="ollama")
+
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"requests": 0, "coalesced": 0, "upstream_calls": 0}
+
+    def _payload(self, prompt: str, stream: bool) -> dict:
+        return {"model": self.model, "prompt": prompt, "stream": stream, "keep_alive": OLLAMA_KEEP_ALIVE}
+
+    def ping(self):
+        resp = self.http.get(f"{self.base_url}/", timeout=2)
+        resp.raise_for_status()
+
+    def generate_blocking(self, prompt: str) -> str:
+        """One upstream generation on the pooled session (occupies a slot)."""
+        with self._slots:
+            self.stats["upstream_calls"] += 1
+            resp = self.http.post(f"{self.base_url}/api/generate", json=self._payload(prompt, False),
+                                  timeout=(2, self.read_timeout))
+            resp.raise_for_status()
+            return resp.json().get("response", "Internal Error in Local LLM")
+
+    def stream_blocking(self, prompt: str) -> Iterator[str]:
+        """Streams newline-delimited JSON chunks; holds a slot for the whole generation."""
+        with self._slots:
+            self.stats["upstream_calls"] += 1
+            with self.http.post(f"{self.base_url}/api/generate", json=self._payload(prompt, True), stream=True,
+                                timeout=(2, self.read_timeout)) as resp:
+                resp.raise_for_status()
+                for line in resp.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    yield chunk.get("response", "")
+                    if chunk.get("done"):
+                        break
+
+    async def generate(self, prompt: str) -> str:
+        """One generation once a slot is free; identical in-flight prompts share one call."""
+        self.stats["requests"] += 1
+        future = self._inflight.get(prompt)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().run_in_executor(self._pool, self.generate_blocking, prompt)
+        future.add_done_callback(lambda f: self._finished(prompt, f))
+        self._inflight[prompt] = future
+        # Shielded: one caller timing out must not cancel the call for the others
+        return await asyncio.shield(future)
+
+    def _finished(self, prompt: str, future: asyncio.Future):
+        if self._inflight.get(prompt) is future:
+            del self._inflight[prompt]
+        # Mark the exception as retrieved even if every waiter timed out
+        if not future.cancelled():
+            future.exception()
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.http.close()
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Dict, Optional
+
+from . import metrics
+from .response_cache import is_hint_request
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") == "1"
+# Per-process budget: concurrent speculative calls, and calls started per minute
+PREFETCH_MAX_IN_FLIGHT = int(os.getenv("PREFETCH_MAX_IN_FLIGHT", "4"))
+PREFETCH_PER_MINUTE = int(os.getenv("PREFETCH_PER_MINUTE", "60"))
+# Only speculate while the backend has at least this share of its slots free
+PREFETCH_IDLE_FRACTION = float(os.getenv("PREFETCH_IDLE_FRACTION", "0.5"))
+# A prediction the candidate hasn't used by then is dropped
+PREFETCH_TTL_SECONDS = float(os.getenv("PREFETCH_TTL_SECONDS", "600"))
+PREFETCH_MAX_SESSIONS = 1000
+
+# Predictable next candidate turns: kind -> (does this input match it, canonical wording to generate for)
+PREDICTIONS: Dict[str, tuple] = {
+    "hint": (is_hint_request, "I'm stuck. Can I get a hint?"),
+}
+
+
+def predicted_kind(user_input: str) -> Optional[str]:
+    for kind, (matches, _) in PREDICTIONS.items():
+        if matches(user_input):
+            return kind
+    return None
+
+
+class Speculation:
+    __slots__ = ("turn", "kind", "mode", "task", "created")
+
+    def __init__(self, turn: int, kind: str, mode: str, task: asyncio.Task):
+        self.turn = turn
+        self.kind = kind
+        self.mode = mode
+        self.task = task
+        self.created = time.monotonic()
+
+
+class Prefetcher:
+    """
+    Generates the likely next interviewer turn (e.g. a hint) in the background
+    right after an interviewer message, so when the candidate asks for it the
+    reply is already there or on its way. One speculation per session, keyed by
+    the turn it was made for: any other candidate turn makes it stale and
+    cancels it. Speculation only starts within the process budget and while
+    the backend has idle capacity, so it never competes with live turns.
+    """
+
+    def __init__(self, max_in_flight: int = PREFETCH_MAX_IN_FLIGHT, per_minute: int = PREFETCH_PER_MINUTE,
+                 ttl: float = PREFETCH_TTL_SECONDS, max_sessions: int = PREFETCH_MAX_SESSIONS):
+        self.max_in_flight = max_in_flight
+        self.per_minute = per_minute
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.in_flight = 0
+        self._started: deque = deque()  # start times within the last minute
+        self._slots: "OrderedDict[str, Speculation]" = OrderedDict()
+
+    def _within_budget(self) -> bool:
+        now = time.monotonic()
+        while self._started and self._started[0] < now - 60:
+            self._started.popleft()
+        return self.in_flight < self.max_in_flight and len(self._started) < self.per_minute
+
+    def schedule(self, session_id: str, turn: int, kind: str, mode: str,
+                 generate: Callable[[], Awaitable[str]]) -> bool:
+        """Starts speculating `kind` for the session's state at `turn`; False if skipped."""
+        current = self._slots.get(session_id)
+        if current is not None:
+            if current.turn == turn and current.kind == kind and current.mode == mode:
+                return True
+            self.discard(session_id)
+        if not self._within_budget():
+            metrics.PREFETCH.inc(outcome="skipped")
+            return False
+
+        self.in_flight += 1
+        self._started.append(time.monotonic())
+        task = asyncio.create_task(generate())
+        task.add_done_callback(self._finished)
+        self._slots[session_id] = Speculation(turn, kind, mode, task)
+        while len(self._slots) > self.max_sessions:
+            self.discard(next(iter(self._slots)))
+        metrics.PREFETCH.inc(outcome="started")
+        return True
+
+    def _finished(self, task: asyncio.Task):
+        self.in_flight -= 1
+        if not task.cancelled() and task.exception() is not None:
+            metrics.PREFETCH.inc(outcome="failed")
+
+    async def take(self, session_id: str, turn: int, kind: Optional[str], mode: str) -> Optional[str]:
+        """
+        Returns the speculated reply if it was made for this exact state and
+        kind of turn (waiting for it if still running); otherwise drops it.
+        """
+        speculation = self._slots.pop(session_id, None)
+        if speculation is None:
+            return None
+        fresh = time.monotonic() - speculation.created < self.ttl
+        if not (fresh and kind == speculation.kind and turn == speculation.turn and mode == speculation.mode):
+            self._cancel(speculation)
+            return None
+        try:
+            # Shielded so a speculation cancelled elsewhere (shutdown) reads as "no reply", not as this request's cancellation
+            reply = await asyncio.shield(speculation.task)
+        except asyncio.CancelledError:
+            if speculation.task.cancelled():
+                return None
+            speculation.task.cancel()
+            raise
+        except Exception:
+            return None
+        metrics.PREFETCH.inc(outcome="served")
+        return reply
+
+    def discard(self, session_id: str):
+        speculation = self._slots.pop(session_id, None)
+        if speculation is not None:
+            self._cancel(speculation)
+
+    def _cancel(self, speculation: Speculation):
+        if not speculation.task.done():
+            speculation.task.cancel()
+        metrics.PREFETCH.inc(outcome="discarded")
+
+    def close(self):
+        for session_id in list(self._slots):
+            self.discard(session_id)
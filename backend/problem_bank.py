@@ -0,0 +1,110 @@
+import json
+import os
+import random
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Data file per round type
+ROUND_FILES = {
+    "coding": "coding_problems.json",
+    "design": "system_design.json",
+    "behavioral": "behavioral.json",
+}
+
+# Preferred difficulty per target level, best match first
+LEVEL_DIFFICULTY = {
+    "L3": ["Easy", "Medium"],
+    "L4": ["Medium", "Easy"],
+    "L5": ["Medium", "Hard"],
+    "L6": ["Hard", "Medium"],
+}
+
+# Weight of a full resume/JD match relative to one shared company focus area
+PROFILE_MATCH_WEIGHT = float(os.getenv("PROFILE_MATCH_WEIGHT", "8"))
+
+
+class ProblemBank:
+    """
+    In-memory index over the static problem data, built once at load time.
+    Lookups by id are O(1); selection by round, difficulty and company focus
+    area only touches the matching index buckets, so cost doesn't grow with
+    conversation length or with the overall size of the bank.
+    """
+
+    def __init__(self, problems_by_round: Dict[str, List[Dict[str, Any]]]):
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.by_round: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_difficulty: Dict[tuple, Set[str]] = defaultdict(set)
+        self.by_focus: Dict[tuple, Set[str]] = defaultdict(set)
+        self.round_of: Dict[str, str] = {}
+
+        for round_type, problems in problems_by_round.items():
+            self.by_round[round_type] = problems
+            for problem in problems:
+                pid = problem["id"]
+                self.by_id[pid] = problem
+                self.round_of[pid] = round_type
+                if problem.get("difficulty"):
+                    self.by_difficulty[(round_type, problem["difficulty"])].add(pid)
+                for area in problem.get("focus_areas", []):
+                    self.by_focus[(round_type, area)].add(pid)
+
+    @classmethod
+    def load(cls, data_dir: str = DATA_DIR) -> "ProblemBank":
+        problems_by_round = {}
+        for round_type, filename in ROUND_FILES.items():
+            with open(os.path.join(data_dir, filename), "r") as f:
+                problems_by_round[round_type] = json.load(f)
+        return cls(problems_by_round)
+
+    def _in_round(self, problem_id: str, round_type: str) -> bool:
+        return self.round_of.get(problem_id) == round_type
+
+    def get(self, problem_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        return self.by_id.get(problem_id) if problem_id else None
+
+    def problems(self, round_type: str) -> List[Dict[str, Any]]:
+        return self.by_round.get(round_type, [])
+
+    def pick(self, round_type: str, level: Optional[str] = None,
+             focus_areas: Iterable[str] = (), exclude: Iterable[str] = (),
+             affinity: Mapping[str, float] = {}) -> Optional[Dict[str, Any]]:
+        """
+        Chooses a problem for the round. Prefers the level's difficulty, then
+        draws among problems sharing the company's focus areas or matching the
+        candidate's profile (`affinity`, from resume/JD ingestion), weighted by
+        both; falls back to any problem in the round.
+        """
+        pool = self.by_round.get(round_type)
+        if not pool:
+            return None
+        excluded = set(exclude)
+
+        candidates: Optional[Set[str]] = None
+        for difficulty in LEVEL_DIFFICULTY.get(level, []):
+            ids = self.by_difficulty.get((round_type, difficulty), set()) - excluded
+            if ids:
+                candidates = ids
+                break
+
+        # Score candidates by focus-area overlap using the inverted index
+        overlap: Dict[str, float] = defaultdict(float)
+        for area in focus_areas:
+            for pid in self.by_focus.get((round_type, area), ()):
+                if pid not in excluded and (candidates is None or pid in candidates):
+                    overlap[pid] += 1
+        for pid, score in affinity.items():
+            if pid in self.by_id and pid not in excluded and (candidates is None or pid in candidates):
+                overlap[pid] += PROFILE_MATCH_WEIGHT * score
+        overlap = {pid: weight for pid, weight in overlap.items() if weight > 0 and self._in_round(pid, round_type)}
+        if overlap:
+            # Weighted draw keeps some variety across repeat sessions
+            ids = sorted(overlap)
+            return self.by_id[random.choices(ids, weights=[overlap[pid] for pid in ids])[0]]
+
+        if candidates:
+            return self.by_id[random.choice(sorted(candidates))]
+        remaining = [p for p in pool if p["id"] not in excluded] or pool
+        return random.choice(remaining)
@@ -0,0 +1,131 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .models import CandidateSession
+from .problem_bank import DATA_DIR, ProblemBank
+
+FOCUS_KEYWORDS_FILE = "focus_keywords.json"
+# Focus areas recorded on the session (strongest matches first)
+PROFILE_TOP_FOCUS = int(os.getenv("PROFILE_TOP_FOCUS", "3"))
+PROFILE_MIN_SIMILARITY = float(os.getenv("PROFILE_MIN_SIMILARITY", "0.05"))
+# How much a problem's focus areas matching the profile adds to its own text match
+AREA_WEIGHT = 0.5
+
+_TOKEN = re.compile(r"[a-z][a-z0-9+#/.-]*")
+_STOPWORDS = frozenset("""
+a an and are as at be by can do for from has have i in into is it its of on or our so that the their
+this to was we were will with you your my me using used use experience years worked work working
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        token = token.rstrip(".-/")
+        if len(token) > 1 and token not in _STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def problem_text(problem: Mapping[str, Any]) -> str:
+    parts = [problem.get("title", ""), problem.get("description", ""), problem.get("question", ""),
+             problem.get("hint", ""), " ".join(problem.get("requirements", []))]
+    return " ".join(parts)
+
+
+class ProfileIndex:
+    """
+    TF-IDF vectors for every problem and focus area, built once. A candidate's
+    resume and job description are vectorized once per session and scored
+    against the whole index with one matrix product, so personalizing problem
+    selection costs no LLM calls and nothing per turn.
+    """
+
+    def __init__(self, problems: List[Dict[str, Any]], areas: Mapping[str, str]):
+        self.problem_ids = [problem["id"] for problem in problems]
+        self.areas = sorted(areas)
+        docs = [tokenize(problem_text(problem) + " " + " ".join(problem.get("focus_areas", [])))
+                for problem in problems]
+        docs += [tokenize(f"{area} {areas[area]}") for area in self.areas]
+
+        # Vocabulary and IDF come from the index itself; query terms outside it can't match anything
+        df: Counter = Counter(term for doc in docs for term in set(doc))
+        self.vocabulary = {term: column for column, term in enumerate(sorted(df))}
+        self.idf = np.array([math.log((1 + len(docs)) / (1 + df[term])) + 1 for term in sorted(df)],
+                            dtype=np.float32)
+        self.matrix = np.vstack([self.vectorize_tokens(doc) for doc in docs]) if docs else \
+            np.zeros((0, len(self.vocabulary)), dtype=np.float32)
+
+        # Problem x area incidence, rows averaged, to fold area matches into problem scores
+        area_column = {area: i for i, area in enumerate(self.areas)}
+        self.incidence = np.zeros((len(problems), len(self.areas)), dtype=np.float32)
+        for row, problem in enumerate(problems):
+            columns = [area_column[a] for a in problem.get("focus_areas", []) if a in area_column]
+            if columns:
+                self.incidence[row, columns] = 1.0 / len(columns)
+
+    @classmethod
+    def build(cls, bank: ProblemBank, persona_areas: Iterable[str] = (),
+              data_dir: str = DATA_DIR) -> "ProfileIndex":
+        try:
+            with open(os.path.join(data_dir, FOCUS_KEYWORDS_FILE), "r") as f:
+                keywords = json.load(f)
+        except FileNotFoundError:
+            keywords = {}
+        problems = [problem for round_type in bank.by_round for problem in bank.problems(round_type)]
+        areas = {area: keywords.get(area, "") for area in persona_areas}
+        for problem in problems:
+            for area in problem.get("focus_areas", []):
+                areas.setdefault(area, keywords.get(area, ""))
+        return cls(problems, areas)
+
+    def vectorize_tokens(self, tokens: Iterable[str]) -> np.ndarray:
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        counts = Counter(token for token in tokens if token in self.vocabulary)
+        if counts:
+            columns = np.fromiter((self.vocabulary[t] for t in counts), dtype=np.int64, count=len(counts))
+            # Sublinear term frequency: a resume repeating "python" ten times isn't ten times more python
+            tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+            vector[columns] = tf * self.idf[columns]
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector /= norm
+        return vector
+
+    def score(self, text: str) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """Returns (problem affinity, focus-area similarity) for a profile text."""
+        query = self.vectorize_tokens(tokenize(text))
+        similarities = self.matrix @ query
+        problem_scores = similarities[:len(self.problem_ids)]
+        area_scores = similarities[len(self.problem_ids):]
+        affinity = problem_scores + AREA_WEIGHT * (self.incidence @ area_scores)
+        return (dict(zip(self.problem_ids, affinity.tolist())), dict(zip(self.areas, area_scores.tolist())))
+
+
+def profile_text(resume_text: Optional[str], job_description: Optional[str]) -> str:
+    return f"{resume_text or ''}\n{job_description or ''}".strip()
+
+
+def ingest(index: ProfileIndex, bank: ProblemBank, session: CandidateSession) -> bool:
+    """
+    Records the session's focus areas and per-problem affinity (for its round)
+    from the resume and job description. Runs once per session; returns False
+    when there is nothing to ingest.
+    """
+    text = profile_text(session.resume_text, session.job_description)
+    if not text:
+        return False
+    affinity, areas = index.score(text)
+    state = session.current_state
+    round_ids = {problem["id"] for problem in bank.problems(session.round_type)}
+    state.problem_affinity = {pid: round(score, 4) for pid, score in affinity.items()
+                              if pid in round_ids and score >= PROFILE_MIN_SIMILARITY}
+    ranked = sorted((score, area) for area, score in areas.items() if score >= PROFILE_MIN_SIMILARITY)
+    state.profile_focus = [area for _, area in reversed(ranked[-PROFILE_TOP_FOCUS:])]
+    return True
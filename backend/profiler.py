@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Input sizes: doubling from PROFILE_MIN_SIZE up to PROFILE_MAX_SIZE
+PROFILE_MIN_SIZE = int(os.getenv("PROFILE_MIN_SIZE", "128"))
+PROFILE_MAX_SIZE = int(os.getenv("PROFILE_MAX_SIZE", "32768"))
+# Hard cap on one call, and on the whole profile (sizes stop growing once either is hit)
+PROFILE_RUN_SECONDS = float(os.getenv("PROFILE_RUN_SECONDS", "0.25"))
+PROFILE_BUDGET_SECONDS = float(os.getenv("PROFILE_BUDGET_SECONDS", "2"))
+PROFILE_SEED = 7
+# Fewer measured sizes than this can't tell the classes apart
+MIN_POINTS = 4
+# A more complex class must fit this much better to win over a simpler one
+SIMPLER_MARGIN = 1.25
+# Below these, timings and peak allocations are noise (timer resolution, interpreter frames)
+TIME_FLOOR_SECONDS = 5e-6
+MEMORY_FLOOR_KB = 1.0
+
+COMPLEXITY_CLASSES: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "O(1)": lambda n: np.zeros_like(n),
+    "O(log n)": np.log2,
+    "O(n)": lambda n: n,
+    "O(n log n)": lambda n: n * np.log2(n),
+    "O(n^2)": lambda n: n * n,
+}
+
+
+def _int_array(rng: np.random.Generator, n: int, low: int = 0, high: int = 1_000_000) -> tuple:
+    return (rng.integers(low, high, size=n).tolist(),)
+
+
+def _two_sum(rng: np.random.Generator, n: int) -> tuple:
+    # Distinct values below 4n, answer pair at the very end: every solution has to scan the whole array
+    nums = rng.permutation(4 * n)[:n]
+    nums[-2:] = (10 * n, 10 * n + 1)
+    return (nums.tolist(), 20 * n + 1)
+
+
+def _intervals(rng: np.random.Generator, n: int, span: int = 10) -> tuple:
+    starts = rng.integers(0, 4 * n, size=n)
+    ends = starts + rng.integers(0, span, size=n)
+    return (np.column_stack((starts, ends)).tolist(),)
+
+
+# input_generator "kind" (coding_problems.json) -> fn(rng, n, **params) returning the call's arguments
+GENERATORS: Dict[str, Callable[..., tuple]] = {
+    "int_array": _int_array,
+    "two_sum": _two_sum,
+    "intervals": _intervals,
+}
+
+
+def sizes(min_size: int = PROFILE_MIN_SIZE, max_size: int = PROFILE_MAX_SIZE) -> List[int]:
+    out, n = [], max(2, min_size)
+    while n <= max_size:
+        out.append(n)
+        n *= 2
+    return out
+
+
+_inputs: Dict[str, List[Dict[str, Any]]] = {}
+_inputs_lock = threading.Lock()
+
+
+def scaled_inputs(problem: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """
+    [{n, args}] for every profiling size, args as the JSON text of the call's
+    argument list. Deterministic, so generated once per problem and reused.
+    """
+    spec = problem.get("input_generator")
+    if not spec or spec.get("kind") not in GENERATORS:
+        return None
+    with _inputs_lock:
+        cached = _inputs.get(problem["id"])
+        if cached is None:
+            params = {key: value for key, value in spec.items() if key not in ("kind", "max_size")}
+            generate = GENERATORS[spec["kind"]]
+            rng = np.random.default_rng(PROFILE_SEED)
+            cached = [{"n": n, "args": json.dumps(generate(rng, n, **params))}
+                      for n in sizes(max_size=min(PROFILE_MAX_SIZE, spec.get("max_size", PROFILE_MAX_SIZE)))]
+            _inputs[problem["id"]] = cached
+    return cached
+
+
+def profile_spec(problem: Optional[Dict[str, Any]], entry_point: str, require_passing: bool) -> Optional[Dict[str, Any]]:
+    """Profile payload for the sandbox, or None if the problem has no input generator."""
+    inputs = scaled_inputs(problem) if problem else None
+    if not inputs:
+        return None
+    return {"entry_point": entry_point, "inputs": inputs, "run_seconds": PROFILE_RUN_SECONDS,
+            "budget_seconds": PROFILE_BUDGET_SECONDS, "require_passing": require_passing}
+
+
+def _slope(n: np.ndarray, values: np.ndarray) -> float:
+    # Exponent k of values ~ n^k
+    return float(np.polyfit(np.log2(n), np.log2(values), 1)[0])
+
+
+def fit_complexity(n: np.ndarray, seconds: np.ndarray) -> Dict[str, float]:
+    """
+    Relative RMS error of the best t = a + b * f(n) fit (b >= 0) for every
+    class. Weighted by 1/t so the small sizes count as much as the large ones.
+    """
+    errors = {}
+    weights = 1.0 / seconds
+    for name, f in COMPLEXITY_CLASSES.items():
+        growth = f(n.astype(np.float64))
+        design = np.column_stack((np.ones_like(growth), growth)) * weights[:, None]
+        (a, b), *_ = np.linalg.lstsq(design, seconds * weights, rcond=None)
+        if b < 0:
+            # Shrinking with n: no better than a constant
+            a, b = np.average(seconds, weights=weights ** 2), 0.0
+        predicted = a + b * growth
+        errors[name] = float(np.sqrt(np.mean(((predicted - seconds) * weights) ** 2)))
+    return errors
+
+
+def analyze(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Turns the sandbox's raw timings into {estimate, time_slope, memory_slope,
+    sizes, times_ms, peak_kb, capped_at}; estimate is None when too few sizes
+    finished to fit (the code hit the time cap early).
+    """
+    report = {key: raw.get(key) for key in ("sizes", "times_ms", "peak_kb", "capped_at", "error")}
+    report.update(estimate=None, time_slope=None, memory_slope=None)
+    points = len(raw.get("sizes") or [])
+    if raw.get("error") or points < MIN_POINTS:
+        return report
+    n = np.array(raw["sizes"], dtype=np.float64)
+    seconds = np.maximum(np.array(raw["times_ms"], dtype=np.float64) / 1000, TIME_FLOOR_SECONDS)
+    # The last size may have no peak (its traced call hit the cap)
+    traced = np.array([kb is not None for kb in raw["peak_kb"]])
+    peak = np.maximum(np.array([kb or 0 for kb in raw["peak_kb"]], dtype=np.float64), MEMORY_FLOOR_KB)
+
+    errors = fit_complexity(n, seconds)
+    # Classes are listed simplest first; keep the simpler one unless the next fits clearly better
+    estimate = None
+    for name in COMPLEXITY_CLASSES:
+        if estimate is None or errors[name] * SIMPLER_MARGIN < errors[estimate]:
+            estimate = name
+    memory_slope = round(_slope(n[traced], peak[traced]), 2) if traced.sum() >= 2 else None
+    report.update(estimate=estimate, time_slope=round(_slope(n, seconds), 2), memory_slope=memory_slope)
+    return report
+
+
+def format_profile(report: Dict[str, Any]) -> str:
+    """One-line summary for the candidate and the interviewer."""
+    if report.get("error"):
+        return f"Profile: could not run ({report['error']})"
+    sizes_run = report.get("sizes") or []
+    span = f"n={sizes_run[0]}..{sizes_run[-1]}" if sizes_run else "no sizes"
+    capped = f", stopped at n={report['capped_at']} (time cap)" if report.get("capped_at") else ""
+    if report.get("estimate") is None:
+        return f"Profile: too slow to estimate ({span}{capped})"
+    memory = f"memory slope {report['memory_slope']:.2f}" if report.get("memory_slope") is not None else "memory not traced"
+    return (f"Profile: time ~{report['estimate']} (slope {report['time_slope']:.2f}), {memory} "
+            f"({span}, {report['times_ms'][-1]:.2f} ms at the largest{capped})")
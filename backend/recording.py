@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .chat_sessions import estimate_tokens
+
+# Append every successful LLM call to this JSONL file (off when empty)
+LLM_RECORD_FILE = os.getenv("LLM_RECORD_FILE", "")
+# Buffered entries are written in one batch once this many are pending, or after the flush interval
+LLM_RECORD_BATCH = int(os.getenv("LLM_RECORD_BATCH", "64"))
+LLM_RECORD_FLUSH_SECONDS = float(os.getenv("LLM_RECORD_FLUSH_SECONDS", "1"))
+# Serve replies from a recording instead of a live backend (the REPLAY backend)
+LLM_REPLAY_FILE = os.getenv("LLM_REPLAY_FILE", "")
+# "recorded": wait as long as the recorded call took; "fast": reply immediately
+LLM_REPLAY_TIMING = os.getenv("LLM_REPLAY_TIMING", "recorded")
+
+# Call kinds: an interview turn (prompt = the candidate's message, setup = the session's
+# persona and problem fingerprint) or a stateless completion
+TURN = "turn"
+COMPLETE = "complete"
+
+
+class CallRecorder:
+    """
+    Buffered JSONL log of LLM calls: prompt, reply, backend, latency (and time
+    to first chunk for streams) and token counts. `record` only appends to an
+    in-memory buffer; a background thread writes full batches, so the request
+    path never touches the disk. One write per batch in append mode, so
+    several workers can share a file.
+    """
+
+    def __init__(self, path: str, batch: int = LLM_RECORD_BATCH, flush_seconds: float = LLM_RECORD_FLUSH_SECONDS):
+        self.path = path
+        self.batch = batch
+        self.flush_seconds = flush_seconds
+        self.recorded = 0
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="llm-recorder", daemon=True)
+        self._writer.start()
+        print(f">> Recording LLM calls to {path}")
+
+    def record(self, backend: str, kind: str, prompt: str, reply: str, latency: float,
+               session_id: Optional[str] = None, turn: Optional[int] = None, setup: Optional[str] = None,
+               first_chunk: Optional[float] = None, chunks: Optional[int] = None):
+        entry = {
+            "ts": round(time.time(), 3),
+            "pid": os.getpid(),
+            "backend": backend,
+            "kind": kind,
+            "session_id": session_id,
+            "turn": turn,
+            "setup": setup,
+            "prompt": prompt,
+            "response": reply,
+            "latency_ms": round(latency * 1000, 1),
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(reply),
+        }
+        if first_chunk is not None:
+            entry["first_chunk_ms"] = round(first_chunk * 1000, 1)
+            entry["chunks"] = chunks
+        line = json.dumps(entry)
+        with self._lock:
+            self._buffer.append(line)
+            self.recorded += 1
+            full = len(self._buffer) >= self.batch
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if not lines:
+            return
+        try:
+            with open(self.path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"!! Failed to write {len(lines)} recorded LLM calls to {self.path}: {e}")
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._writer.join(timeout=5)
+        self.flush()
+
+
+def create_recorder(path: str = LLM_RECORD_FILE) -> Optional[CallRecorder]:
+    return CallRecorder(path) if path else None
+
+
+def _key(*parts: Any) -> str:
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()[:24]
+
+
+class ReplayBackend:
+    """
+    Serves recorded replies (a CallRecorder log) with no network. A call is
+    matched on its kind, setup (persona and problem), prompt and session
+    turn, then without the turn, then on kind and prompt alone (recordings
+    without a setup, or a setup never recorded); repeats of the same key
+    cycle through the recorded replies in order, and a prompt never seen
+    gets a recorded reply picked by its hash.
+    So the same traffic always gets the same replies. With timing="recorded"
+    each reply takes as long as the original call did (streams reproduce the
+    recorded time to first chunk); with "fast" it returns immediately.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], timing: str = LLM_REPLAY_TIMING):
+        if timing not in ("recorded", "fast"):
+            raise ValueError(f"replay timing must be 'recorded' or 'fast', not {timing!r}")
+        self.timing = timing
+        self.entries = entries
+        self.by_key: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.by_kind: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for entry in entries:
+            kind = entry.get("kind", TURN)
+            setup = entry.get("setup")
+            self.by_key[_key(kind, setup, entry["prompt"], entry.get("turn"))].append(entry)
+            self.by_key[_key(kind, setup, entry["prompt"])].append(entry)
+            self.by_key[_key(kind, entry["prompt"])].append(entry)
+            self.by_kind[kind].append(entry)
+        self._served: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.stats = {"exact": 0, "setup": 0, "prompt": 0, "unmatched": 0}
+
+    @classmethod
+    def load(cls, path: str = LLM_REPLAY_FILE, timing: str = LLM_REPLAY_TIMING) -> "ReplayBackend":
+        entries = []
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entries.append(json.loads(line))
+        if not entries:
+            raise ValueError(f"{path} has no recorded calls")
+        print(f">> Replaying {len(entries)} recorded LLM calls from {path} ({timing} timing)")
+        return cls(entries, timing)
+
+    def lookup(self, kind: str, prompt: str, turn: Optional[int] = None,
+               setup: Optional[str] = None) -> Dict[str, Any]:
+        for match, key in (("exact", _key(kind, setup, prompt, turn)), ("setup", _key(kind, setup, prompt)),
+                           ("prompt", _key(kind, prompt))):
+            candidates = self.by_key.get(key)
+            if candidates:
+                break
+        else:
+            match, key = "unmatched", _key(kind, prompt)
+            pool = self.by_kind.get(kind) or self.entries
+            candidates = [pool[int(key, 16) % len(pool)]]
+        with self._lock:
+            index = self._served[key]
+            self._served[key] += 1
+            self.stats[match] += 1
+        return candidates[index % len(candidates)]
+
+    def _delays(self, entry: Dict[str, Any]) -> Tuple[float, float]:
+        """(seconds before the first chunk, seconds for the rest of the reply)."""
+        if self.timing == "fast":
+            return 0.0, 0.0
+        total = entry.get("latency_ms", 0) / 1000
+        first = entry.get("first_chunk_ms", entry.get("latency_ms", 0)) / 1000
+        return first, max(0.0, total - first)
+
+    async def generate(self, kind: str, prompt: str, turn: Optional[int] = None, setup: Optional[str] = None) -> str:
+        entry = self.lookup(kind, prompt, turn, setup)
+        first, rest = self._delays(entry)
+        if first + rest:
+            await asyncio.sleep(first + rest)
+        return entry["response"]
+
+    async def stream(self, kind: str, prompt: str, turn: Optional[int] = None,
+                     setup: Optional[str] = None) -> AsyncIterator[str]:
+        entry = self.lookup(kind, prompt, turn, setup)
+        first, rest = self._delays(entry)
+        reply = entry["response"]
+        # The recorded chunk count, evenly sized and evenly spaced after the first
+        count = max(1, min(entry.get("chunks") or 1, len(reply) or 1))
+        size = -(-len(reply) // count) if reply else 0
+        pieces = [reply[i:i + size] for i in range(0, len(reply), size)] if size else [reply]
+        if first:
+            await asyncio.sleep(first)
+        for index, piece in enumerate(pieces):
+            if index and rest:
+                await asyncio.sleep(rest / (len(pieces) - 1))
+            yield piece
@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .chat_sessions import persona_prompt
+from .models import CandidateSession
+from .shared_state import SharedState
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "")  # empty = memory only
+
+_WHITESPACE = re.compile(r"\s+")
+_HINT_WORDS = ("hint", "stuck")
+
+
+def normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", text.strip().lower())
+
+
+def is_hint_request(user_input: str) -> bool:
+    """Short messages asking for a hint ("I'm stuck", "hint please", ...)."""
+    text = normalize(user_input)
+    return len(text) < 80 and any(word in text for word in _HINT_WORDS)
+
+
+def setup_fingerprint(session: CandidateSession, problem_id: Optional[str] = None) -> str:
+    """What shapes a reply besides the conversation: the rendered persona (setup, resume/JD focus) and the problem."""
+    return hashlib.sha256(f"{problem_id}\x1f{persona_prompt(session)}".encode()).hexdigest()
+
+
+def prompt_fingerprint(session: CandidateSession, user_input: str, mode: str,
+                       problem_id: Optional[str] = None) -> Optional[str]:
+    """
+    Cache key for prompts whose reply depends only on the interview setup
+    (as rendered into the persona prompt), or None if the reply depends on
+    the conversation and must not be cached. Covers round openers
+    (START_ROUND_*) and hint requests on a known problem.
+    """
+    text = normalize(user_input)
+    if user_input.startswith("START_ROUND"):
+        # The opener poses the round's assigned problem
+        scope = f"opener:{problem_id}"
+    elif problem_id and is_hint_request(user_input):
+        scope = f"hint:{problem_id}"
+    else:
+        return None
+    parts = (mode, scope, setup_fingerprint(session, problem_id), hashlib.sha256(text.encode()).hexdigest())
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU of generated replies with a TTL and optional JSON
+    persistence, so repeated openers and hints skip the LLM round-trip.
+    With a shared state backend, local misses fall through to a second tier
+    that every worker fills, so a reply is generated once per cluster.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL_SECONDS,
+                 path: str = RESPONSE_CACHE_PATH, shared: Optional[SharedState] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.shared = shared
+        # key -> (reply, expires_at wall-clock); ordered least- to most-recently used
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path:
+            self.load()
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] >= time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+                self.evictions += 1
+        # The shared tier is a network or disk round-trip: keep it off the event loop
+        reply = await asyncio.to_thread(self.shared.get, f"reply:{key}") if self.shared is not None else None
+        if reply is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        # Generated by another worker: keep a local copy
+        self._store(key, reply)
+        with self._lock:
+            self.hits += 1
+        return reply
+
+    async def set(self, key: str, reply: str):
+        self._store(key, reply)
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.set, f"reply:{key}", reply, self.ttl)
+
+    def _store(self, key: str, reply: str):
+        with self._lock:
+            self._entries[key] = (reply, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"!! Failed to load response cache from {self.path}: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            for key, (reply, expires_at) in stored.items():
+                if expires_at > now:
+                    self._entries[key] = (reply, expires_at)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        print(f">> Response cache: loaded {len(self._entries)} entries from {self.path}")
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = dict(self._entries)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.path)
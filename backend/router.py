@@ -0,0 +1,270 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .shared_state import SharedState
+
+BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", "60"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_CONSECUTIVE_FAILURES = int(os.getenv("BREAKER_CONSECUTIVE_FAILURES", "3"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "15"))
+BREAKER_MAX_COOLDOWN_SECONDS = float(os.getenv("BREAKER_MAX_COOLDOWN_SECONDS", "300"))
+PROBE_INTERVAL_SECONDS = float(os.getenv("PROBE_INTERVAL_SECONDS", "5"))
+# How often breaker state is exchanged with other workers (only with SHARED_STATE_URL)
+BREAKER_SYNC_SECONDS = float(os.getenv("BREAKER_SYNC_SECONDS", "1"))
+
+CLOSED = "CLOSED"        # healthy, takes traffic
+OPEN = "OPEN"            # failing, no traffic until a probe succeeds
+HALF_OPEN = "HALF_OPEN"  # cooldown elapsed, a background probe is deciding
+
+
+class CircuitBreaker:
+    """
+    Failure-rate breaker over a sliding time window. Trips when the window's
+    failure rate crosses the threshold (after a minimum number of calls) or
+    after a run of consecutive failures. Recovery is decided by background
+    probes, never by live requests.
+    """
+
+    def __init__(self, name: str, window: float = BREAKER_WINDOW_SECONDS, min_calls: int = BREAKER_MIN_CALLS,
+                 failure_rate: float = BREAKER_FAILURE_RATE,
+                 consecutive_failures: int = BREAKER_CONSECUTIVE_FAILURES,
+                 cooldown: float = BREAKER_COOLDOWN_SECONDS, max_cooldown: float = BREAKER_MAX_COOLDOWN_SECONDS):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.consecutive_failures = consecutive_failures
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        # Starts OPEN with no cooldown: the first probe brings it up
+        self.state = OPEN
+        self.cooldown = 0.0
+        self.opened_at = 0.0
+        self.streak = 0
+        self.outcomes: deque = deque()  # (timestamp, ok)
+        self.latency_ewma: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.ever_healthy = False
+        # Wall-clock time of the last OPEN/CLOSED transition; the newest one wins across workers
+        self.changed_at = 0.0
+
+    def _trim(self, now: float):
+        while self.outcomes and self.outcomes[0][0] < now - self.window:
+            self.outcomes.popleft()
+
+    def record_success(self, latency: float):
+        now = time.monotonic()
+        self.outcomes.append((now, True))
+        self._trim(now)
+        self.streak = 0
+        # Exponentially weighted latency, used to rank healthy backends
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+
+    def record_failure(self, error: str):
+        now = time.monotonic()
+        self.outcomes.append((now, False))
+        self._trim(now)
+        self.streak += 1
+        self.last_error = error[:200]
+        if self.state != CLOSED:
+            return
+        failures = sum(1 for _, ok in self.outcomes if not ok)
+        rate_tripped = len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.failure_rate
+        if rate_tripped or self.streak >= self.consecutive_failures:
+            self.trip(self.base_cooldown)
+
+    def trip(self, cooldown: float):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.cooldown = min(cooldown, self.max_cooldown)
+        self.changed_at = time.time()
+        print(f"!! Circuit OPEN for {self.name} ({self.last_error}); retry in {self.cooldown:g}s")
+
+    def probe_due(self) -> bool:
+        return self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown
+
+    def probe_succeeded(self, latency: float):
+        self.state = CLOSED
+        self.ever_healthy = True
+        self.streak = 0
+        self.outcomes.clear()
+        self.latency_ewma = latency if self.latency_ewma is None else self.latency_ewma
+        self.changed_at = time.time()
+        print(f">> Circuit CLOSED for {self.name} (probe {latency * 1000:.0f} ms)")
+
+    def probe_failed(self, error: str):
+        self.last_error = error[:200]
+        # Back off exponentially while the backend stays down
+        self.trip(max(self.base_cooldown, self.cooldown * 2))
+
+    def export(self) -> Dict[str, Any]:
+        """Transition state published to other workers (window and latency stay local)."""
+        return {
+            "state": self.state if self.state != HALF_OPEN else OPEN,
+            "cooldown": self.cooldown,
+            "opened_at": time.time() - (time.monotonic() - self.opened_at),
+            "last_error": self.last_error,
+            "changed_at": self.changed_at,
+        }
+
+    def adopt(self, remote: Dict[str, Any]):
+        """Applies a newer transition made by another worker."""
+        if remote["state"] == CLOSED and not self.ever_healthy:
+            # This worker's client isn't warmed up yet; its own first probe decides
+            return
+        if remote["state"] != self.state:
+            print(f">> Circuit {remote['state']} for {self.name} (from another worker)")
+        self.state = remote["state"]
+        self.cooldown = remote["cooldown"]
+        self.opened_at = time.monotonic() - (time.time() - remote["opened_at"])
+        self.last_error = remote["last_error"]
+        self.changed_at = remote["changed_at"]
+        if self.state == CLOSED:
+            self.streak = 0
+            self.outcomes.clear()
+
+    @property
+    def readiness(self) -> str:
+        if self.state == CLOSED:
+            return "ready"
+        if not self.ever_healthy and self.last_error is None:
+            return "warming"
+        return "down"
+
+    def snapshot(self) -> Dict[str, Any]:
+        failures = sum(1 for _, ok in self.outcomes if not ok)
+        return {
+            "readiness": self.readiness,
+            "state": self.state,
+            "window_calls": len(self.outcomes),
+            "window_failures": failures,
+            "latency_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+class BackendRouter:
+    """
+    Picks the fastest healthy LLM backend for each call and falls back to
+    STATIC only while every breaker is open. Probes run on a background task,
+    so requests never wait on a health check. With a shared state backend,
+    breaker transitions are exchanged between workers and a lease makes sure
+    only one worker probes a failed backend at a time.
+    """
+
+    def __init__(self, probes: Dict[str, Callable[[], Awaitable[Any]]], preference: List[str],
+                 probe_interval: float = PROBE_INTERVAL_SECONDS, probe_timeout: float = 5.0,
+                 shared: Optional[SharedState] = None, sync_interval: float = BREAKER_SYNC_SECONDS):
+        self.probes = probes
+        self.preference = [name for name in preference if name in probes]
+        self.breakers = {name: CircuitBreaker(name) for name in self.preference}
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.shared = shared
+        self.sync_interval = sync_interval
+        self._published: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def select(self) -> str:
+        healthy = [name for name in self.preference if self.breakers[name].state == CLOSED]
+        if not healthy:
+            return "STATIC"
+        # Lowest observed latency wins; configuration order breaks ties
+        return min(healthy, key=lambda name: (self.breakers[name].latency_ewma or 0.0, self.preference.index(name)))
+
+    def record_success(self, name: str, latency: float):
+        if name in self.breakers:
+            self.breakers[name].record_success(latency)
+
+    def record_failure(self, name: str, error: str):
+        if name in self.breakers:
+            self.breakers[name].record_failure(error)
+
+    async def probe(self, name: str):
+        breaker = self.breakers[name]
+        breaker.state = HALF_OPEN
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.probes[name](), self.probe_timeout)
+        except Exception as e:
+            breaker.probe_failed(f"probe: {type(e).__name__}: {e}")
+        else:
+            breaker.probe_succeeded(time.perf_counter() - started)
+
+    def _claim_probe(self, name: str) -> bool:
+        # Only one worker probes a backend that already failed; the others adopt its result
+        return self.shared.add(f"probe_lease:{name}", str(os.getpid()), self.probe_timeout + 1)
+
+    async def probe_due(self):
+        """Probes every backend whose cooldown has elapsed, concurrently."""
+        due = [name for name, breaker in self.breakers.items() if breaker.probe_due()]
+        leased = []
+        if due and self.shared is not None:
+            # Warm-up probes always run: each worker has to load its own client
+            warming = [name for name in due if not self.breakers[name].ever_healthy]
+            leased = await asyncio.to_thread(
+                lambda: [name for name in due if name not in warming and self._claim_probe(name)])
+            due = warming + leased
+        if due:
+            await asyncio.gather(*(self.probe(name) for name in due))
+        if leased:
+            # The lease TTL only covers a worker dying mid-probe
+            await asyncio.to_thread(lambda: [self.shared.delete(f"probe_lease:{name}") for name in leased])
+
+    def _exchange(self, outgoing: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        # Runs in a worker thread: publishes local transitions, returns everyone's latest
+        for name, state in outgoing.items():
+            self.shared.set(f"breaker:{name}", json.dumps(state))
+        remote = {}
+        for name in self.breakers:
+            raw = self.shared.get(f"breaker:{name}")
+            if raw:
+                remote[name] = json.loads(raw)
+        return remote
+
+    async def sync(self):
+        """Exchanges breaker transitions with other workers; the most recent transition wins."""
+        outgoing = {name: b.export() for name, b in self.breakers.items()
+                    if b.changed_at > self._published.get(name, 0.0)}
+        remote = await asyncio.to_thread(self._exchange, outgoing)
+        for name, state in outgoing.items():
+            self._published[name] = state["changed_at"]
+        for name, state in remote.items():
+            breaker = self.breakers[name]
+            if state["changed_at"] > breaker.changed_at:
+                breaker.adopt(state)
+                self._published[name] = breaker.changed_at
+
+    async def _probe_loop(self):
+        next_probe = 0.0
+        while True:
+            try:
+                if self.shared is not None:
+                    await self.sync()
+                if time.monotonic() >= next_probe:
+                    next_probe = time.monotonic() + self.probe_interval
+                    await self.probe_due()
+                    if self.shared is not None:
+                        # Publish probe outcomes right away rather than a sync interval later
+                        await self.sync()
+            except Exception as e:
+                print(f"!! Backend probe loop error: {e}")
+            await asyncio.sleep(min(self.probe_interval, self.sync_interval) if self.shared else self.probe_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._probe_loop())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {"active": self.select(), "backends": {name: b.snapshot() for name, b in self.breakers.items()}}
@@ -0,0 +1,205 @@
+import json
+import os
+import re
+from collections import deque
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from .history import total_turns
+from .models import CandidateSession
+
+RULES_FILE = os.path.join(os.path.dirname(__file__), "data", "static_rules.json")
+# Inputs shorter than this raise the "@short" signal
+SHORT_REPLY_CHARS = 50
+
+_PLACEHOLDER = re.compile(r"\{([a-z_][\w.]*)\}")
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over lowercase phrases. One pass over the text
+    reports every phrase it contains (substring semantics, overlaps included),
+    so matching cost depends on the input length, not on how many phrases
+    there are.
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[Tuple[str, ...]] = [()]
+        for phrase in set(phrases):
+            node = 0
+            for ch in phrase:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = self._goto[node][ch] = len(self._goto)
+                    self._goto.append({})
+                    self._out.append(())
+                node = nxt
+            self._out[node] += (phrase,)
+
+        # Failure links, breadth first; each node also reports its suffixes' phrases
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> Set[str]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[str] = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class Rule:
+    """
+    One trigger -> reply rule. `any` needs one of its phrases, `all` needs
+    every one, `unless` none; rules without `any` are defaults, tried in file
+    order with the triggered ones. `stage` restricts a rule to one phase of
+    the round and `advance` moves the session to the next.
+    """
+
+    __slots__ = ("order", "id", "any", "all", "unless", "stage", "advance", "assign_problem", "reply")
+
+    def __init__(self, order: int, spec: Dict[str, Any]):
+        self.order = order
+        self.id = spec.get("id", str(order))
+        self.any: FrozenSet[str] = frozenset(p.lower() for p in spec.get("any", []))
+        self.all: FrozenSet[str] = frozenset(p.lower() for p in spec.get("all", []))
+        self.unless: FrozenSet[str] = frozenset(p.lower() for p in spec.get("unless", []))
+        self.stage: Optional[str] = spec.get("stage")
+        self.advance: Optional[str] = spec.get("advance")
+        self.assign_problem: bool = spec.get("assign_problem", False)
+        self.reply: str = spec["reply"]
+
+    def phrases(self) -> FrozenSet[str]:
+        return self.any | self.all | self.unless
+
+    def applies(self, matched: Set[str], phase: str) -> bool:
+        if self.stage is not None and self.stage != phase:
+            return False
+        if self.any and self.any.isdisjoint(matched):
+            return False
+        return self.all <= matched and self.unless.isdisjoint(matched)
+
+
+def _render_value(value: Any) -> str:
+    if isinstance(value, dict):
+        return "\n".join(f"- **{key}**: {str(item).strip()}" for key, item in value.items())
+    if isinstance(value, list):
+        return "\n".join(f"- {item}" for item in value)
+    return str(value)
+
+
+class RuleSet:
+    """The compiled rules of one round: a phrase matcher plus a phrase -> rules index."""
+
+    def __init__(self, specs: List[Dict[str, Any]]):
+        self.rules = [Rule(order, spec) for order, spec in enumerate(specs)]
+        self.defaults = [rule for rule in self.rules if not rule.any]
+        self.by_phrase: Dict[str, List[Rule]] = {}
+        for rule in self.rules:
+            for phrase in rule.any:
+                self.by_phrase.setdefault(phrase, []).append(rule)
+        # Signals ("@opening", ...) are added by the engine, not found in the text
+        self.matcher = PhraseMatcher(p for rule in self.rules for p in rule.phrases() if not p.startswith("@"))
+
+    def candidates(self, matched: Set[str]) -> List[Rule]:
+        # Only rules a matched phrase can trigger, plus the defaults, in file order
+        triggered = {rule.order: rule for phrase in matched for rule in self.by_phrase.get(phrase, ())}
+        for rule in self.defaults:
+            triggered[rule.order] = rule
+        return [triggered[order] for order in sorted(triggered)]
+
+
+class RuleEngine:
+    """
+    Data-driven STATIC interviewer (data/static_rules.json). Each round's rules
+    are compiled once; a reply costs one lowercase pass, one automaton scan and
+    a look at the few rules the matched phrases point to, however many rules
+    there are. Stage progression is kept on the session (current_phase).
+    """
+
+    def __init__(self, rounds: Dict[str, List[Dict[str, Any]]], default: str, opening_turns: int = 1):
+        self.rounds = {round_type: RuleSet(specs) for round_type, specs in rounds.items()}
+        self.default = default
+        self.opening_turns = opening_turns
+
+    @classmethod
+    def load(cls, section: str, path: str = RULES_FILE) -> "RuleEngine":
+        with open(path, "r") as f:
+            spec = json.load(f)[section]
+        return cls(spec["rounds"], spec.get("default", "I am listening."), spec.get("opening_turns", 1))
+
+    def signals(self, session: CandidateSession, user_input: str) -> Set[str]:
+        signals = set()
+        if total_turns(session.current_state) <= self.opening_turns:
+            signals.add("@opening")
+        if len(user_input) < SHORT_REPLY_CHARS:
+            signals.add("@short")
+        return signals
+
+    def reply(self, session: CandidateSession, user_input: str,
+              active_problem: Callable[[CandidateSession], Optional[Dict[str, Any]]] = lambda s: None,
+              assign_problem: Callable[[CandidateSession], Optional[Dict[str, Any]]] = lambda s: None) -> str:
+        rules = self.rounds.get(session.round_type)
+        if rules is None:
+            return self.default
+        state = session.current_state
+        matched = rules.matcher.find(user_input.lower()) | self.signals(session, user_input)
+        problem = active_problem(session)
+        for rule in rules.candidates(matched):
+            if not rule.applies(matched, state.current_phase):
+                continue
+            if rule.assign_problem:
+                problem = assign_problem(session)
+                state.followups_asked = 0
+            rendered = self._render(rule.reply, problem, state)
+            if rendered is None:
+                # A field the template needs is missing (no problem, follow-ups used up): next rule
+                continue
+            text, used_follow_up = rendered
+            if used_follow_up:
+                state.followups_asked += 1
+            if rule.advance:
+                state.current_phase = rule.advance
+            return text
+        return self.default
+
+    @staticmethod
+    def _render(template: str, problem: Optional[Dict[str, Any]], state) -> Optional[Tuple[str, bool]]:
+        follow_ups = problem.get("follow_ups", []) if problem else []
+        context = {
+            "problem": problem,
+            "stage": (problem or {}).get("stages", {}).get(state.current_phase),
+            "follow_up": follow_ups[state.followups_asked] if state.followups_asked < len(follow_ups) else None,
+            "measured": state.complexity,
+        }
+        used_follow_up = False
+        missing = False
+
+        def resolve(match: "re.Match") -> str:
+            nonlocal used_follow_up, missing
+            value: Any = context
+            for key in match.group(1).split("."):
+                value = value.get(key) if isinstance(value, dict) else None
+                if value is None:
+                    missing = True
+                    return ""
+            if match.group(1) == "follow_up":
+                used_follow_up = True
+            return _render_value(value)
+
+        text = _PLACEHOLDER.sub(resolve, template)
+        return None if missing else (text, used_follow_up)
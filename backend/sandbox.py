@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from . import metrics
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), "sandbox_worker.py")
+
+# Resource limits for a single candidate run (overridable via env)
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", str(os.cpu_count() or 2)))
+SANDBOX_MAX_QUEUE = int(os.getenv("SANDBOX_MAX_QUEUE", "64"))
+SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", "5"))
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "256"))
+SANDBOX_WALL_SECONDS = float(os.getenv("SANDBOX_WALL_SECONDS", "10"))
+# Unprivileged account candidate code runs as when the API runs as root
+SANDBOX_USER = os.getenv("SANDBOX_USER", "nobody")
+
+
+class SandboxBusy(Exception):
+    """Raised when the execution queue is full and the request should be retried later."""
+
+
+class SandboxPool:
+    """
+    Pool of pre-spawned worker processes that execute candidate code.
+    Each worker forks a rlimited child per job (see sandbox_worker.py), so runs
+    are isolated from the API process and from each other, execute in
+    parallel across cores, and a runaway submission is killed at its limit.
+    Workers get a bare environment (none of the API's keys or settings) and
+    a throwaway working directory instead of the repo.
+    """
+
+    def __init__(self, size: int = SANDBOX_WORKERS, max_queue: int = SANDBOX_MAX_QUEUE,
+                 cpu_seconds: int = SANDBOX_CPU_SECONDS, memory_mb: int = SANDBOX_MEMORY_MB,
+                 wall_seconds: float = SANDBOX_WALL_SECONDS):
+        self.size = size
+        self.max_queue = max_queue
+        self.limits = {"cpu_seconds": cpu_seconds, "memory_mb": memory_mb, "wall_seconds": wall_seconds}
+        self.waiting = 0
+        self.workdir: Optional[str] = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.subprocess.Process] = []
+
+    async def start(self):
+        self._idle = asyncio.Queue()
+        self.workdir = tempfile.mkdtemp(prefix="sandbox-")
+        for _ in range(self.size):
+            worker = await self._spawn()
+            self._workers.append(worker)
+            self._idle.put_nowait(worker)
+        print(f">> Sandbox pool: {self.size} workers (cpu={self.limits['cpu_seconds']}s, "
+              f"mem={self.limits['memory_mb']}MB, wall={self.limits['wall_seconds']}s)")
+        if os.geteuid() == 0:
+            print(f">> Sandbox runs candidate code as '{SANDBOX_USER}' (the API is running as root)")
+
+    async def _spawn(self) -> asyncio.subprocess.Process:
+        return await asyncio.create_subprocess_exec(
+            sys.executable, "-I", "-u", WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=1024 * 1024,
+            cwd=self.workdir,
+            env={"PATH": os.defpath, "LANG": "C.UTF-8", "HOME": self.workdir, "SANDBOX_USER": SANDBOX_USER},
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        return self.waiting
+
+    async def run(self, code: str, **job: Any) -> Dict[str, Any]:
+        """
+        Executes `code` in an isolated worker and returns
+        {stdout, stderr, error, timed_out, duration_ms}. Extra keyword
+        arguments are forwarded to the worker as part of the job.
+        """
+        if self._idle is None:
+            raise RuntimeError("SandboxPool.start() has not been called")
+        if self.waiting >= self.max_queue:
+            metrics.SANDBOX_REJECTED.inc()
+            raise SandboxBusy(f"{self.waiting} executions already queued")
+
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            worker = await self._idle.get()
+        finally:
+            self.waiting -= 1
+
+        payload = dict(job, code=code, limits=dict(self.limits, **job.get("limits", {})))
+        healthy = False
+        try:
+            worker.stdin.write((json.dumps(payload) + "\n").encode())
+            await worker.stdin.drain()
+            # The worker enforces the wall clock itself; the grace period only
+            # covers a worker that is wedged or has died
+            line = await asyncio.wait_for(worker.stdout.readline(),
+                                          payload["limits"]["wall_seconds"] + 5)
+            if not line:
+                raise ConnectionError("sandbox worker exited")
+            result = json.loads(line)
+            healthy = True
+        except (asyncio.TimeoutError, ConnectionError, ValueError, OSError) as e:
+            print(f"!! Sandbox worker failed ({e!r}). Respawning.")
+            result = {"stdout": "", "stderr": "", "error": "Sandbox failure: worker restarted",
+                      "timed_out": False}
+        finally:
+            if healthy:
+                self._idle.put_nowait(worker)
+            else:
+                # Also covers cancellation mid-job: never hand a busy worker to the next caller
+                asyncio.ensure_future(self._recycle(worker))
+        if not healthy:
+            outcome = "failure"
+        elif result.get("timed_out"):
+            outcome = "timeout"
+        else:
+            outcome = "error" if result.get("error") else "ok"
+        elapsed = time.perf_counter() - started
+        metrics.SANDBOX_DURATION.observe(elapsed, outcome=outcome)
+        metrics.span("sandbox", elapsed, outcome=outcome)
+        return result
+
+    async def _recycle(self, worker: asyncio.subprocess.Process):
+        if worker.returncode is None:
+            worker.kill()
+            await worker.wait()
+        fresh = await self._spawn()
+        self._workers[self._workers.index(worker)] = fresh
+        self._idle.put_nowait(fresh)
+
+    async def close(self):
+        for worker in self._workers:
+            if worker.returncode is None:
+                worker.stdin.close()
+                worker.kill()
+                await worker.wait()
+        self._workers = []
+        if self.workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+            self.workdir = None
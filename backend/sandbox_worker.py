@@ -0,0 +1,463 @@
+"""
+Sandbox worker process (spawned by `backend.sandbox.SandboxPool`).
+
+Reads one JSON job per line on stdin and writes one JSON result per line on
+stdout. The worker itself stays warm; every job runs in a freshly forked
+child with CPU / memory / file-size rlimits, its own stdout/stderr capture,
+a scratch directory and a wall-clock deadline, so a runaway submission only
+ever kills its own child. When the worker runs as root, the child switches
+to SANDBOX_USER before any candidate code runs, and refuses to run the code
+if it can't. Runs as a plain script (no backend imports) to keep fork cheap.
+"""
+import ast
+import io
+import json
+import os
+import pwd
+import resource
+import select
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+import tracemalloc
+
+MAX_OUTPUT_CHARS = 64 * 1024
+# Longest repr of one test case's return value the child may report
+MAX_ACTUAL_CHARS = 16 * 1024
+# A child reporting more than this is killed
+MAX_REPORT_BYTES = 4 * 1024 * 1024
+SANDBOX_USER = os.environ.get("SANDBOX_USER", "nobody")
+
+
+def _sandbox_ids():
+    """(uid, gid) children switch to, or None when the worker isn't root (there is nothing to drop)."""
+    if os.geteuid() != 0:
+        return None
+    try:
+        entry = pwd.getpwnam(SANDBOX_USER)
+    except KeyError:
+        raise PermissionError(f"SANDBOX_USER '{SANDBOX_USER}' does not exist; refusing to run code as root")
+    if entry.pw_uid == 0:
+        raise PermissionError(f"SANDBOX_USER '{SANDBOX_USER}' is root; refusing to run code as root")
+    return entry.pw_uid, entry.pw_gid
+
+
+def _drop_privileges(ids):
+    if ids is None:
+        return
+    uid, gid = ids
+    os.setgroups([])
+    os.setgid(gid)
+    os.setuid(uid)
+    if os.geteuid() == 0 or os.getuid() == 0:
+        raise PermissionError("could not drop root privileges")
+
+
+def _apply_limits(limits):
+    cpu = int(limits.get("cpu_seconds", 5))
+    memory = int(limits.get("memory_mb", 256)) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (1024 * 1024, 1024 * 1024))
+    # No fork bombs from candidate code
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+
+def _args(literal):
+    args = ast.literal_eval(literal)
+    return args if isinstance(args, tuple) else (args,)
+
+
+def _matches(actual, expected, unordered=False):
+    if actual == expected:
+        return True
+    # Only cases marked "unordered" (the problem accepts the answer in any order) compare as multisets
+    if not unordered:
+        return False
+    try:
+        return isinstance(actual, list) and isinstance(expected, list) and sorted(actual) == sorted(expected)
+    except TypeError:
+        return False
+
+
+def _outputs(entry_point, inputs, namespace):
+    """
+    Calls the candidate's entry point on every test input (child side).
+    Returns what each call did, [{actual (repr), runtime_ms, peak_kb} or
+    {error}], or None if the function isn't defined. Never the verdict.
+    """
+    fn = namespace.get(entry_point)
+    if not callable(fn):
+        return None
+    outputs = []
+    for literal in inputs:
+        record = {}
+        try:
+            # Timed run without tracing overhead, then a traced run for peak memory
+            args = _args(literal)
+            started = time.perf_counter()
+            actual = fn(*args)
+            record["runtime_ms"] = round((time.perf_counter() - started) * 1000, 4)
+
+            args = _args(literal)
+            tracemalloc.start()
+            fn(*args)
+            record["peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 2)
+            tracemalloc.stop()
+
+            record["actual"] = repr(actual)[:MAX_ACTUAL_CHARS]
+        except Exception as e:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            record["error"] = f"{type(e).__name__}: {e}"
+        outputs.append(record)
+    return outputs
+
+
+def _text(value, limit=MAX_OUTPUT_CHARS):
+    return value[:limit] if isinstance(value, str) else ""
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value == value and abs(value) != float("inf"):
+        return value
+    return None
+
+
+def _verdict(spec, outputs):
+    """
+    Worker side: checks the return values the child reported against the
+    expected outputs, which never leave the worker. The child's report is
+    untrusted, so only the returned values count, never a count of passes.
+    """
+    total = len(spec["test_cases"])
+    if not isinstance(outputs, list):
+        return {"entry_point": spec["entry_point"], "passed": 0, "total": total,
+                "error": f"Function '{spec['entry_point']}' is not defined", "cases": []}
+
+    cases = []
+    for index, case in enumerate(spec["test_cases"]):
+        reported = outputs[index] if index < len(outputs) and isinstance(outputs[index], dict) else {}
+        record = {"index": index, "input": case["input"], "expected": case["output"], "passed": False}
+        actual = reported.get("actual")
+        if not isinstance(actual, str):
+            record["error"] = _text(reported.get("error"), 500) or "no result reported"
+        else:
+            record["actual"] = actual[:200]
+            record["runtime_ms"] = _number(reported.get("runtime_ms")) or 0.0
+            record["peak_kb"] = _number(reported.get("peak_kb")) or 0.0
+            try:
+                record["passed"] = _matches(ast.literal_eval(actual), ast.literal_eval(case["output"]),
+                                            case.get("unordered", False))
+            except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+                # Not a literal (or cut off at MAX_ACTUAL_CHARS): can't equal the expected output
+                pass
+        cases.append(record)
+
+    return {"entry_point": spec["entry_point"], "passed": sum(c["passed"] for c in cases),
+            "total": total, "cases": cases}
+
+
+class _RunCapped(BaseException):
+    """Raised inside a profiled call that ran past its cap (BaseException: candidate code can't swallow it)."""
+
+
+def _on_cap(signum, frame):
+    raise _RunCapped()
+
+
+def _timed_call(fn, args_json, cap):
+    """Seconds for one call on freshly decoded arguments, interrupted after `cap` seconds."""
+    args = json.loads(args_json)
+    signal.setitimer(signal.ITIMER_REAL, cap)
+    try:
+        started = time.perf_counter()
+        fn(*args)
+        return time.perf_counter() - started
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _profile(spec, namespace):
+    """
+    Times the entry point at each (doubling) input size: best of a few calls
+    for the small sizes, then one traced call for peak memory. Stops growing
+    at the first call over the per-run cap or once the budget is spent.
+    """
+    fn = namespace.get(spec["entry_point"])
+    if not callable(fn):
+        return {"error": f"Function '{spec['entry_point']}' is not defined"}
+    cap = float(spec.get("run_seconds", 0.25))
+    deadline = time.perf_counter() + float(spec.get("budget_seconds", 2))
+    signal.signal(signal.SIGALRM, _on_cap)
+    sizes, times_ms, peak_kb, capped_at = [], [], [], None
+    try:
+        for entry in spec["inputs"]:
+            if time.perf_counter() >= deadline:
+                capped_at = entry["n"]
+                break
+            try:
+                best = _timed_call(fn, entry["args"], cap)
+                # Repeat quick calls until ~20ms were measured so timer noise doesn't dominate
+                spent, calls = best, 1
+                while spent < 0.02 and calls < 5:
+                    elapsed = _timed_call(fn, entry["args"], cap)
+                    best, spent, calls = min(best, elapsed), spent + elapsed, calls + 1
+            except _RunCapped:
+                capped_at = entry["n"]
+                break
+            sizes.append(entry["n"])
+            times_ms.append(round(best * 1000, 4))
+            try:
+                # Tracing slows the call down several times; a capped trace keeps the timing but ends the profile
+                args = json.loads(entry["args"])
+                tracemalloc.start()
+                signal.setitimer(signal.ITIMER_REAL, cap)
+                fn(*args)
+                peak_kb.append(round(tracemalloc.get_traced_memory()[1] / 1024, 2))
+            except _RunCapped:
+                peak_kb.append(None)
+                capped_at = entry["n"]
+                break
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                if tracemalloc.is_tracing():
+                    tracemalloc.stop()
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}", "sizes": sizes}
+    return {"sizes": sizes, "times_ms": times_ms, "peak_kb": peak_kb, "capped_at": capped_at}
+
+
+def _profile_report(raw, spec):
+    """The child's profile timings, kept only if they are well-formed numbers at the sizes that were asked for."""
+    if not isinstance(raw, dict):
+        return None
+    if raw.get("error"):
+        return {"error": _text(raw["error"], 500)}
+    asked = [entry["n"] for entry in spec["inputs"]]
+    sizes, times_ms, peak_kb = raw.get("sizes"), raw.get("times_ms"), raw.get("peak_kb")
+    if not (isinstance(sizes, list) and isinstance(times_ms, list) and isinstance(peak_kb, list)
+            and len(sizes) == len(times_ms) == len(peak_kb) and sizes == asked[:len(sizes)]
+            and all(_number(t) is not None and t >= 0 for t in times_ms)
+            and all(kb is None or (_number(kb) is not None and kb >= 0) for kb in peak_kb)):
+        return {"error": "malformed profile report"}
+    capped_at = raw.get("capped_at") if raw.get("capped_at") in asked else None
+    return {"sizes": sizes, "times_ms": times_ms, "peak_kb": peak_kb, "capped_at": capped_at}
+
+
+def _run_code(job, report, go):
+    """
+    Child side: runs the candidate's code, reports the judged calls' return
+    values through `report` as soon as they're known and, once the worker
+    says `go` (the tests passed, or passing isn't required), profiles the
+    entry point. Returns the final report.
+    """
+    stdout, stderr = io.StringIO(), io.StringIO()
+    sys.stdout, sys.stderr = stdout, stderr
+    namespace = {"__name__": "__main__"}
+    error, profile = None, None
+    try:
+        exec(compile(job["code"], "<candidate>", "exec"), namespace)
+        if job.get("inputs") is not None:
+            report({"outputs": _outputs(job["entry_point"], job["inputs"], namespace)})
+        if job.get("profile") and go():
+            profile = _profile(job["profile"], namespace)
+    except MemoryError:
+        error = "MemoryError: memory limit exceeded"
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        # Skip the sandbox's own exec() frame so the traceback starts at candidate code
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+    finally:
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    return {
+        "stdout": stdout.getvalue()[:MAX_OUTPUT_CHARS],
+        "stderr": stderr.getvalue()[:MAX_OUTPUT_CHARS],
+        "error": error,
+        "profile": profile,
+    }
+
+
+def _send(fd, message):
+    data = (json.dumps(message) + "\n").encode()
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _child(job, write_fd, go_fd, workdir):
+    # Detach from the worker's protocol pipes so candidate code can't read
+    # the next job or corrupt the result stream
+    devnull_in, devnull_out = os.open(os.devnull, os.O_RDONLY), os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull_in, 0)
+    os.dup2(devnull_out, 1)
+    os.dup2(devnull_out, 2)
+    # Own process group so any stray grandchildren die with the job
+    os.setsid()
+    pid = os.getpid()
+    try:
+        os.chdir(workdir)
+        # Unprivileged first: RLIMIT_NPROC means nothing to root
+        _drop_privileges(_sandbox_ids())
+        _apply_limits(job.get("limits", {}))
+        result = _run_code(job, lambda message: _send(write_fd, message), lambda: os.read(go_fd, 1) == b"1")
+    except BaseException as e:
+        result = {"stdout": "", "stderr": "", "error": f"Sandbox failure: {e}"}
+    if os.getpid() != pid:
+        # Candidate code forked; only the original child reports
+        os._exit(0)
+    try:
+        _send(write_fd, result)
+    finally:
+        os._exit(0)
+
+
+def _kill_group(pgid):
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _job_dir():
+    """Fresh scratch directory for one run, writable by the user the child runs as."""
+    workdir = tempfile.mkdtemp(prefix="job-", dir=os.getcwd())
+    try:
+        ids = _sandbox_ids()
+    except PermissionError:
+        # The child reports the refusal
+        ids = None
+    if ids is not None:
+        os.chown(workdir, *ids)
+    return workdir
+
+
+def _message(line):
+    try:
+        message = json.loads(line)
+    except ValueError:
+        return {}
+    return message if isinstance(message, dict) else {}
+
+
+def _signal_go(fd, go):
+    try:
+        os.write(fd, b"1" if go else b"0")
+    except OSError:
+        # The child is already gone
+        pass
+
+
+def run_job(job):
+    """
+    Forks a child for the job and builds the result from what it reports.
+    The child shares its process with the candidate's code, so nothing it
+    sends is trusted: it gets the test inputs but not the expected outputs,
+    reports only return values and timings, and the verdict is worked out
+    here. Candidate code that writes its own report can at best claim
+    return values, which is no more than hard-coding the answers.
+    """
+    limits = job.get("limits", {})
+    wall = float(limits.get("wall_seconds", 10))
+    spec, profile = job.get("judge"), job.get("profile")
+    child_job = {"code": job["code"], "limits": limits, "profile": profile}
+    if spec:
+        child_job.update(entry_point=spec["entry_point"], inputs=[case["input"] for case in spec["test_cases"]])
+    started = time.perf_counter()
+    workdir = _job_dir()
+    read_fd, write_fd = os.pipe()
+    go_read, go_write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        os.close(go_write)
+        _child(child_job, write_fd, go_read, workdir)
+    os.close(write_fd)
+    os.close(go_read)
+
+    # With nothing to judge, whether to profile is known up front
+    profiled = bool(profile) and not spec and not profile.get("require_passing")
+    if profile and not spec:
+        _signal_go(go_write, profiled)
+
+    # Read the child's reports (one JSON line each) until EOF or the wall-clock deadline
+    buffer, judge, final = b"", None, None
+    timed_out = oversized = False
+    deadline = started + wall
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            timed_out = True
+            break
+        ready, _, _ = select.select([read_fd], [], [], remaining)
+        if not ready:
+            continue
+        data = os.read(read_fd, 65536)
+        if not data:
+            break
+        buffer += data
+        if len(buffer) > MAX_REPORT_BYTES:
+            oversized = True
+            break
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            message = _message(line)
+            if "outputs" in message:
+                if spec and judge is None:
+                    judge = _verdict(spec, message["outputs"])
+                    if profile:
+                        passing = not judge.get("error") and judge["passed"] == judge["total"]
+                        profiled = passing or not profile.get("require_passing")
+                        _signal_go(go_write, profiled)
+            elif message and final is None:
+                final = message
+    os.close(read_fd)
+    os.close(go_write)
+
+    if timed_out or oversized:
+        _kill_group(pid)
+    _, status = os.waitpid(pid, 0)
+    _kill_group(pid)
+    shutil.rmtree(workdir, ignore_errors=True)
+    duration_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    if timed_out:
+        return {"stdout": "", "stderr": "", "error": f"TimeoutError: exceeded {wall:g}s wall-clock limit",
+                "judge": judge, "timed_out": True, "duration_ms": duration_ms}
+    if final is None:
+        # Child died before reporting (SIGXCPU, SIGKILL from the OOM killer, ...)
+        if oversized:
+            reason = f"reported more than {MAX_REPORT_BYTES // 1024} KB"
+        elif os.WIFSIGNALED(status):
+            sig = os.WTERMSIG(status)
+            reason = "CPU time limit exceeded" if sig == signal.SIGXCPU else f"process terminated (signal {sig})"
+        else:
+            reason = f"process exited without a result (status {os.WEXITSTATUS(status)})"
+        final = {"error": f"RuntimeError: {reason}"}
+    return {
+        "stdout": _text(final.get("stdout")),
+        "stderr": _text(final.get("stderr")),
+        "error": _text(final.get("error"), 2000) or None,
+        "judge": judge,
+        "profile": _profile_report(final.get("profile"), profile) if profiled else None,
+        "timed_out": False,
+        "duration_ms": duration_ms,
+    }
+
+
+def main():
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            result = run_job(json.loads(line))
+        except Exception as e:
+            result = {"stdout": "", "stderr": "", "error": f"Sandbox failure: {e}", "timed_out": False}
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from .models import CandidateSession, Turn
+from .shared_state import SHARED_STATE_URL, SharedState
+
+# Limits for the in-memory tier (overridable via env)
+# memory | sqlite | shared (any worker on any node can serve any session; needs SHARED_STATE_URL)
+SESSION_STORE = os.getenv("SESSION_STORE", "shared" if SHARED_STATE_URL else "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_MAX_IN_MEMORY = int(os.getenv("SESSION_MAX_IN_MEMORY", "10000"))
+SESSION_IDLE_TTL_SECONDS = float(os.getenv("SESSION_IDLE_TTL_SECONDS", str(2 * 60 * 60)))
+
+
+class SessionConflict(Exception):
+    """Another request stored the session after this copy was loaded; the client should reload and retry."""
+
+
+class SessionStore(ABC):
+    """
+    Interface used by the API routes. Callers mutate the session they got
+    from `get()` and call `save()` afterwards; history is append-only.
+    Stores shared between workers raise SessionConflict from `save()` when
+    the session changed since it was loaded, instead of losing either update.
+    """
+
+    def __init__(self):
+        self._evict_listeners: List[Callable[[str], None]] = []
+
+    def on_evict(self, listener: Callable[[str], None]):
+        """Registers a callback invoked with the session_id whenever a session is dropped."""
+        self._evict_listeners.append(listener)
+
+    def _notify_evicted(self, session_id: str):
+        for listener in self._evict_listeners:
+            listener(session_id)
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[CandidateSession]:
+        ...
+
+    @abstractmethod
+    def save(self, session: CandidateSession):
+        ...
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Drops idle sessions; returns how many were evicted."""
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local LRU with idle-TTL eviction. Memory stays flat at `max_sessions`."""
+
+    def __init__(self, max_sessions: int = SESSION_MAX_IN_MEMORY, idle_ttl: float = SESSION_IDLE_TTL_SECONDS):
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        # session_id -> (session, last_access); ordered least- to most-recently used
+        self._sessions: "OrderedDict[str, Tuple[CandidateSession, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[CandidateSession]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            session, last_access = entry
+            now = time.monotonic()
+            if now - last_access > self.idle_ttl:
+                del self._sessions[session_id]
+                expired = True
+            else:
+                self._sessions[session_id] = (session, now)
+                self._sessions.move_to_end(session_id)
+                expired = False
+        if expired:
+            self._notify_evicted(session_id)
+            return None
+        return session
+
+    def save(self, session: CandidateSession):
+        evicted = []
+        with self._lock:
+            self._sessions[session.session_id] = (session, time.monotonic())
+            self._sessions.move_to_end(session.session_id)
+            while len(self._sessions) > self.max_sessions:
+                evicted.append(self._sessions.popitem(last=False)[0])
+        for session_id in evicted:
+            self._notify_evicted(session_id)
+
+    def sweep(self) -> int:
+        cutoff = time.monotonic() - self.idle_ttl
+        evicted = []
+        with self._lock:
+            # Oldest entries sit at the front, so stop at the first live one
+            while self._sessions:
+                session_id, (_, last_access) = next(iter(self._sessions.items()))
+                if last_access > cutoff:
+                    break
+                self._sessions.popitem(last=False)
+                evicted.append(session_id)
+        for session_id in evicted:
+            self._notify_evicted(session_id)
+        return len(evicted)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Durable store shared by every worker process on the host. Session
+    metadata lives in one row; history is stored as append-only turn rows so
+    saving a turn never re-serializes the whole conversation. A small LRU
+    of hydrated sessions sits in front and is revalidated by row version.
+    """
+
+    def __init__(self, path: str = SESSION_DB_PATH, max_cached: int = SESSION_MAX_IN_MEMORY,
+                 idle_ttl: float = SESSION_IDLE_TTL_SECONDS):
+        super().__init__()
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.max_cached = max_cached
+        # session_id -> (session, version, persisted_turns)
+        self._cache: "OrderedDict[str, Tuple[CandidateSession, int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS turns (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access);
+        """)
+
+    def get(self, session_id: str) -> Optional[CandidateSession]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, version, last_access FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                self._cache.pop(session_id, None)
+                return None
+            data, version, last_access = row
+            now = time.time()
+            if now - last_access > self.idle_ttl:
+                self._delete(session_id)
+                expired = True
+            else:
+                expired = False
+                # Touch at most once a minute so reads don't turn into writes
+                if now - last_access > 60:
+                    self._conn.execute("UPDATE sessions SET last_access = ? WHERE session_id = ?", (now, session_id))
+                session = self._hydrate(session_id, data, version)
+        if expired:
+            self._notify_evicted(session_id)
+            return None
+        return session
+
+    def _hydrate(self, session_id: str, data: str, version: int) -> CandidateSession:
+        cached = self._cache.get(session_id)
+        if cached is not None and cached[1] == version:
+            self._cache.move_to_end(session_id)
+            return cached[0]
+
+        # Another worker advanced this session (or it isn't cached here): reload it
+        fields = json.loads(data)
+        compacted = fields["current_state"].get("compacted_turns", 0)
+        turns = self._conn.execute(
+            "SELECT role, content FROM turns WHERE session_id = ? AND seq >= ? ORDER BY seq", (session_id, compacted)
+        ).fetchall()
+        fields["current_state"]["history"] = [Turn(role, content) for role, content in turns]
+        session = CandidateSession(**fields)
+        session._version = version
+        self._remember(session, version, compacted + len(turns))
+        return session
+
+    def _remember(self, session: CandidateSession, version: int, persisted_turns: int):
+        self._cache[session.session_id] = (session, version, persisted_turns)
+        self._cache.move_to_end(session.session_id)
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+
+    def save(self, session: CandidateSession):
+        history = session.current_state.history
+        # Turn seq numbers are absolute; `history` starts after the compacted turns
+        compacted = session.current_state.compacted_turns
+        data = session.model_dump_json(exclude={"current_state": {"history"}})
+        with self._lock:
+            cached = self._cache.get(session.session_id)
+            persisted = cached[2] if cached is not None and cached[0] is session else None
+
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Only over the version this copy was loaded at; otherwise another worker's turns would be lost
+                if session._version:
+                    stored = self._conn.execute(
+                        "UPDATE sessions SET data = ?, version = version + 1, last_access = ? "
+                        "WHERE session_id = ? AND version = ?",
+                        (data, time.time(), session.session_id, session._version),
+                    ).rowcount
+                else:
+                    stored = self._conn.execute(
+                        "INSERT OR IGNORE INTO sessions (session_id, data, version, last_access) VALUES (?, ?, 1, ?)",
+                        (session.session_id, data, time.time()),
+                    ).rowcount
+                if not stored:
+                    raise SessionConflict(session.session_id)
+                if persisted is None:
+                    persisted = self._conn.execute(
+                        "SELECT COALESCE(MAX(seq) + 1, 0) FROM turns WHERE session_id = ?", (session.session_id,)
+                    ).fetchone()[0]
+                start = max(persisted, compacted)
+                # Compacted turns live on only in the summary
+                self._conn.execute("DELETE FROM turns WHERE session_id = ? AND seq < ?",
+                                   (session.session_id, compacted))
+                self._conn.executemany(
+                    "INSERT INTO turns (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                    [(session.session_id, seq, turn.role, turn.content)
+                     for seq, turn in enumerate(history[start - compacted:], start=start)],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                self._cache.pop(session.session_id, None)
+                raise
+            session._version += 1
+            self._remember(session, session._version, compacted + len(history))
+
+    def _delete(self, session_id: str):
+        self._conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+        self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        self._cache.pop(session_id, None)
+
+    def sweep(self) -> int:
+        cutoff = time.time() - self.idle_ttl
+        with self._lock:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT session_id FROM sessions WHERE last_access < ?", (cutoff,)
+            )]
+            for session_id in expired:
+                self._delete(session_id)
+        for session_id in expired:
+            self._notify_evicted(session_id)
+        return len(expired)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class SharedSessionStore(SessionStore):
+    """
+    Sessions kept in the shared state backend (SHARED_STATE_URL), so requests
+    need no sticky routing: any worker on any node can serve the next turn.
+    Each session is one JSON value plus a version counter, written together
+    and only over the version that was loaded; a local LRU of hydrated
+    sessions is revalidated against the version before use, which keeps a
+    repeat read on the same worker to one small key lookup. Idle expiry is
+    the backend's key TTL.
+    """
+
+    def __init__(self, kv: SharedState, max_cached: int = SESSION_MAX_IN_MEMORY,
+                 idle_ttl: float = SESSION_IDLE_TTL_SECONDS):
+        super().__init__()
+        self.kv = kv
+        self.max_cached = max_cached
+        self.idle_ttl = idle_ttl
+        # session_id -> (session, version, last TTL refresh)
+        self._cache: "OrderedDict[str, Tuple[CandidateSession, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _data_key(session_id: str) -> str:
+        return f"session:{session_id}"
+
+    @staticmethod
+    def _version_key(session_id: str) -> str:
+        return f"session_version:{session_id}"
+
+    def get(self, session_id: str) -> Optional[CandidateSession]:
+        version = self.kv.get(self._version_key(session_id))
+        if version is None:
+            with self._lock:
+                dropped = self._cache.pop(session_id, None) is not None
+            if dropped:
+                # Expired in the backend (or deleted by another worker) while cached here
+                self._notify_evicted(session_id)
+            return None
+        version = int(version)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(session_id)
+        if cached is not None and cached[1] == version:
+            session, touched = cached[0], cached[2]
+        else:
+            # Another worker advanced this session (or it isn't cached here): reload it
+            data = self.kv.get(self._data_key(session_id))
+            if data is None:
+                return None
+            session, touched = CandidateSession.model_validate_json(data), now
+            session._version = version
+        # Sliding idle TTL; refreshed at most once a minute so reads don't turn into writes
+        if now - touched > 60:
+            self.kv.expire(self._data_key(session_id), self.idle_ttl)
+            self.kv.expire(self._version_key(session_id), self.idle_ttl)
+            touched = now
+        self._remember(session, version, touched)
+        return session
+
+    def _remember(self, session: CandidateSession, version: int, touched: float):
+        with self._lock:
+            self._cache[session.session_id] = (session, version, touched)
+            self._cache.move_to_end(session.session_id)
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+
+    def save(self, session: CandidateSession):
+        session_id = session.session_id
+        # Data and version change together, and only if nobody saved since this copy was loaded
+        version = self.kv.set_versioned(self._data_key(session_id), session.model_dump_json(),
+                                        self._version_key(session_id), session._version, self.idle_ttl)
+        if version is None:
+            with self._lock:
+                self._cache.pop(session_id, None)
+            raise SessionConflict(session_id)
+        session._version = version
+        self._remember(session, version, time.monotonic())
+
+    def sweep(self) -> int:
+        # The backend expires idle sessions itself; this only releases what this worker still caches
+        with self._lock:
+            cached = list(self._cache)
+        evicted = [session_id for session_id in cached if self.kv.get(self._version_key(session_id)) is None]
+        with self._lock:
+            for session_id in evicted:
+                self._cache.pop(session_id, None)
+        for session_id in evicted:
+            self._notify_evicted(session_id)
+        return len(evicted)
+
+    def __len__(self) -> int:
+        return self.kv.count("session:")
+
+
+def create_session_store(kind: str = SESSION_STORE, shared: Optional[SharedState] = None) -> SessionStore:
+    """Builds the store selected by SESSION_STORE (memory | sqlite | shared)."""
+    if kind == "shared":
+        if shared is None:
+            raise ValueError("SESSION_STORE=shared requires SHARED_STATE_URL")
+        print(f">> Session store: shared (idle_ttl={SESSION_IDLE_TTL_SECONDS:g}s)")
+        return SharedSessionStore(shared)
+    if kind == "sqlite":
+        print(f">> Session store: SQLite ({SESSION_DB_PATH})")
+        return SQLiteSessionStore()
+    print(f">> Session store: in-memory (max={SESSION_MAX_IN_MEMORY}, idle_ttl={SESSION_IDLE_TTL_SECONDS:g}s)")
+    return MemorySessionStore()
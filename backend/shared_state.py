@@ -0,0 +1,315 @@
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+# Where state shared between workers lives; empty = nothing shared (single process)
+#   memory://                   in-process stand-in (tests, single worker)
+#   sqlite:///path/to/state.db  every worker on one host
+#   redis://host:6379/0         every worker on every node (needs the `redis` package)
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "")
+
+
+class SharedState(ABC):
+    """
+    Minimal key-value interface (the subset of Redis the app needs), so
+    sessions, breaker state and caches can live outside the worker process.
+    Values are strings; TTLs are in seconds.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        """Sets `key` only if absent; True if this call set it (used for leases)."""
+        ...
+
+    @abstractmethod
+    def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        ...
+
+    @abstractmethod
+    def set_versioned(self, key: str, value: str, version_key: str, expected: int,
+                      ttl: Optional[float] = None) -> Optional[int]:
+        """
+        Sets `key` and increments the counter at `version_key` in one step, but
+        only if the counter still equals `expected` (0 = absent). Returns the
+        new version, or None if another writer got there first.
+        """
+        ...
+
+    @abstractmethod
+    def expire(self, key: str, ttl: float):
+        """Resets the TTL of an existing key."""
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def count(self, prefix: str) -> int:
+        """Number of live keys under `prefix` (metrics only; may be O(n))."""
+        ...
+
+    def close(self):
+        pass
+
+
+class MemoryState(SharedState):
+    """In-process fake of the shared backend with the same semantics, for tests and single-worker runs."""
+
+    def __init__(self):
+        # key -> (value, expires_at monotonic or None)
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry[0]
+
+    @staticmethod
+    def _expiry(ttl: Optional[float]) -> Optional[float]:
+        return time.monotonic() + ttl if ttl else None
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (value, self._expiry(ttl))
+
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._data[key] = (value, self._expiry(ttl))
+            return True
+
+    def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        with self._lock:
+            value = int(self._live(key) or 0) + 1
+            self._data[key] = (str(value), self._expiry(ttl))
+            return value
+
+    def set_versioned(self, key: str, value: str, version_key: str, expected: int,
+                      ttl: Optional[float] = None) -> Optional[int]:
+        with self._lock:
+            if int(self._live(version_key) or 0) != expected:
+                return None
+            self._data[key] = (value, self._expiry(ttl))
+            self._data[version_key] = (str(expected + 1), self._expiry(ttl))
+            return expected + 1
+
+    def expire(self, key: str, ttl: float):
+        with self._lock:
+            value = self._live(key)
+            if value is not None:
+                self._data[key] = (value, self._expiry(ttl))
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def count(self, prefix: str) -> int:
+        with self._lock:
+            return sum(1 for key in list(self._data) if key.startswith(prefix) and self._live(key) is not None)
+
+
+class SQLiteState(SharedState):
+    """Shared by every worker process on one host (WAL mode, one row per key)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        self._writes = 0
+
+    @staticmethod
+    def _expiry(ttl: Optional[float]) -> Optional[float]:
+        # Wall clock: expiry has to mean the same thing in every process
+        return time.time() + ttl if ttl else None
+
+    def _purge(self):
+        # Expired rows are invisible to reads; delete them now and then
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self._conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                               (key, value, self._expiry(ttl)))
+            self._purge()
+
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+                "WHERE kv.expires_at IS NOT NULL AND kv.expires_at <= ?",
+                (key, value, self._expiry(ttl), time.time()),
+            )
+            return cursor.rowcount == 1
+
+    def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, '1', ?) "
+                "ON CONFLICT(key) DO UPDATE SET "
+                "value = CASE WHEN kv.expires_at IS NOT NULL AND kv.expires_at <= ? THEN 1 "
+                "ELSE CAST(kv.value AS INTEGER) + 1 END, expires_at = excluded.expires_at "
+                "RETURNING value",
+                (key, self._expiry(ttl), now),
+            ).fetchone()
+        return int(row[0])
+
+    def set_versioned(self, key: str, value: str, version_key: str, expected: int,
+                      ttl: Optional[float] = None) -> Optional[int]:
+        expires_at = self._expiry(ttl)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                    (version_key, time.time()),
+                ).fetchone()
+                if int(row[0] if row else 0) != expected:
+                    self._conn.execute("ROLLBACK")
+                    return None
+                self._conn.executemany("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                                       [(key, value, expires_at), (version_key, str(expected + 1), expires_at)])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._purge()
+        return expected + 1
+
+    def expire(self, key: str, ttl: float):
+        with self._lock:
+            self._conn.execute("UPDATE kv SET expires_at = ? WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                               (self._expiry(ttl), key, time.time()))
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def count(self, prefix: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM kv WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at > ?)",
+                (prefix, prefix + "\uffff", time.time()),
+            ).fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class RedisState(SharedState):
+    """Shared across nodes. Requires the optional `redis` package."""
+
+    # KEYS: value, version; ARGV: value, expected version, TTL in ms (0 = none)
+    _SET_VERSIONED = """
+        if tonumber(redis.call('GET', KEYS[2]) or '0') ~= tonumber(ARGV[2]) then
+            return false
+        end
+        local version = tonumber(ARGV[2]) + 1
+        if tonumber(ARGV[3]) > 0 then
+            redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[3])
+            redis.call('SET', KEYS[2], version, 'PX', ARGV[3])
+        else
+            redis.call('SET', KEYS[1], ARGV[1])
+            redis.call('SET', KEYS[2], version)
+        end
+        return version
+    """
+
+    def __init__(self, url: str):
+        import redis  # optional dependency, only needed for multi-node deployments
+        self.url = url
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self._set_versioned = self._client.register_script(self._SET_VERSIONED)
+
+    @staticmethod
+    def _ms(ttl: Optional[float]) -> Optional[int]:
+        return max(1, int(ttl * 1000)) if ttl else None
+
+    def get(self, key: str) -> Optional[str]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        self._client.set(key, value, px=self._ms(ttl))
+
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        return bool(self._client.set(key, value, px=self._ms(ttl), nx=True))
+
+    def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        pipe = self._client.pipeline()
+        pipe.incr(key)
+        if ttl:
+            pipe.pexpire(key, self._ms(ttl))
+        return int(pipe.execute()[0])
+
+    def set_versioned(self, key: str, value: str, version_key: str, expected: int,
+                      ttl: Optional[float] = None) -> Optional[int]:
+        version = self._set_versioned(keys=[key, version_key], args=[value, expected, self._ms(ttl) or 0])
+        return int(version) if version is not None else None
+
+    def expire(self, key: str, ttl: float):
+        self._client.pexpire(key, self._ms(ttl))
+
+    def delete(self, key: str):
+        self._client.delete(key)
+
+    def count(self, prefix: str) -> int:
+        return sum(1 for _ in self._client.scan_iter(match=f"{prefix}*", count=1000))
+
+    def close(self):
+        self._client.close()
+
+
+def create_shared_state(url: str = SHARED_STATE_URL) -> Optional[SharedState]:
+    """Builds the backend selected by SHARED_STATE_URL, or None when state stays per process."""
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        print(">> Shared state: in-process (single worker only)")
+        return MemoryState()
+    if url.startswith("sqlite://"):
+        # sqlite:///relative.db or sqlite:////absolute/path.db, as in SQLAlchemy URLs
+        path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else url[len("sqlite://"):]
+        print(f">> Shared state: SQLite ({path})")
+        return SQLiteState(path)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        print(f">> Shared state: Redis ({url.split('@')[-1]})")
+        return RedisState(url)
+    raise ValueError(f"Unsupported SHARED_STATE_URL: {url}")
@@ -0,0 +1,146 @@
+"""
+Local-LLM throughput benchmark: direct per-turn calls vs the OllamaDispatcher.
+
+Starts a stub Ollama server (benchmarks/stub_llm.py) and drives it with 1, 10
+and 100 concurrent interview sessions, each sending several turns:
+  - direct:     every turn posts on its own thread through a shared
+                requests.Session (the previous engine path)
+  - dispatcher: turns go through OllamaDispatcher (pooled session, bounded
+                slots, in-flight coalescing)
+
+A fraction of turns (`--shared`) reuse the same prompt, like round openers
+for the same company/role arriving together.
+
+Run from the repo root:
+    python benchmarks/bench_ollama.py
+    python benchmarks/bench_ollama.py --latency 0.5 --parallel 4 --json ollama.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.ollama_dispatcher import OllamaDispatcher  # noqa: E402
+from stub_llm import StubLLMServer  # noqa: E402
+
+
+def prompts_for(sessions: int, turns: int, shared: float):
+    every = round(1 / shared) if shared else 0
+    prompts = []
+    for s in range(sessions):
+        for t in range(turns):
+            if every and (s * turns + t) % every == 0:
+                prompts.append("System: Strict Google interviewer. Context: coding. Candidate: START_ROUND. Reply:")
+            else:
+                prompts.append(f"System: Strict Google interviewer. Context: coding. Candidate: turn {t} of {s}. Reply:")
+    return prompts
+
+
+def run_direct(url: str, prompts, concurrency: int):
+    http = requests.Session()
+    latencies = []
+
+    def call(prompt):
+        started = time.perf_counter()
+        resp = http.post(f"{url}/api/generate", json={"model": "llama3", "prompt": prompt, "stream": False},
+                         timeout=(2, 120))
+        resp.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, prompts))
+    http.close()
+    return latencies
+
+
+def run_dispatcher(url: str, prompts, concurrency: int, slots: int):
+    async def main():
+        dispatcher = OllamaDispatcher(base_url=url, slots=slots, read_timeout=120)
+        latencies = []
+        gate = asyncio.Semaphore(concurrency)
+
+        async def call(prompt):
+            async with gate:
+                started = time.perf_counter()
+                await dispatcher.generate(prompt)
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(call(p) for p in prompts))
+        stats = dict(dispatcher.stats)
+        dispatcher.close()
+        return latencies, stats
+
+    return asyncio.run(main())
+
+
+def percentile(ordered, pct: float) -> float:
+    # Nearest rank, the same formula as load_test.py, for every percentile
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed: float):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "throughput_rps": round(len(ordered) / elapsed, 2),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 1),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 1),
+    }
+
+
+def bench(args, client: str, sessions: int):
+    server = StubLLMServer(("127.0.0.1", 0), args.latency, args.parallel)
+    server.start()
+    prompts = prompts_for(sessions, args.turns, args.shared)
+    started = time.perf_counter()
+    stats = {}
+    try:
+        if client == "direct":
+            latencies = run_direct(server.url, prompts, sessions)
+        else:
+            latencies, stats = run_dispatcher(server.url, prompts, sessions, args.parallel)
+        elapsed = time.perf_counter() - started
+    finally:
+        server.shutdown()
+        server.server_close()
+    result = summarize(latencies, elapsed)
+    result.update({"connections": server.connections, "generations": server.generations})
+    if stats:
+        result["coalesced"] = stats["coalesced"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--turns", type=int, default=4, help="turns per session")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds per generation")
+    parser.add_argument("--parallel", type=int, default=4, help="stub concurrent generations (and dispatcher slots)")
+    parser.add_argument("--shared", type=float, default=0.25, help="fraction of turns with a shared prompt")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = {"latency_s": args.latency, "parallel": args.parallel, "turns": args.turns, "runs": []}
+    for sessions in args.sessions:
+        for client in ("direct", "dispatcher"):
+            result = bench(args, client, sessions)
+            results["runs"].append({"client": client, "sessions": sessions, **result})
+            print(f"{client:>10} x{sessions:<4} {result['throughput_rps']:>8} req/s | p50 {result['p50_ms']} ms "
+                  f"| p95 {result['p95_ms']} ms | {result['connections']} conns | {result['generations']} generations")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
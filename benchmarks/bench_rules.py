@@ -0,0 +1,111 @@
+"""
+STATIC interviewer rule matching benchmark: microseconds per reply as the
+rule count grows.
+
+Generates N synthetic rules (each triggered by two or three random phrases,
+plus a catch-all) and times replies to candidate messages, 60% of which
+contain no trigger at all. Two matchers are compared:
+  - chained: the previous shape, `if any(p in text for p in phrases)` tried
+             rule after rule until one fires
+  - compiled: backend.rules.RuleEngine, one Aho-Corasick pass over the text
+             and a phrase -> rule index
+
+Run from the repo root:
+    python benchmarks/bench_rules.py
+    python benchmarks/bench_rules.py --rules 10 100 1000 5000 --messages 2000 --json rules.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backend.models import CandidateSession, InterviewState, Turn  # noqa: E402
+from backend.rules import RuleEngine  # noqa: E402
+
+
+def synthetic_rules(rng: random.Random, count: int):
+    vocabulary = [f"term{i}" for i in range(count * 3)]
+    specs = []
+    for i in range(count):
+        phrases = rng.sample(vocabulary, rng.randint(2, 3))
+        specs.append({"id": f"r{i}", "any": [f"{a} {b}" for a, b in zip(phrases, phrases[1:])] + phrases[:1],
+                      "reply": f"reply {i}"})
+    specs.append({"id": "default", "reply": "Go on. I'm listening."})
+    return specs
+
+
+def messages(rng: random.Random, specs, count: int):
+    filler = "so i think we could iterate over the array and keep a running total of the values seen".split()
+    out = []
+    for _ in range(count):
+        words = rng.sample(filler, len(filler))
+        if rng.random() < 0.4:
+            words.insert(rng.randrange(len(words)), rng.choice(rng.choice(specs[:-1])["any"]))
+        out.append(" ".join(words))
+    return out
+
+
+def chained_reply(specs, user_input: str) -> str:
+    text = user_input.lower()
+    for spec in specs:
+        if not spec.get("any") or any(phrase in text for phrase in spec["any"]):
+            return spec["reply"]
+    return "I am listening."
+
+
+def per_reply_us(reply, inputs, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in inputs:
+            reply(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(inputs) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    session = CandidateSession(
+        session_id="bench", resume_text=None, job_description=None, years_of_experience=3,
+        target_company="Google", target_role="Software Engineer", target_level="L4",
+        preferred_language="python", round_type="coding",
+        current_state=InterviewState(total_rounds=1, history=[Turn("interviewer", "hi")] * 4))
+
+    results = []
+    for count in args.rules:
+        rng = random.Random(args.seed)
+        specs = synthetic_rules(rng, count)
+        inputs = messages(rng, specs, args.messages)
+        start = time.perf_counter()
+        engine = RuleEngine({"coding": specs}, "I am listening.")
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        # Both matchers must agree before their timings mean anything
+        for text in inputs[:200]:
+            assert engine.reply(session, text) == chained_reply(specs, text), text
+
+        chained = per_reply_us(lambda text: chained_reply(specs, text), inputs, args.repeat)
+        compiled = per_reply_us(lambda text: engine.reply(session, text), inputs, args.repeat)
+        results.append({"rules": count, "chained_us": round(chained, 2), "compiled_us": round(compiled, 2),
+                        "compile_ms": round(compile_ms, 1)})
+        print(f"{count:>6} rules: chained {chained:9.2f} us | compiled {compiled:7.2f} us "
+              f"| {chained / compiled:6.1f}x | compile {compile_ms:7.1f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Session memory benchmark: bytes per live session in the in-memory store.
+
+Builds N sessions (default 10k) the way the API does, each with a resume, a
+job description and a history of turns, and measures the heap they occupy
+with tracemalloc. Every string is a fresh copy, as it would be after parsing
+a separate HTTP request body. Two layouts are compared:
+  - dict:    history turns as {"role", "content"} dicts, resume/JD held per
+             session (the previous representation, built via model_construct)
+  - compact: slotted Turn records with interned roles and setup fields,
+             resume/JD shared by content hash (backend.models)
+
+Candidates are drawn from a small pool of resumes and job descriptions, as
+when a class or a hiring pipeline practises against the same postings.
+
+Run from the repo root:
+    python benchmarks/bench_sessions.py
+    python benchmarks/bench_sessions.py --sessions 10000 --turns 24 --json sessions.json
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backend.models import CandidateSession, InterviewState, Turn  # noqa: E402
+from backend.session_store import MemorySessionStore  # noqa: E402
+
+COMPANIES = ("Google", "Meta", "Amazon", "Apple")
+ROLES = ("candidate", "interviewer")
+
+
+def fresh(text: str) -> str:
+    # A distinct string object with the same content (what json.loads hands each request)
+    return json.loads(json.dumps(text))
+
+
+def corpus(rng: random.Random, count: int, words: int):
+    vocabulary = [f"skill{i}" for i in range(500)]
+    return [" ".join(rng.choice(vocabulary) for _ in range(words)) for _ in range(count)]
+
+
+def build(layout: str, sessions: int, turns: int, resumes, jds, messages, seed: int):
+    rng = random.Random(seed)
+    store = MemorySessionStore(max_sessions=sessions)
+    for i in range(sessions):
+        setup = dict(
+            session_id=f"{i:08x}-0000-0000-0000-000000000000",
+            resume_text=fresh(rng.choice(resumes)),
+            job_description=fresh(rng.choice(jds)),
+            years_of_experience=rng.randint(0, 15),
+            target_company=fresh(rng.choice(COMPANIES)),
+            target_role=fresh("Software Engineer"),
+            target_level=fresh(rng.choice(("L3", "L4", "L5"))),
+            preferred_language=fresh("python"),
+            round_type=fresh("coding"),
+        )
+        if layout == "dict":
+            # Routes appended literal dicts, so keys and roles were already shared
+            history = [{"role": ROLES[t % 2], "content": fresh(rng.choice(messages))} for t in range(turns)]
+            state = InterviewState.model_construct(total_rounds=4, history=history)
+            session = CandidateSession.model_construct(current_state=state, **setup)
+        else:
+            history = [Turn(fresh(ROLES[t % 2]), fresh(rng.choice(messages))) for t in range(turns)]
+            session = CandidateSession(current_state=InterviewState(total_rounds=4, history=history), **setup)
+        store.save(session)
+    return store
+
+
+def measure(layout: str, args, resumes, jds, messages) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = build(layout, args.sessions, args.turns, resumes, jds, messages, args.seed)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    assert len(store) == args.sessions
+    del store
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=12, help="history turns per session (compaction keeps ~12-18)")
+    parser.add_argument("--resumes", type=int, default=200, help="distinct resumes in the pool")
+    parser.add_argument("--jds", type=int, default=20, help="distinct job descriptions in the pool")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    resumes = corpus(rng, args.resumes, 400)
+    jds = corpus(rng, args.jds, 300)
+    messages = corpus(rng, 300, 40)
+
+    results = {"sessions": args.sessions, "turns": args.turns, "layouts": {}}
+    for layout in ("dict", "compact"):
+        used = measure(layout, args, resumes, jds, messages)
+        per_session = used / args.sessions
+        results["layouts"][layout] = {"total_mb": round(used / 2 ** 20, 1), "bytes_per_session": round(per_session)}
+        print(f"{layout:>8}: {used / 2 ** 20:8.1f} MB total | {per_session:8.0f} bytes/session")
+    dict_bytes = results["layouts"]["dict"]["bytes_per_session"]
+    compact_bytes = results["layouts"]["compact"]["bytes_per_session"]
+    print(f"compact layout saves {1 - compact_bytes / dict_bytes:.0%} per session")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
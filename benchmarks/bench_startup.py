@@ -0,0 +1,118 @@
+"""
+Cold-start benchmark: how long until a fresh process can serve traffic.
+
+Measures, over several fresh interpreter launches:
+  - import time of `backend.main` (module import only)
+  - boot time: uvicorn launch -> first successful GET /health
+  - time until /health reports an LLM backend as ready (if any is configured)
+
+Run from the repo root:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --json startup.json   # keep results for comparison
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import backend.main; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import() -> float:
+    out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def get_health(port: int):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as resp:
+        return resp.status, json.loads(resp.read())
+
+
+def measure_boot(timeout: float, wait_llm: float):
+    port = free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    boot_ms, llm_ms = None, None
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                status, body = get_health(port)
+            except OSError:
+                time.sleep(0.01)
+                continue
+            if status == 200 and boot_ms is None:
+                boot_ms = (time.perf_counter() - started) * 1000
+            backends = body.get("backends", {})
+            if any(b.get("readiness") == "ready" for b in backends.values()):
+                llm_ms = (time.perf_counter() - started) * 1000
+                break
+            if not backends or all(b.get("readiness") == "down" for b in backends.values()):
+                break
+            if boot_ms is not None and (time.perf_counter() - started) * 1000 - boot_ms > wait_llm * 1000:
+                break
+            time.sleep(0.05)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return boot_ms, llm_ms
+
+
+def summarize(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {"median_ms": round(statistics.median(values), 1), "min_ms": round(min(values), 1),
+            "max_ms": round(max(values), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for /health")
+    parser.add_argument("--wait-llm", type=float, default=10.0, help="seconds to wait for an LLM backend")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    imports, boots, llms = [], [], []
+    for run in range(args.runs):
+        imports.append(measure_import())
+        boot_ms, llm_ms = measure_boot(args.timeout, args.wait_llm)
+        boots.append(boot_ms)
+        llms.append(llm_ms)
+        llm_text = f"{llm_ms:.0f} ms" if llm_ms is not None else "n/a"
+        print(f"run {run + 1}: import {imports[-1]:.0f} ms | boot {boot_ms:.0f} ms | llm ready {llm_text}")
+
+    results = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import": summarize(imports),
+        "boot": summarize(boots),
+        "llm_ready": summarize(llms),
+    }
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""
+Load test: drives the real FastAPI app with simulated candidates.
+
+Boots `backend.main:app` under uvicorn in a subprocess, points it at a stub
+LLM (benchmarks/stub_llm.py) and runs concurrent virtual candidates through
+scripted interviews built from backend/data/*.json:
+    /session/start -> /respond ... -> /execute (coding) -> /evaluate
+
+Reports per-endpoint p50/p95/p99 latency, throughput and error counts, plus
+the API process's resident memory (and its sandbox workers') over the run.
+Memory is also broken down per endpoint: every RSS sample is attributed to
+the endpoints with requests in flight at that moment (peak while in flight,
+and RSS growth split by their share of those requests). Under mixed traffic
+that is an attribution by overlap, not an isolated measurement.
+
+Backends:
+  --backend local    stub speaks the Ollama API; the app serves LOCAL_LLM
+  --backend static   no LLM reachable; the app serves STATIC replies
+  --backend replay   no network; the app serves the replies (and latencies) of
+                     a recording made with --record (LLM_REPLAY_FILE)
+  --profile ollama|gemini picks the stub's latency shape. The app reaches the
+  stub through OLLAMA_URL either way; "gemini" only emulates the hosted
+  model's latency distribution, not its wire protocol.
+
+Run from the repo root:
+    python benchmarks/load_test.py --users 20 --sessions 3
+    python benchmarks/load_test.py --backend static --json static.json
+    python benchmarks/load_test.py --baseline static.json --tolerance 0.25   # exit 1 on p95 regression
+    python benchmarks/load_test.py --record calls.jsonl          # log every LLM call
+    python benchmarks/load_test.py --backend replay --replay calls.jsonl --json replay.json
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, "backend", "data")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.personas import COMPANY_PERSONAS  # noqa: E402
+from stub_llm import PROFILES, StubLLMServer  # noqa: E402
+
+COMPANIES = sorted(COMPANY_PERSONAS)
+LEVELS = ["L3", "L4", "L5", "L6"]
+
+# (endpoint, payload) steps; payload is the JSON body
+Step = Tuple[str, Optional[object]]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def load_data() -> Dict[str, list]:
+    data = {}
+    for round_type, filename in (("coding", "coding_problems.json"), ("design", "system_design.json"),
+                                 ("behavioral", "behavioral.json")):
+        with open(os.path.join(DATA_DIR, filename)) as f:
+            data[round_type] = json.load(f)
+    return data
+
+
+def coding_script(problem: dict) -> List[Step]:
+    return [
+        ("respond", f"Before I start on {problem['title']}: can the input be empty, and are there duplicates?"),
+        ("respond", "My approach: brute force first, then optimize with a hash map to get O(n) time."),
+        ("respond", "I'm stuck on the edge cases, can I get a hint?"),
+        ("execute", problem.get("default_code", "print('hello')")),
+        ("respond", f"{problem.get('hint', '')} That gives O(n) time and O(n) space overall."),
+        ("evaluate", None),
+    ]
+
+
+def design_script(problem: dict) -> List[Step]:
+    steps: List[Step] = [("respond", f"What scale should I assume? {problem['requirements'][0]}")]
+    for stage in problem.get("stages", {}).values():
+        steps.append(("respond", f"I'd put a load balancer in front and store data in a sharded database. {stage}"))
+    steps.append(("evaluate", None))
+    return steps
+
+
+def behavioral_script(problem: dict) -> List[Step]:
+    steps: List[Step] = [("respond", f"{part}: {guide.strip()}") for part, guide in problem["star_guide"].items()]
+    steps += [("respond", f"On '{q}' - I'd measure first and align the team earlier.") for q in problem["follow_ups"]]
+    steps.append(("evaluate", None))
+    return steps
+
+
+SCRIPTS = {"coding": coding_script, "design": design_script, "behavioral": behavioral_script}
+
+
+# Admission control answers overload with these (plus Retry-After); candidates wait and retry
+SHED_STATUSES = (429, 503)
+MAX_RETRIES = 3
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.shed: Dict[str, int] = defaultdict(int)
+        self.inflight: Dict[str, int] = defaultdict(int)
+
+    def begin(self, endpoint: str):
+        with self.lock:
+            self.inflight[endpoint] += 1
+
+    def end(self, endpoint: str):
+        with self.lock:
+            self.inflight[endpoint] -= 1
+
+    def active(self) -> Dict[str, int]:
+        with self.lock:
+            return {endpoint: n for endpoint, n in self.inflight.items() if n > 0}
+
+    def record_shed(self, endpoint: str):
+        with self.lock:
+            self.shed[endpoint] += 1
+
+    def record(self, endpoint: str, latency: float, ok: bool):
+        with self.lock:
+            self.latencies[endpoint].append(latency)
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+class Candidate:
+    """One virtual candidate: runs whole interviews back to back on its own HTTP connection."""
+
+    def __init__(self, base_url: str, recorder: Recorder, data: Dict[str, list], rounds: List[str],
+                 think: float, rng: random.Random):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.data = data
+        self.rounds = rounds
+        self.think = think
+        self.rng = rng
+        self.http = requests.Session()
+
+    def _call(self, endpoint: str, path: str, body) -> Optional[dict]:
+        for attempt in range(MAX_RETRIES + 1):
+            started = time.perf_counter()
+            self.recorder.begin(endpoint)
+            try:
+                resp = self.http.post(f"{self.base_url}{path}", json=body, timeout=120)
+                ok = resp.status_code == 200
+            except requests.RequestException:
+                resp, ok = None, False
+            finally:
+                self.recorder.end(endpoint)
+            if resp is not None and resp.status_code in SHED_STATUSES and attempt < MAX_RETRIES:
+                # Shed requests are counted apart from served latencies, then retried as told
+                self.recorder.record_shed(endpoint)
+                time.sleep(float(resp.headers.get("Retry-After", "1")))
+                continue
+            self.recorder.record(endpoint, time.perf_counter() - started, ok)
+            return resp.json() if ok else None
+
+    def interview(self, index: int):
+        round_type = self.rounds[index % len(self.rounds)]
+        started = self._call("start", "/session/start", {
+            "target_company": self.rng.choice(COMPANIES),
+            "target_role": "Software Engineer",
+            "target_level": self.rng.choice(LEVELS),
+            "years_of_experience": self.rng.randint(1, 15),
+            "preferred_language": "python",
+            "round_type": round_type,
+        })
+        if started is None:
+            return
+        session_id = started["session_id"]
+        for endpoint, payload in SCRIPTS[round_type](self.rng.choice(self.data[round_type])):
+            if self.think:
+                time.sleep(self.rng.uniform(0, self.think))
+            if endpoint == "respond":
+                self._call(endpoint, f"/session/{session_id}/respond", payload)
+            elif endpoint == "execute":
+                self._call(endpoint, f"/session/{session_id}/execute", {"code": payload})
+            else:
+                self._call(endpoint, f"/session/{session_id}/evaluate", None)
+
+    def run(self, sessions: int, offset: int):
+        for i in range(sessions):
+            self.interview(offset + i)
+        self.http.close()
+
+
+def rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+class MemorySampler(threading.Thread):
+    """
+    Samples RSS of the API process and its sandbox workers (Linux /proc
+    only), along with the endpoints that had requests in flight.
+    """
+
+    def __init__(self, pid: int, recorder: Recorder, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.recorder = recorder
+        self.interval = interval
+        self.api: List[int] = []
+        self.workers: List[int] = []
+        self.active: List[Dict[str, int]] = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.active.append(self.recorder.active())
+            self.api.append(rss_kb(self.pid))
+            self.workers.append(sum(rss_kb(child) for child in children(self.pid)))
+            self.stopped.wait(self.interval)
+
+    def summary(self, sessions: int) -> dict:
+        if not self.api or not self.api[0]:
+            return {"available": False}
+        return {
+            "api_start_mb": round(self.api[0] / 1024, 1),
+            "api_peak_mb": round(max(self.api) / 1024, 1),
+            "api_end_mb": round(self.api[-1] / 1024, 1),
+            "api_kb_per_session": round((self.api[-1] - self.api[0]) / max(1, sessions), 1),
+            "sandbox_peak_mb": round(max(self.workers) / 1024, 1),
+        }
+
+    def by_endpoint(self) -> Dict[str, dict]:
+        """
+        Per endpoint: API and sandbox peak RSS while it had requests in
+        flight, and the API's RSS growth over those samples, split between
+        the endpoints in flight by their share of the requests.
+        """
+        if not self.api or not self.api[0]:
+            return {}
+        peak_api: Dict[str, int] = defaultdict(int)
+        peak_workers: Dict[str, int] = defaultdict(int)
+        growth: Dict[str, float] = defaultdict(float)
+        samples: Dict[str, int] = defaultdict(int)
+        for i, active in enumerate(self.active):
+            total = sum(active.values())
+            delta = self.api[i] - self.api[i - 1] if i else 0
+            for endpoint, count in active.items():
+                peak_api[endpoint] = max(peak_api[endpoint], self.api[i])
+                peak_workers[endpoint] = max(peak_workers[endpoint], self.workers[i])
+                growth[endpoint] += delta * count / total
+                samples[endpoint] += 1
+        return {endpoint: {"api_peak_mb": round(peak_api[endpoint] / 1024, 1),
+                           "api_growth_kb": round(growth[endpoint], 1),
+                           "sandbox_peak_mb": round(peak_workers[endpoint] / 1024, 1),
+                           "samples": samples[endpoint]}
+                for endpoint in sorted(samples)}
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def endpoint_stats(recorder: Recorder, elapsed: float) -> Dict[str, dict]:
+    stats = {}
+    for endpoint, values in sorted(recorder.latencies.items()):
+        ordered = sorted(values)
+        stats[endpoint] = {
+            "requests": len(ordered),
+            "errors": recorder.errors[endpoint],
+            "shed": recorder.shed[endpoint],
+            "throughput_rps": round(len(ordered) / elapsed, 2),
+            "p50_ms": round(percentile(ordered, 50) * 1000, 1),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 1),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 1),
+        }
+    return stats
+
+
+def wait_ready(base_url: str, backend: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/health", timeout=1) as resp:
+                body = json.loads(resp.read())
+            if backend == "static" or body.get("mode") != "STATIC":
+                return body
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"app at {base_url} not ready within {timeout}s")
+
+
+def start_app(port: int, llm_url: str, slots: int, extra_env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.pop("GEMINI_API_KEY", None)
+    env.update({"OLLAMA_URL": llm_url, "OLLAMA_SLOTS": str(slots), "PROBE_INTERVAL_SECONDS": "0.2"})
+    env.update(extra_env or {})
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def compare(results: dict, baseline_path: str, tolerance: float) -> List[str]:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    for endpoint, stats in results["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(endpoint)
+        if before and stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{endpoint}: p95 {before['p95_ms']} -> {stats['p95_ms']} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual candidates")
+    parser.add_argument("--sessions", type=int, default=3, help="interviews per candidate")
+    parser.add_argument("--rounds", nargs="+", default=["coding", "design", "behavioral"], choices=sorted(SCRIPTS))
+    parser.add_argument("--backend", choices=["local", "static", "replay"], default="local")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="ollama")
+    parser.add_argument("--latency-scale", type=float, default=0.25, help="multiplier on the profile's latency")
+    parser.add_argument("--think", type=float, default=0.0, help="max seconds a candidate pauses between turns")
+    parser.add_argument("--record", help="have the app log its LLM calls to this JSONL file")
+    parser.add_argument("--replay", help="recording the replay backend serves from")
+    parser.add_argument("--replay-timing", choices=["recorded", "fast"], default="recorded")
+    parser.add_argument("--url", help="target an already running app instead of booting one")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown vs baseline")
+    args = parser.parse_args()
+    if args.backend == "replay" and not args.replay:
+        parser.error("--backend replay needs --replay FILE")
+
+    stub = None
+    proc = None
+    if args.backend == "local":
+        stub = StubLLMServer.from_profile(("127.0.0.1", 0), args.profile, args.latency_scale)
+        stub.start()
+        llm_url = stub.url
+    else:
+        llm_url = f"http://127.0.0.1:{free_port()}"  # nothing listens here
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        extra_env = {}
+        if args.record:
+            extra_env["LLM_RECORD_FILE"] = os.path.abspath(args.record)
+        if args.backend == "replay":
+            extra_env.update(LLM_REPLAY_FILE=os.path.abspath(args.replay), LLM_REPLAY_TIMING=args.replay_timing)
+        proc = start_app(port, llm_url, PROFILES[args.profile]["parallel"], extra_env)
+
+    data = load_data()
+    recorder = Recorder()
+    sampler = None
+    try:
+        health = wait_ready(base_url, args.backend, timeout=30)
+        print(f">> App ready in mode {health.get('mode')}; {args.users} candidates x {args.sessions} interviews")
+        if proc is not None:
+            sampler = MemorySampler(proc.pid, recorder)
+            sampler.start()
+        rng = random.Random(args.seed)
+        candidates = [Candidate(base_url, recorder, data, args.rounds, args.think, random.Random(rng.random()))
+                      for _ in range(args.users)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users) as pool:
+            runs = [pool.submit(candidate.run, args.sessions, i) for i, candidate in enumerate(candidates)]
+            for run in runs:
+                run.result()
+        elapsed = time.perf_counter() - started
+    finally:
+        if sampler is not None:
+            sampler.stopped.set()
+            sampler.join()
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+        if stub is not None:
+            stub.shutdown()
+            stub.server_close()
+
+    total = sum(len(v) for v in recorder.latencies.values())
+    results = {
+        "backend": args.backend,
+        "profile": args.profile if args.backend == "local" else None,
+        "replay": {"file": args.replay, "timing": args.replay_timing} if args.backend == "replay" else None,
+        "users": args.users,
+        "interviews": args.users * args.sessions,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(total / elapsed, 2),
+        "endpoints": endpoint_stats(recorder, elapsed),
+        "memory": sampler.summary(args.users * args.sessions) if sampler else {"available": False},
+    }
+    for endpoint, memory in (sampler.by_endpoint() if sampler else {}).items():
+        if endpoint in results["endpoints"]:
+            results["endpoints"][endpoint]["memory"] = memory
+    print(f"{'endpoint':<10} {'reqs':>6} {'errs':>5} {'shed':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'peak MB':>8} {'grow KB':>8}")
+    for endpoint, s in results["endpoints"].items():
+        memory = s.get("memory", {})
+        print(f"{endpoint:<10} {s['requests']:>6} {s['errors']:>5} {s['shed']:>5} {s['throughput_rps']:>8} "
+              f"{s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9} "
+              f"{memory.get('api_peak_mb', '-'):>8} {memory.get('api_growth_kb', '-'):>8}")
+    print(f"total {total} requests in {results['elapsed_s']}s ({results['throughput_rps']} req/s)")
+    print("memory", json.dumps(results["memory"]))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"!! Regression {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
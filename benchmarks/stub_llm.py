@@ -0,0 +1,140 @@
+"""
+Stub LLM server for benchmarks: speaks enough of the Ollama HTTP API
+(`GET /`, `POST /api/generate`, streaming and non-streaming) to exercise the
+backend without a model. Generation time is drawn from a log-normal
+distribution around `latency` seconds (`sigma` = 0 makes it fixed) and at
+most `parallel` generations run at once, like Ollama's OLLAMA_NUM_PARALLEL.
+
+Profiles approximate the latency shape of the real backends:
+  - ollama: local model, few decode slots, tight distribution
+  - gemini: hosted model, wide concurrency, long tail
+
+Run standalone:
+    python benchmarks/stub_llm.py --port 11434 --latency 0.2 --parallel 4
+    python benchmarks/stub_llm.py --port 11434 --profile gemini
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# median seconds per generation, log-normal sigma, concurrent generations
+PROFILES = {
+    "ollama": {"latency": 0.8, "sigma": 0.25, "parallel": 4},
+    "gemini": {"latency": 1.2, "sigma": 0.6, "parallel": 64},
+}
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+    def __init__(self, address, latency: float = 0.2, parallel: int = 4, chunks: int = 8, sigma: float = 0.0):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.sigma = sigma
+        self.chunks = chunks
+        self.slots = threading.BoundedSemaphore(parallel)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.generations = 0
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    @classmethod
+    def from_profile(cls, address, profile: str, scale: float = 1.0) -> "StubLLMServer":
+        spec = PROFILES[profile]
+        return cls(address, spec["latency"] * scale, spec["parallel"], sigma=spec["sigma"])
+
+    def sample_latency(self) -> float:
+        if not self.sigma:
+            return self.latency
+        return random.lognormvariate(math.log(self.latency), self.sigma)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection pooling is visible
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, body: dict, status: int = 200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/":
+            data = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self._send_json({"error": "not found"}, 404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        server = self.server
+        words = [f"w{i}" for i in range(server.chunks)]
+        latency = server.sample_latency()
+        with server.slots:
+            with server.lock:
+                server.generations += 1
+            if not request.get("stream", True):
+                time.sleep(latency)
+                self._send_json({"model": request.get("model"), "response": " ".join(words), "done": True})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, word in enumerate(words):
+                time.sleep(latency / len(words))
+                line = json.dumps({"response": word + " ", "done": i == len(words) - 1}).encode() + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            self.wfile.write(b"0\r\n\r\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per generation")
+    parser.add_argument("--parallel", type=int, default=4, help="concurrent generations")
+    parser.add_argument("--sigma", type=float, default=0.0, help="log-normal spread of generation time")
+    parser.add_argument("--profile", choices=sorted(PROFILES), help="preset latency shape (overrides the above)")
+    args = parser.parse_args()
+    if args.profile:
+        server = StubLLMServer.from_profile(("127.0.0.1", args.port), args.profile)
+    else:
+        server = StubLLMServer(("127.0.0.1", args.port), args.latency, args.parallel, sigma=args.sigma)
+    print(f">> Stub LLM listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 // FAANG Simulator 2.0 Client Logic
 
 // --- Constants ---
-const WS_URL = `ws://${window.location.host}/ws/interview`; // Future WebSocket endpoint
+const WS_URL = `${window.location.protocol === 'https:' ? 'wss' : 'ws'}://${window.location.host}/ws/interview`; // Streaming endpoint
 const API_BASE = window.location.origin;
 
 // --- State ---
@@ -77,6 +77,35 @@ function addMessage(role, text) {
     div.textContent = text;
     chatContainer.appendChild(div);
     chatContainer.scrollTop = chatContainer.scrollHeight;
+    return div;
+}
+
+// --- Streaming Socket ---
+// Interviewer replies arrive token-by-token; falls back to plain HTTP if the socket is unavailable.
+let streamTarget = null;
+
+function connectSocket() {
+    return new Promise((resolve) => {
+        if (ws && ws.readyState === WebSocket.OPEN) return resolve(ws);
+
+        ws = new WebSocket(WS_URL);
+        ws.onopen = () => resolve(ws);
+        ws.onerror = () => resolve(null);
+        ws.onclose = () => { ws = null; };
+        ws.onmessage = (event) => {
+            const msg = JSON.parse(event.data);
+            if (msg.type === 'delta') {
+                if (!streamTarget) streamTarget = addMessage('interviewer', '');
+                streamTarget.textContent += msg.content;
+                chatContainer.scrollTop = chatContainer.scrollHeight;
+            } else if (msg.type === 'done') {
+                streamTarget = null;
+            } else if (msg.type === 'error') {
+                streamTarget = null;
+                addMessage('system', `Error: ${msg.detail}`);
+            }
+        };
+    });
 }
 
 // --- Whiteboard Logic ---
@@ -209,11 +238,17 @@ document.getElementById('chat-input').addEventListener('keypress', async (e) =>
 async function sendCandidateResponse(text) {
     if (!sessionId) return;
 
+    const socket = await connectSocket();
+    if (socket) {
+        socket.send(JSON.stringify({ session_id: sessionId, candidate_message: text }));
+        return;
+    }
+
     try {
         const response = await fetch(`${API_BASE}/session/${sessionId}/respond`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ candidate_message: text })
+            body: JSON.stringify(text)
         });
         const data = await response.json();
         addMessage('interviewer', data.interviewer_message);
@@ -0,0 +1,147 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.admission import BACKGROUND, GREETING, TURN, FairScheduler, Overloaded, Request
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _served(scheduler, order, session_id, priority=TURN, request=None):
+    await scheduler.acquire(session_id, priority, request)
+    order.append(session_id)
+    scheduler.release()
+
+
+async def _queued(scheduler, *calls):
+    """Starts the calls while the only slot is held, lets them queue, then frees the slot."""
+    order = []
+    tasks = [asyncio.ensure_future(_served(scheduler, order, *call)) for call in calls]
+    await asyncio.sleep(0.01)
+    return order, tasks
+
+
+def test_turns_go_before_greetings_and_sessions_take_turns():
+    async def scenario():
+        scheduler = FairScheduler("test", slots=1)
+        await scheduler.acquire("hog")
+        order, tasks = await _queued(scheduler, ("greeting", GREETING), ("a",), ("a",), ("b",), ("c",))
+        assert scheduler.waiting == 5
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    # "a" queued twice first, but "b" and "c" are served before its second call
+    assert run(scenario()) == ["a", "b", "c", "a", "greeting"]
+
+
+def test_third_queued_request_from_one_session_is_429():
+    async def scenario():
+        scheduler = FairScheduler("test", slots=1, session_queue=2)
+        await scheduler.acquire("hog")
+        order, tasks = await _queued(scheduler, ("a",), ("a",))
+        with pytest.raises(Overloaded) as shed:
+            await scheduler.acquire("a")
+        # Other sessions are unaffected
+        other = asyncio.ensure_future(_served(scheduler, order, "b"))
+        await asyncio.sleep(0.01)
+        scheduler.release()
+        await asyncio.gather(*tasks, other)
+        return shed.value, order
+
+    shed, order = run(scenario())
+    assert shed.status_code == 429 and shed.retry_after >= 1
+    assert sorted(order) == ["a", "a", "b"]
+
+
+def test_calls_fanned_out_from_one_request_count_once():
+    async def scenario():
+        scheduler = FairScheduler("test", slots=1, session_queue=2)
+        await scheduler.acquire("hog")
+        evaluation = Request()
+        order, tasks = await _queued(scheduler, *[("a", TURN, evaluation)] * 5, ("a",))
+        # The evaluation and one more request fill the cap
+        with pytest.raises(Overloaded) as shed:
+            await scheduler.acquire("a")
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        return shed.value, order
+
+    shed, order = run(scenario())
+    assert shed.status_code == 429
+    assert order == ["a"] * 6
+
+
+def test_call_that_would_wait_past_the_deadline_is_shed_up_front():
+    async def scenario():
+        scheduler = FairScheduler("test", slots=1, deadline=0.5)
+        scheduler.latency_ewma = 2.0
+        await scheduler.acquire("hog")
+        started = time.monotonic()
+        with pytest.raises(Overloaded) as shed:
+            await scheduler.acquire("a")
+        return shed.value, time.monotonic() - started, scheduler.waiting
+
+    shed, elapsed, waiting = run(scenario())
+    assert shed.status_code == 503 and shed.retry_after >= 2
+    assert elapsed < 0.1 and waiting == 0
+
+
+def test_call_still_queued_at_the_deadline_is_503():
+    async def scenario():
+        scheduler = FairScheduler("test", slots=1, deadline=0.2)
+        await scheduler.acquire("hog")
+        started = time.monotonic()
+        with pytest.raises(Overloaded) as shed:
+            await scheduler.acquire("a")
+        return shed.value, time.monotonic() - started, scheduler.waiting, scheduler.running
+
+    shed, elapsed, waiting, running = run(scenario())
+    assert shed.status_code == 503
+    assert 0.15 < elapsed < 1
+    assert (waiting, running) == (0, 1)
+
+
+def test_background_work_never_queues():
+    async def scenario():
+        scheduler = FairScheduler("test", slots=1)
+        assert scheduler.idle()
+        await scheduler.acquire("a", BACKGROUND)
+        assert not scheduler.idle()
+        with pytest.raises(Overloaded):
+            await scheduler.acquire("b", BACKGROUND)
+        return scheduler.waiting
+
+    assert run(scenario()) == 0
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        scheduler = FairScheduler("test", slots=1)
+        await scheduler.acquire("hog")
+        order, tasks = await _queued(scheduler, ("a",))
+        tasks[0].cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert scheduler.waiting == 0
+        scheduler.release()
+        async with scheduler.slot("b"):
+            assert scheduler.running == 1
+        return scheduler.running, order
+
+    assert run(scenario()) == (0, [])
+
+
+def test_rate_bucket_spaces_out_calls():
+    async def scenario():
+        scheduler = FairScheduler("test", slots=8, rate=20, burst=1)
+        started = time.monotonic()
+        for _ in range(5):
+            async with scheduler.slot("a"):
+                pass
+        return time.monotonic() - started
+
+    # One call from the burst, then one every 50 ms
+    assert run(scenario()) >= 0.18
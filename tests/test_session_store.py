@@ -0,0 +1,80 @@
+import pytest
+
+from backend.models import CandidateSession, InterviewState, Turn
+from backend.session_store import SessionConflict, SharedSessionStore, SQLiteSessionStore
+from backend.shared_state import MemoryState, SQLiteState
+
+
+def new_session(session_id="s1"):
+    return CandidateSession(session_id=session_id, resume_text=None, job_description=None, years_of_experience=3,
+                            target_company="Google", target_role="SWE", target_level="L4",
+                            preferred_language="python", round_type="coding",
+                            current_state=InterviewState(total_rounds=4))
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def kv(request, tmp_path):
+    state = MemoryState() if request.param == "memory" else SQLiteState(str(tmp_path / "state.db"))
+    yield state
+    state.close()
+
+
+def test_set_versioned_only_over_the_expected_version(kv):
+    assert kv.set_versioned("data", "a", "version", 0) == 1
+    assert kv.set_versioned("data", "b", "version", 0) is None
+    assert kv.get("data") == "a"
+    assert kv.set_versioned("data", "b", "version", 1) == 2
+    assert (kv.get("data"), kv.get("version")) == ("b", "2")
+
+
+def test_concurrent_saves_from_two_workers_conflict(kv):
+    # Two workers, each with its own local cache, serve the same session
+    first, second = SharedSessionStore(kv), SharedSessionStore(kv)
+    first.save(new_session())
+    mine, theirs = first.get("s1"), second.get("s1")
+    assert mine is not theirs
+
+    theirs.current_state.history.append(Turn("candidate", "run code"))
+    second.save(theirs)
+    mine.current_state.history.append(Turn("candidate", "hello"))
+    with pytest.raises(SessionConflict):
+        first.save(mine)
+
+    # Reloading picks up the other worker's turn, and saving over it then succeeds
+    mine = first.get("s1")
+    assert [turn.content for turn in mine.current_state.history] == ["run code"]
+    mine.current_state.history.append(Turn("candidate", "hello"))
+    first.save(mine)
+    assert [turn.content for turn in second.get("s1").current_state.history] == ["run code", "hello"]
+
+
+def test_same_worker_saves_in_sequence(kv):
+    store = SharedSessionStore(kv)
+    session = new_session()
+    store.save(session)
+    session.current_state.history.append(Turn("candidate", "hi"))
+    store.save(session)
+    assert len(store.get("s1").current_state.history) == 1
+
+
+def test_sqlite_store_refuses_a_stale_save(tmp_path):
+    # Two worker processes on one host, each with its own connection and cache
+    path = str(tmp_path / "sessions.db")
+    first, second = SQLiteSessionStore(path), SQLiteSessionStore(path)
+    first.save(new_session())
+    mine, theirs = first.get("s1"), second.get("s1")
+
+    theirs.current_state.history.append(Turn("candidate", "run code"))
+    second.save(theirs)
+    mine.current_state.history.append(Turn("candidate", "hello"))
+    with pytest.raises(SessionConflict):
+        first.save(mine)
+
+    # Neither the state nor the turns were touched by the refused save
+    mine = first.get("s1")
+    assert [turn.content for turn in mine.current_state.history] == ["run code"]
+    mine.current_state.history.append(Turn("candidate", "hello"))
+    first.save(mine)
+    assert [turn.content for turn in second.get("s1").current_state.history] == ["run code", "hello"]
+    first.close()
+    second.close()